@@ -0,0 +1,238 @@
+"""
+Searching with conflict directed backjumping and learned nogoods.
+The board explains its changes while searching: every tile knows the search
+levels whose choices narrowed it, so a board found to have no solution knows
+which choices caused it. Instead of trying the next value of the last choice,
+the search jumps back straight to the latest choice that caused the failure,
+skipping the ones in between, whose other values would fail the same way.
+Every choice point whose values all failed also teaches a nogood: the
+choices that can't all be made together. The small nogoods are kept in a
+bounded store, and checked on every placement
+"""
+import time
+from collections import OrderedDict
+
+from board import X_INDEX, Y_INDEX, FLAG, PROPAGATOR_NOGOOD
+from domain import DIGIT_BITS
+from kakuro import propagate_board, minimal_remaining_values, SearchTimeout
+from stats import PHASE_COPY, PHASE_PROPAGATION
+
+DEFAULT_MAX_NOGOODS = 1000
+DEFAULT_MAX_NOGOOD_SIZE = 4
+
+# the fields of a choice point
+CHOICE_MARK = 0
+CHOICE_LOCATION = 1
+CHOICE_VALUES = 2
+CHOICE_VALUE = 3
+CHOICE_CONFLICT = 4
+
+
+class NogoodStore:
+    """
+    A bounded store of nogoods, each a set of (location, value) placements
+    that can't all be on a solved board. When it's full, the nogood that
+    was least recently used to prune is evicted
+    """
+
+    def __init__(self, max_nogoods=DEFAULT_MAX_NOGOODS, max_size=DEFAULT_MAX_NOGOOD_SIZE):
+        """
+        Constructor of an empty store
+        :param max_nogoods: the number of nogoods to keep
+        :param max_size: the number of placements in the biggest nogood to keep
+        """
+        self.max_nogoods = max_nogoods
+        self.max_size = max_size
+
+        # the nogoods by id, from the least recently used,
+        # and the ids of the nogoods holding each placement
+        self.nogoods = OrderedDict()
+        self.watches = {}
+        self.next_id = 0
+
+        self.num_learned = 0
+        self.num_pruned = 0
+
+    def get_num_nogoods(self):
+        """
+        :return: the number of nogoods in the store
+        """
+        return len(self.nogoods)
+
+    def add_nogood(self, placements):
+        """
+        Adding a nogood, evicting the least recently used one if the store is full
+        :param placements: a list of (location, value) that can't all be on a solved board
+        :return: True if the nogood was kept, False if it's too big
+        """
+        if len(placements) == 0 or len(placements) > self.max_size:
+            return False
+        if len(self.nogoods) >= self.max_nogoods:
+            old_id, old_placements = self.nogoods.popitem(last=False)
+            for placement in old_placements:
+                self.watches[placement].discard(old_id)
+                if len(self.watches[placement]) == 0:
+                    del self.watches[placement]
+
+        nogood_id = self.next_id
+        self.next_id += 1
+        self.nogoods[nogood_id] = tuple(placements)
+        for placement in placements:
+            self.watches.setdefault(placement, set()).add(nogood_id)
+        self.num_learned += 1
+        return True
+
+    def check_placement(self, board, tile, value):
+        """
+        Checking the nogoods holding a placement just made on the board.
+        A nogood with all its other placements on the board removes the value
+        of its last placement from its tile
+        :param board: the board, explaining its changes
+        :param tile: the tile just placed
+        :param value: the value placed in it
+        :return: False if a nogood has all its placements on the board
+        """
+        nogood_ids = self.watches.get(((tile.get_row(), tile.get_col()), value))
+        if nogood_ids is None:
+            return True
+        for nogood_id in list(nogood_ids):
+            reason = 0
+            open_tile = None
+            open_value = None
+            for location, nogood_value in self.nogoods[nogood_id]:
+                other = board.get_tile(location[X_INDEX], location[Y_INDEX])
+                if other.is_visited():
+                    if other.get_value() != nogood_value:
+                        break
+                    reason |= other.get_reason()
+                elif open_tile is None and other.possible_mask() & DIGIT_BITS[nogood_value]:
+                    open_tile = other
+                    open_value = nogood_value
+                else:
+                    break
+            else:
+                self.nogoods.move_to_end(nogood_id)
+                self.num_pruned += 1
+                if open_tile is None:
+                    board.conflict |= reason
+                    return False
+                board.narrow_tile(open_tile, board.full_mask & ~DIGIT_BITS[open_value], PROPAGATOR_NOGOOD, reason)
+        return True
+
+
+def levels_of(conflict):
+    """
+    :param conflict: a mask of search levels
+    :return: the list of the levels in it, from the latest
+    """
+    levels = []
+    while conflict:
+        level = conflict.bit_length() - 1
+        levels.append(level)
+        conflict ^= 1 << level
+    return levels
+
+
+def search_backjump(board, deadline=None, max_boards=None, stats=None, nogoods=None):
+    """
+    Searching for a solution on a single board, jumping back to the
+    choice that caused each failure and learning nogoods on the way
+    :param board: the board to solve, it's left solved if there's a solution
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param max_boards: the number of boards to give up after, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param nogoods: a NogoodStore to learn into, a new one if None
+    :return: the solved board (None if there is none) and the number of used boards
+    """
+    num_used_boards = 1
+    if board.trail is None:
+        board.start_trail()
+    board.stats = stats
+    board.explain = True
+    board.nogoods = NogoodStore() if nogoods is None else nogoods
+    if stats is not None:
+        search_start = time.perf_counter()
+
+    # the choice point at index i is the choice of level i + 1, as
+    # [trail mark, location, values left, value tried, levels causing its failures]
+    choice_points = []
+    try:
+        board.conflict = 0
+        if stats is not None:
+            stats.node_expanded(board, 0)
+        consistent = propagate_board(board, stats)
+        while True:
+            if consistent:
+                if board.is_complete():
+                    break
+                location = minimal_remaining_values(board)
+                if location == FLAG:
+                    return None, num_used_boards
+                tile = board.get_tile(location[X_INDEX], location[Y_INDEX])
+                possible_values = tile.possible_values()
+                num_used_boards += len(possible_values)
+
+                # the values left were narrowed by the choices in the tile's
+                # reason, so these choices are part of why all of them fail
+                choice_points.append([board.trail_mark(), location, possible_values, None, tile.get_reason()])
+            else:
+                conflict = board.conflict
+                if conflict == 0 and len(choice_points) > 0:
+                    # an unexplained failure, blamed on every choice
+                    conflict = (1 << (len(choice_points) + 1)) - 2
+                if stats is not None:
+                    stats.backtracks += 1
+
+                while len(choice_points) > 0:
+                    level = len(choice_points)
+                    choice_point = choice_points[-1]
+                    if conflict & (1 << level):
+                        choice_point[CHOICE_CONFLICT] |= conflict & ~(1 << level)
+                        if len(choice_point[CHOICE_VALUES]) > 0:
+                            break
+
+                        # every value failed, because of the choices of the levels left
+                        conflict = choice_point[CHOICE_CONFLICT]
+                        board.nogoods.add_nogood([(choice_points[cause - 1][CHOICE_LOCATION],
+                                                   choice_points[cause - 1][CHOICE_VALUE])
+                                                  for cause in levels_of(conflict)])
+                    elif stats is not None:
+                        stats.skipped_levels += 1
+                    choice_points.pop()
+
+                if len(choice_points) == 0:
+                    return None, num_used_boards
+
+            if stats is not None:
+                stats.frontier_size(len(choice_points))
+            if (deadline is not None and time.monotonic() > deadline) or \
+                    (max_boards is not None and num_used_boards > max_boards):
+                raise SearchTimeout(num_used_boards)
+
+            choice_point = choice_points[-1]
+            if stats is not None:
+                start = time.perf_counter()
+            board.undo_to(choice_point[CHOICE_MARK])
+            if stats is not None:
+                start = stats.add_time(PHASE_COPY, start)
+            location = choice_point[CHOICE_LOCATION]
+            value = choice_point[CHOICE_VALUES].pop()
+            choice_point[CHOICE_VALUE] = value
+            board.conflict = 0
+            placed = board.place_choice(value, location[X_INDEX], location[Y_INDEX], len(choice_points))
+            if stats is not None:
+                stats.add_time(PHASE_PROPAGATION, start)
+                stats.placed(board, location, value, False)
+                if not placed:
+                    stats.wiped_out(board)
+                else:
+                    stats.node_expanded(board, len(choice_points))
+            consistent = placed and propagate_board(board, stats)
+    finally:
+        board.explain = False
+        if stats is not None:
+            stats.used_boards = num_used_boards
+            stats.learned_nogoods = board.nogoods.num_learned
+            stats.total_seconds += time.perf_counter() - search_start
+        board.nogoods = None
+    return board, num_used_boards
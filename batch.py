@@ -0,0 +1,389 @@
+"""
+Solving many puzzles from a JSONL or text file on a pool of processes,
+writing a JSONL result line for each puzzle
+"""
+import argparse
+import ast
+import json
+import multiprocessing.util
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from board import Board, HORIZONTAL, VERTICAL
+from cache import SolutionCache, DEFAULT_MAX_ENTRIES
+from domain import BIGGEST_NUM
+from kakuro import search_components, count_solutions, SearchTimeout
+from ordering import search_restarts
+from stats import SolverStats
+
+JSONL_FORMAT = "jsonl"
+TEXT_FORMAT = "text"
+
+STATUS_SOLVED = "solved"
+STATUS_UNSOLVABLE = "unsolvable"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+
+CLUE_LENGTH = 5
+
+# how many chunks each worker may have waiting, submitted or solved out of order
+PENDING_PER_WORKER = 4
+
+# how many times a chunk is submitted again after a worker died, as when the
+# system killed it for its memory, before its puzzles are given up as errors
+MAX_RESUBMITS = 1
+
+# the solution caches opened by this process, by their path and size
+open_caches = {}
+
+
+def parse_line(line, line_format):
+    """
+    Reading a single puzzle out of a line of a puzzles file
+    :param line: the line, without the line break
+    :param line_format: JSONL_FORMAT or TEXT_FORMAT
+    :return: the id written in the line (None if there's none) and the clues,
+    the line itself if it can't be read
+    """
+    try:
+        if line_format == JSONL_FORMAT:
+            puzzle = json.loads(line)
+            if isinstance(puzzle, dict):
+                return puzzle.get("id"), puzzle.get("clues")
+            return None, puzzle
+        puzzle = ast.literal_eval(line)
+    except (ValueError, SyntaxError):
+        return None, line
+
+    # a line with a single clue reads as the clue itself
+    if isinstance(puzzle, tuple) and len(puzzle) > 0 and isinstance(puzzle[0], int):
+        puzzle = [puzzle]
+    return None, puzzle
+
+
+def read_puzzles(lines, line_format):
+    """
+    Reading the puzzles out of the lines of a puzzles file, skipping
+    empty lines and lines starting with #
+    :param lines: an iterable of lines
+    :param line_format: JSONL_FORMAT or TEXT_FORMAT
+    :return: a generator of (puzzle id, clues), where the id is the line
+    number if the line doesn't have one
+    """
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if len(line) == 0 or line.startswith("#"):
+            continue
+        puzzle_id, clues = parse_line(line, line_format)
+        yield (line_number if puzzle_id is None else puzzle_id), clues
+
+
+def check_clues(clues):
+    """
+    Checking that clues can be used to build a Board
+    :param clues: the clues to check
+    :return: the clues, as a list of tuples
+    """
+    if not isinstance(clues, (list, tuple)) or len(clues) == 0:
+        raise ValueError("a puzzle must be a non empty list of clues")
+    checked = []
+    for clue in clues:
+        if not isinstance(clue, (list, tuple)) or len(clue) != CLUE_LENGTH or \
+                not all(isinstance(number, int) and not isinstance(number, bool) for number in clue):
+            raise ValueError("a clue must be 5 numbers: " + repr(clue))
+        if clue[2] not in (HORIZONTAL, VERTICAL) or clue[1] <= 0 or clue[3] < 0 or clue[4] < 0:
+            raise ValueError("illegal clue: " + repr(clue))
+        checked.append(tuple(clue))
+    return checked
+
+
+def get_cache(cache):
+    """
+    :param cache: the path of a solution cache and its size, None for no cache
+    :return: the SolutionCache, opened once for each process, None for no cache
+    """
+    if cache is None:
+        return None
+    if cache not in open_caches:
+        open_caches[cache] = SolutionCache(*cache)
+        # writing the use times of the last hits when the process exits, workers included
+        multiprocessing.util.Finalize(None, open_caches[cache].close, exitpriority=0)
+    return open_caches[cache]
+
+
+def solve_puzzle(puzzle_id, clues, timeout=None, count_limit=None, with_stats=False, cache=None, decompose=False,
+                 max_boards=None, should_stop=None, biggest_num=BIGGEST_NUM):
+    """
+    Solving a single puzzle, never raising
+    :param puzzle_id: the id to put in the result
+    :param clues: the clues of the puzzle
+    :param timeout: the seconds to give up after, None to never give up. The search
+    checks it between boards, so building the board and its first propagation,
+    which can take long on huge puzzles, aren't cut short by it
+    :param count_limit: if given, the solutions are counted up to this number,
+    and the result also holds the count and whether the puzzle has a single solution
+    :param with_stats: True to add the SolverStats of the solve to the result, as a dict
+    :param cache: the path of a solution cache and its size, to look the puzzle
+    up in before solving it and to add it to after. Not used when counting solutions,
+    or with digits other than the usual ones, which the cache doesn't tell apart
+    :param decompose: True to solve apart the groups of tiles that share no constraint
+    :param max_boards: the number of boards to give up after, None to never give up.
+    Only used when neither counting nor decomposing
+    :param should_stop: a function to give up when it returns True, as in search_trail.
+    Only used when neither counting nor decomposing
+    :param biggest_num: the biggest number the tiles may hold
+    :return: a dict with the id, the status, the solution, the number of
+    used boards and the seconds it took (and the error, if there was one)
+    """
+    start = time.perf_counter()
+    result = {"id": puzzle_id, "status": STATUS_ERROR, "solution": None, "used_boards": 0}
+    stats = SolverStats() if with_stats else None
+    try:
+        clues = check_clues(clues)
+        solution_cache = get_cache(cache) if count_limit is None and biggest_num == BIGGEST_NUM else None
+        if solution_cache is not None:
+            found, solution = solution_cache.get_solution(clues)
+            if found:
+                result["status"] = STATUS_UNSOLVABLE if solution is None else STATUS_SOLVED
+                result["solution"] = solution
+                result["cached"] = True
+                result["seconds"] = time.perf_counter() - start
+                return result
+
+        board = Board(clues, biggest_num)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if count_limit is None:
+            if decompose:
+                solved, num_used_boards = search_components(board, deadline, stats)
+            else:
+                # a single search_trail gets stuck on many big generated puzzles, which the restarts cut short
+                solved, num_used_boards = search_restarts(board, deadline, max_boards, stats,
+                                                          should_stop=should_stop)
+            solution = None if solved is None else solved.get_solution()
+            if solution_cache is not None:
+                solution_cache.put_solution(clues, solution)
+        else:
+            counted = count_solutions(board, count_limit, 1, deadline, stats, decompose)
+            num_used_boards = counted["used_boards"]
+            solution = counted["solutions"][0] if counted["count"] > 0 else None
+            result["count"] = counted["count"]
+            result["unique"] = counted["count"] == 1 and counted["exhausted"]
+        result["used_boards"] = num_used_boards
+        if solution is None:
+            result["status"] = STATUS_UNSOLVABLE
+        else:
+            result["status"] = STATUS_SOLVED
+            result["solution"] = solution
+    except SearchTimeout as timed_out:
+        result["status"] = STATUS_TIMEOUT
+        result["used_boards"] = timed_out.num_used_boards
+    except Exception as error:
+        result["error"] = repr(error)
+    if stats is not None:
+        result["stats"] = stats.as_dict()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def solve_chunk(chunk, timeout, count_limit, with_stats, cache, decompose, biggest_num=BIGGEST_NUM):
+    """
+    Solving a few puzzles in a row, the unit of work given to a worker
+    :param chunk: a list of (puzzle id, clues)
+    :param timeout: the seconds to give up on each puzzle after, as in solve_puzzle
+    :param count_limit: the number of solutions to count up to, as in solve_puzzle
+    :param with_stats: True to add the statistics to the results
+    :param cache: the solution cache, as in solve_puzzle
+    :param decompose: True to solve apart the groups of tiles that share no constraint
+    :param biggest_num: the biggest number the tiles may hold
+    :return: the list of results
+    """
+    return [solve_puzzle(puzzle_id, clues, timeout, count_limit, with_stats, cache, decompose,
+                         biggest_num=biggest_num)
+            for puzzle_id, clues in chunk]
+
+
+def make_chunks(puzzles, chunksize):
+    """
+    :param puzzles: an iterable of (puzzle id, clues)
+    :param chunksize: the number of puzzles in each chunk
+    :return: a generator of lists of (puzzle id, clues)
+    """
+    chunk = []
+    for puzzle in puzzles:
+        chunk.append(puzzle)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if len(chunk) > 0:
+        yield chunk
+
+
+def error_results(chunk, error):
+    """
+    :param chunk: a list of (puzzle id, clues)
+    :param error: the exception the chunk failed with
+    :return: the list of error results of its puzzles
+    """
+    return [{"id": puzzle_id, "status": STATUS_ERROR, "solution": None,
+             "used_boards": 0, "seconds": 0.0, "error": repr(error)}
+            for puzzle_id, _ in chunk]
+
+
+def solve_many(puzzles, workers=None, timeout=None, ordered=True, chunksize=1, count_limit=None,
+               with_stats=False, cache=None, decompose=False, biggest_num=BIGGEST_NUM):
+    """
+    Solving puzzles on a pool of processes, reading them only as fast as they're solved.
+    When a worker dies the pool can't be used anymore, so a new pool is started and
+    the chunks that were waiting on the old one are submitted again, one at a time to
+    find the one that killed it, which is given up as errors after MAX_RESUBMITS tries
+    :param puzzles: an iterable of (puzzle id, clues)
+    :param workers: the number of processes, all the cpus if None.
+    With a single worker the puzzles are solved in this process
+    :param timeout: the seconds to give up on each puzzle after, None to never give up.
+    Like in solve_puzzle it's only checked by the search, a worker is never stopped
+    :param ordered: True to yield the results in the order of the puzzles,
+    False to yield them as soon as they're solved
+    :param chunksize: the number of puzzles given to a worker at once
+    :param count_limit: the number of solutions to count up to, as in solve_puzzle
+    :param with_stats: True to add the statistics to the results
+    :param cache: the solution cache, as in solve_puzzle
+    :param decompose: True to solve apart the groups of tiles that share no constraint
+    :param biggest_num: the biggest number the tiles may hold
+    :return: a generator of the results, as returned by solve_puzzle
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        for puzzle_id, clues in puzzles:
+            yield solve_puzzle(puzzle_id, clues, timeout, count_limit, with_stats, cache, decompose,
+                               biggest_num=biggest_num)
+        return
+
+    chunks = enumerate(make_chunks(puzzles, chunksize))
+    max_pending = workers * PENDING_PER_WORKER
+    executor = ProcessPoolExecutor(workers)
+    try:
+        # the submitted chunks, and the solved ones waiting for an earlier chunk
+        pending = {}
+        finished = {}
+        # the chunks of a broken pool to submit again, and how many times they were submitted again
+        resubmit = deque()
+        num_resubmits = {}
+        next_to_yield = 0
+        exhausted = False
+        while True:
+            broken = False
+            while True:
+                if len(resubmit) > 0:
+                    # alone on the pool, so that if it breaks again it's the chunk that broke it.
+                    # It was already counted in max_pending before
+                    if len(pending) > 0:
+                        break
+                    chunk_index, chunk = resubmit.popleft()
+                elif not exhausted and len(pending) + len(finished) < max_pending:
+                    chunk_index, chunk = next(chunks, (None, None))
+                    if chunk is None:
+                        exhausted = True
+                        continue
+                else:
+                    break
+                try:
+                    future = executor.submit(solve_chunk, chunk, timeout, count_limit, with_stats, cache, decompose,
+                                             biggest_num)
+                except BrokenProcessPool:
+                    resubmit.appendleft((chunk_index, chunk))
+                    broken = True
+                    break
+                pending[future] = (chunk_index, chunk)
+                if chunk_index in num_resubmits:
+                    break
+            if len(pending) == 0 and not broken:
+                break
+
+            # once the pool is broken all its futures fail, so they're all waited for
+            done = wait(pending, return_when=FIRST_COMPLETED)[0] if not broken else set(pending)
+            while len(done) > 0:
+                for future in done:
+                    chunk_index, chunk = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool as error:
+                        broken = True
+                        if num_resubmits.get(chunk_index, 0) < MAX_RESUBMITS:
+                            num_resubmits[chunk_index] = num_resubmits.get(chunk_index, 0) + 1
+                            resubmit.append((chunk_index, chunk))
+                            continue
+                        results = error_results(chunk, error)
+                    except Exception as error:
+                        results = error_results(chunk, error)
+                    if ordered:
+                        finished[chunk_index] = results
+                    else:
+                        yield from results
+                done = wait(pending)[0] if broken else ()
+
+            if broken:
+                executor.shutdown(wait=True)
+                executor = ProcessPoolExecutor(workers)
+                resubmit = deque(sorted(resubmit))
+
+            while next_to_yield in finished:
+                yield from finished.pop(next_to_yield)
+                next_to_yield += 1
+    finally:
+        executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of kakuro puzzles on a pool of processes")
+    parser.add_argument("puzzles", help="the puzzles file, - to read from the standard input")
+    parser.add_argument("-o", "--output", help="the results file, the standard output if not given")
+    parser.add_argument("-f", "--format", choices=[JSONL_FORMAT, TEXT_FORMAT],
+                        help="the puzzles file format, by its extension if not given")
+    parser.add_argument("-j", "--workers", type=int, help="the number of processes, all the cpus if not given")
+    parser.add_argument("-t", "--timeout", type=float, help="the seconds to give up on each puzzle after")
+    parser.add_argument("--chunksize", type=int, default=1, help="the number of puzzles given to a worker at once")
+    parser.add_argument("--count-limit", type=int,
+                        help="count the solutions up to this number, 2 to check that each puzzle has a single one")
+    parser.add_argument("--stats", action="store_true", help="add the solver statistics to each result")
+    parser.add_argument("--cache", help="an SQLite file of solutions to reuse, and to add the new ones to")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="the number of puzzles the cache keeps")
+    parser.add_argument("--decompose", action="store_true",
+                        help="solve apart the groups of tiles that share no constraint, "
+                             "and multiply their numbers of solutions when counting")
+    parser.add_argument("--unordered", action="store_true",
+                        help="write the results as soon as they're solved, not in the input order")
+    parser.add_argument("--biggest", type=int, default=BIGGEST_NUM,
+                        help="the biggest digit the tiles may hold, 16 for hex kakuro")
+    args = parser.parse_args(argv)
+
+    line_format = args.format
+    if line_format is None:
+        line_format = JSONL_FORMAT if args.puzzles.endswith((".jsonl", ".json")) else TEXT_FORMAT
+
+    puzzles_file = sys.stdin if args.puzzles == "-" else open(args.puzzles)
+    output_file = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        puzzles = read_puzzles(puzzles_file, line_format)
+        cache = None if args.cache is None else (args.cache, args.cache_size)
+        for result in solve_many(puzzles, args.workers, args.timeout, not args.unordered,
+                                 args.chunksize, args.count_limit, args.stats, cache, args.decompose,
+                                 args.biggest):
+            output_file.write(json.dumps(result) + "\n")
+            output_file.flush()
+    finally:
+        for solution_cache in open_caches.values():
+            solution_cache.close()
+        if puzzles_file is not sys.stdin:
+            puzzles_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
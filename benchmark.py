@@ -0,0 +1,293 @@
+"""
+Benchmarking the solvers on a graded corpus of puzzles.
+The corpus is the EXAMPLE boards of kakuro.py and benchmarks/corpus.jsonl.
+For every solver and grade it reports the median and 95th percentile solve
+time, the boards per second, the peak memory and the solves that timed out.
+Every puzzle is solved once before it's timed, so the caches the solves
+share, like the combinations, are filled outside of the timings. The results
+can be saved as JSON, and compared against saved results of an earlier run
+to fail when a solver got slower or needs more boards:
+
+python benchmark.py --output benchmarks/baseline.json
+python benchmark.py --baseline benchmarks/baseline.json
+
+Times only compare between runs on the same machine
+"""
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import kakuro
+from backjump import search_backjump
+from board import Board
+from kakuro import search_copies, search_trail, search_components, SearchTimeout, BRANCH_ADAPTIVE
+from ordering import search_ordered, search_restarts, VARIABLE_DOM_WDEG, VALUE_LCV, VALUE_RUN_SUM, \
+    RESTART_GEOMETRIC
+
+try:
+    from vector_board import VectorBoard, search_vector
+except ImportError:
+    # NumPy isn't installed, so there's no vector solver to benchmark
+    VectorBoard = None
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "corpus.jsonl")
+EXAMPLES_GRADE = "examples"
+EXAMPLES = ("EXAMPLE_0", "EXAMPLE_1", "EXAMPLE_2", "EXAMPLE_3")
+
+# the solvers to compare, by name: the search function, taking a board and a deadline,
+# the grades to run it on (None for all of them), and the class of its boards
+SOLVERS = {
+    "copies": (search_copies, (EXAMPLES_GRADE, "small", "medium"), Board),
+    "trail": (search_trail, None, Board),
+    "adaptive": (functools.partial(search_trail, branching=BRANCH_ADAPTIVE), None, Board),
+    "components": (search_components, None, Board),
+    "backjump": (search_backjump, None, Board),
+    "dom_wdeg": (functools.partial(search_ordered, variable=VARIABLE_DOM_WDEG), None, Board),
+    # the value orderings alone get stuck on some of the hard and huge puzzles
+    "lcv": (functools.partial(search_ordered, value=VALUE_LCV), (EXAMPLES_GRADE, "small", "medium", "large"), Board),
+    "run_sum": (functools.partial(search_ordered, value=VALUE_RUN_SUM), (EXAMPLES_GRADE, "small", "medium", "large"),
+                Board),
+    "luby": (search_restarts, None, Board),
+    "geometric": (functools.partial(search_restarts, restarts=RESTART_GEOMETRIC), None, Board),
+}
+if VectorBoard is not None:
+    SOLVERS["vector"] = (search_vector, (EXAMPLES_GRADE, "small"), VectorBoard)
+
+# the solvers only run when asked for by name, since they're too slow to compare on every run
+EXPERIMENTAL_SOLVERS = {"vector"}
+
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_TIMEOUT = 60
+P95 = 0.95
+
+
+def load_corpus(path=CORPUS_FILE):
+    """
+    :param path: the corpus file, a JSONL file of objects with an id, a grade and clues
+    :return: a list of the puzzles as dicts, starting with the EXAMPLE boards
+    """
+    corpus = [{"id": name.lower(), "grade": EXAMPLES_GRADE, "clues": getattr(kakuro, name)}
+              for name in EXAMPLES]
+    with open(path) as corpus_file:
+        for line in corpus_file:
+            if len(line.strip()) > 0:
+                corpus.append(json.loads(line))
+    return corpus
+
+
+def percentile(values, fraction):
+    """
+    :param values: a non empty list of numbers
+    :param fraction: the fraction of the values to be under the result, between 0 and 1
+    :return: the smallest value with at least this fraction of the values under or at it
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(fraction * len(ordered) + 0.999999) - 1))
+    return ordered[index]
+
+
+def measure_puzzle(search, clues, repeat, board_class=Board, timeout=DEFAULT_TIMEOUT):
+    """
+    Solving a puzzle once to warm up, a few times timed, and once more to measure
+    its memory. A solve reaching the timeout ends the measures of the puzzle
+    :param search: the search function, as in SOLVERS
+    :param clues: the clues of the puzzle
+    :param repeat: the number of timed solves, at least 1
+    :param board_class: the class of the boards the search takes
+    :param timeout: the seconds to give up on each solve after, None to never give up
+    :return: a dict with the times of the solves, the used boards,
+    whether it was solved, whether it timed out and the peak memory
+    """
+    if repeat < 1:
+        raise ValueError("a puzzle needs at least one timed solve, not %r" % repeat)
+    times = []
+    for index in range(repeat + 1):
+        board = board_class(clues)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        start = time.perf_counter()
+        try:
+            solved, num_used_boards = search(board, deadline=deadline)
+        except SearchTimeout as timed_out:
+            return {"seconds": [time.perf_counter() - start],
+                    "used_boards": timed_out.num_used_boards,
+                    "solved": False,
+                    "timed_out": True,
+                    "peak_memory": 0}
+        # the first solve fills the caches, it isn't timed
+        if index > 0:
+            times.append(time.perf_counter() - start)
+
+    # measured apart, since tracing the memory slows the solve down
+    tracemalloc.start()
+    try:
+        search(board_class(clues), deadline=None if timeout is None else time.monotonic() + timeout)
+    except SearchTimeout:
+        pass
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": times,
+            "used_boards": num_used_boards,
+            "solved": solved is not None,
+            "timed_out": False,
+            "peak_memory": peak_memory}
+
+
+def spread(times):
+    """
+    :param times: the times of the solves of a puzzle
+    :return: how far apart they are, as a fraction of the fastest one
+    """
+    fastest = min(times)
+    return (max(times) - fastest) / fastest if fastest > 0 else 0.0
+
+
+def summarize(puzzle_results):
+    """
+    :param puzzle_results: a list of the results of measure_puzzle
+    :return: the median and 95th percentile time over all the solves, the boards
+    per second, the peak memory, the number of puzzles that timed out, and the noise:
+    the median spread of the times of a puzzle, as a fraction of its fastest time
+    """
+    times = [seconds for result in puzzle_results for seconds in result["seconds"]]
+    total_boards = sum(result["used_boards"] * len(result["seconds"]) for result in puzzle_results)
+    return {"puzzles": len(puzzle_results),
+            "median_seconds": statistics.median(times),
+            "p95_seconds": percentile(times, P95),
+            "boards_per_second": total_boards / sum(times) if sum(times) > 0 else 0.0,
+            "peak_memory": max(result["peak_memory"] for result in puzzle_results),
+            "timeouts": sum(1 for result in puzzle_results if result["timed_out"]),
+            "noise": statistics.median(spread(result["seconds"]) for result in puzzle_results)}
+
+
+def run_benchmark(corpus, solver_names=None, grades=None, repeat=DEFAULT_REPEAT, timeout=DEFAULT_TIMEOUT):
+    """
+    :param corpus: a list of puzzles, as returned by load_corpus
+    :param solver_names: the names of the SOLVERS to run, all but the EXPERIMENTAL_SOLVERS if None
+    :param grades: the grades of puzzles to run, all of them if None
+    :param repeat: the number of timed solves of every puzzle
+    :param timeout: the seconds to give up on each solve after, None to never give up
+    :return: the results, as a dict that can be saved as JSON
+    """
+    results = {"machine": platform.platform(), "python": platform.python_version(),
+               "repeat": repeat, "timeout": timeout, "solvers": {}}
+    if solver_names is None:
+        solver_names = [name for name in SOLVERS if name not in EXPERIMENTAL_SOLVERS]
+    for name in solver_names:
+        search, solver_grades, board_class = SOLVERS[name]
+        puzzles = {}
+        by_grade = {}
+        for puzzle in corpus:
+            grade = puzzle["grade"]
+            if (grades is not None and grade not in grades) or \
+                    (solver_grades is not None and grade not in solver_grades):
+                continue
+            puzzles[puzzle["id"]] = measure_puzzle(search, puzzle["clues"], repeat, board_class, timeout)
+            by_grade.setdefault(grade, []).append(puzzles[puzzle["id"]])
+        results["solvers"][name] = {"puzzles": puzzles,
+                                    "grades": {grade: summarize(grade_results)
+                                               for grade, grade_results in by_grade.items()}}
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Comparing results against the baseline results of an earlier run. A median
+    time may also grow by the noise of the grade in either run, since the times
+    of the small grades vary more between solves than the tolerance
+    :param results: the results of run_benchmark
+    :param baseline: the baseline results, of the same form
+    :param tolerance: the fraction a median time or a number of boards may grow by
+    :return: a list of messages describing each regression, empty if there's none
+    """
+    regressions = []
+    for name, solver_results in results["solvers"].items():
+        if name not in baseline["solvers"]:
+            continue
+        baseline_solver = baseline["solvers"][name]
+        for grade, summary in solver_results["grades"].items():
+            if grade not in baseline_solver["grades"]:
+                continue
+            old_summary = baseline_solver["grades"][grade]
+            old_median = old_summary["median_seconds"]
+            noise = max(summary.get("noise", 0.0), old_summary.get("noise", 0.0))
+            if summary["median_seconds"] > old_median * (1 + tolerance + noise):
+                regressions.append("%s on %s: median %.4fs, was %.4fs"
+                                   % (name, grade, summary["median_seconds"], old_median))
+        for puzzle_id, puzzle in solver_results["puzzles"].items():
+            if puzzle_id not in baseline_solver["puzzles"]:
+                continue
+            old_puzzle = baseline_solver["puzzles"][puzzle_id]
+            if old_puzzle["solved"] and not puzzle["solved"]:
+                regressions.append("%s on %s: %s" % (name, puzzle_id, "timed out" if puzzle.get("timed_out")
+                                                     else "not solved anymore"))
+            elif puzzle["used_boards"] > old_puzzle["used_boards"] * (1 + tolerance):
+                regressions.append("%s on %s: %d boards, was %d"
+                                   % (name, puzzle_id, puzzle["used_boards"], old_puzzle["used_boards"]))
+    return regressions
+
+
+def print_results(results, output_file=sys.stdout):
+    """
+    Printing a table of the summary of every solver and grade
+    :param results: the results of run_benchmark
+    :param output_file: the file to print to
+    """
+    print("%-10s %-9s %7s %12s %12s %14s %12s %8s" % ("solver", "grade", "puzzles", "median (s)",
+                                                      "p95 (s)", "boards/second", "peak memory", "timeouts"),
+          file=output_file)
+    for name, solver_results in results["solvers"].items():
+        for grade, summary in solver_results["grades"].items():
+            print("%-10s %-9s %7d %12.4f %12.4f %14.0f %12d %8d" % (name, grade, summary["puzzles"],
+                                                                    summary["median_seconds"],
+                                                                    summary["p95_seconds"],
+                                                                    summary["boards_per_second"],
+                                                                    summary["peak_memory"],
+                                                                    summary["timeouts"]),
+                  file=output_file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the kakuro solvers on a graded corpus")
+    parser.add_argument("--corpus", default=CORPUS_FILE, help="the corpus JSONL file")
+    parser.add_argument("--solvers", help="comma separated solver names, all but the experimental ones if not "
+                                          "given: " + ",".join(SOLVERS))
+    parser.add_argument("--grades", help="comma separated grades to run, all of them if not given")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed solves of every puzzle, at least 1")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="the seconds to give up on each solve after, 0 to never give up")
+    parser.add_argument("--output", help="a file to save the results to, as JSON")
+    parser.add_argument("--baseline", help="a results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="the fraction a median time or a number of boards may grow by")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    solver_names = None if args.solvers is None else args.solvers.split(",")
+    grades = None if args.grades is None else args.grades.split(",")
+    results = run_benchmark(load_corpus(args.corpus), solver_names, grades, args.repeat, args.timeout or None)
+    print_results(results)
+
+    if args.output is not None:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=1)
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION:", regression, file=sys.stderr)
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,13 @@
 import copy
+from collections import deque
+from functools import lru_cache
+
+from domain import BIGGEST_NUM, MAX_BIGGEST_NUM, FULL_MASK, EMPTY_MASK, DIGIT_BITS, \
+    full_mask, mask_digits, mask_sum, mask_from_digits, mask_to_digits
+from combinations import get_combinations, combinations_between, num_combinations, iter_combinations, \
+    may_contain, must_contain
+from transposition import zobrist_tables, mask_key
 
-BIGGEST_NUM = 9
 TILE_START_VALUE = "#"
 
 INDEX_SUM = 0
@@ -9,8 +16,6 @@ INDEX_ORIENTATION = 2
 INDEX_START_X = 3
 INDEX_START_Y = 4
 
-ALL_NUMBERS = [i for i in range(1, BIGGEST_NUM + 1)]
-BASE_SET = set(ALL_NUMBERS)
 HORIZONTAL = 0
 VERTICAL = 1
 EMPTY_S = "X"
@@ -22,7 +27,16 @@ SEPARATE = '>'
 X_INDEX = 0
 Y_INDEX = 1
 
-possible_dict = {}
+# the names the propagators report their prunings under
+PROPAGATOR_PLACEMENT = "placement"
+PROPAGATOR_TWO_TILES = "two_tiles"
+PROPAGATOR_ARC = "arc_consistency"
+PROPAGATOR_NOGOOD = "nogood"
+PROPAGATOR_COMBINATION = "combination"
+
+# the most open tiles assignment_support spreads numbers over by the sets of
+# numbers they use, longer runs are spread by matching_support
+MAX_SUBSET_TILES = 4
 
 
 class Tile:
@@ -32,21 +46,42 @@ class Tile:
     just to place a single number
     """
 
-    def __init__(self, row, col):
+    __slots__ = ("row", "col", "index", "visited", "value", "poss_mask", "constraints", "reason")
+
+    def __init__(self, row, col, index=0, poss_mask=FULL_MASK):
         """
         Constructor of a new tile
         :param row: the x coordinate
         :param col: the y coordinate
+        :param index: the dense id of this tile on its board, from 0
+        :param poss_mask: the mask of every number of the board
         """
 
         self.row = row
         self.col = col
+        self.index = index
         self.visited = False
         self.value = TILE_START_VALUE
 
-        # set of the numbers 1 to the biggest possible number
-        self.poss_values = ALL_NUMBERS
-        self.constraints = set()
+        # mask of the numbers 1 to the biggest possible number
+        self.poss_mask = poss_mask
+        self.constraints = ()
+
+        # a mask of the search levels (bit d for the choice made at depth d)
+        # whose choices removed values from this tile, when the board explains its changes
+        self.reason = 0
+
+    def __copy__(self):
+        """
+        :return: a new tile with the same state, sharing the tuple of constraints
+        """
+        new_tile = Tile.__new__(Tile)
+        new_tile.row = self.row
+        new_tile.col = self.col
+        new_tile.index = self.index
+        new_tile.constraints = self.constraints
+        new_tile.poss_mask, new_tile.value, new_tile.visited, new_tile.reason = self.get_state()
+        return new_tile
 
     def get_row(self):
         """
@@ -60,6 +95,18 @@ class Tile:
         """
         return self.col
 
+    def get_index(self):
+        """
+        :return: the dense id of this tile on its board
+        """
+        return self.index
+
+    def get_location(self):
+        """
+        :return: the (row, col) of this tile
+        """
+        return self.row, self.col
+
     def get_value(self):
         """
         :return: this tile's value
@@ -76,7 +123,13 @@ class Tile:
         """
         :return: the possible values for this tile
         """
-        return self.poss_values
+        return mask_to_digits(self.poss_mask)
+
+    def possible_mask(self):
+        """
+        :return: the possible values for this tile, as a mask
+        """
+        return self.poss_mask
 
     def set_value(self, value):
         """
@@ -84,7 +137,7 @@ class Tile:
         :param value: the number we wish to put in this tile
         """
         self.value = value
-        self.poss_values = [value]
+        self.poss_mask = DIGIT_BITS[value]
         self.visited = True
 
     def add_constraint(self, index):
@@ -92,24 +145,39 @@ class Tile:
         Add a constraint to this tile's constraints
         :param index: the index of the constraint
         """
-        self.constraints.add(index)
+        if index not in self.constraints:
+            self.constraints += (index,)
 
     def get_constraints(self):
         """
-        :return: The set of constraints for this tile
+        :return: The tuple of constraints for this tile
         """
         return self.constraints
 
+    def get_degree(self):
+        """
+        :return: the number of constraints for this tile
+        """
+        return len(self.constraints)
+
     def intersect_possible_values(self, known_values):
         """
         Updating the possible values set
         :param known_values: a list of values to put in our possibles
         """
-        old_values = self.poss_values
-        self.poss_values = []
-        for val in known_values:
-            if val in old_values:
-                self.poss_values.append(val)
+        self.intersect_possible_mask(mask_from_digits(known_values))
+
+    def intersect_possible_mask(self, mask):
+        """
+        Updating the possible values mask
+        :param mask: a mask of values to keep in our possibles
+        :return: True if some value got removed
+        """
+        new_mask = self.poss_mask & mask
+        if new_mask == self.poss_mask:
+            return False
+        self.poss_mask = new_mask
+        return True
 
     def remove_value_from_possible(self, value):
         """
@@ -117,16 +185,38 @@ class Tile:
         :param value: the number to remove
         :return: True if this number was a possibility and got removed
         """
-        if value not in self.poss_values:
-            return False
-        self.poss_values.remove(value)
-        return True
+        return self.intersect_possible_mask(~DIGIT_BITS[value])
 
     def num_possible(self):
         """
         :return: the number of possible constraint for this tile
         """
-        return len(self.poss_values)
+        return self.poss_mask.bit_count()
+
+    def get_reason(self):
+        """
+        :return: the mask of the search levels whose choices narrowed this tile
+        """
+        return self.reason
+
+    def set_reason(self, reason):
+        """
+        :param reason: the mask of the search levels whose choices narrowed this tile
+        """
+        self.reason = reason
+
+    def get_state(self):
+        """
+        :return: the part of this tile that changes while solving
+        """
+        return self.poss_mask, self.value, self.visited, self.reason
+
+    def set_state(self, state):
+        """
+        Bringing this tile back to a state returned by get_state
+        :param state: the state to restore
+        """
+        self.poss_mask, self.value, self.visited, self.reason = state
 
 
 class Constraint:
@@ -134,8 +224,12 @@ class Constraint:
     A class representing a constraint for a giving board
     """
 
+    __slots__ = ("total_sum", "num_tiles", "start_tile_row", "start_tile_col", "orientation", "index",
+                 "locations", "tile_ids", "combinations", "possible_ids", "possible_numbers",
+                 "placed_mask", "partial_sum", "unfilled", "violated")
+
     def __init__(self, total_sum, num_tiles, orientation,
-                 start_tile_row, start_tile_col, index):
+                 start_tile_row, start_tile_col, index, biggest_num=BIGGEST_NUM):
         """
         Constructor for a constraint
         :param total_sum: the number to sum up to
@@ -144,6 +238,7 @@ class Constraint:
         :param start_tile_col: the column for this constraint
         :param orientation: vertical or horizontal constraint
         :param index: the serial number of this constraint
+        :param biggest_num: the biggest number the tiles may hold
         """
         self.total_sum = total_sum
         self.num_tiles = num_tiles
@@ -151,28 +246,44 @@ class Constraint:
         self.start_tile_col = start_tile_col
         self.orientation = orientation
         self.index = index
-        self.locations = []
+        self.locations = ()
         self.find_locations()
 
-        # possible values list for this constraint tiles
-        self.possible_sets = []
-        self.possible_numbers = set()
-        options = self.calculate_possible_subsets(total_sum, num_tiles)
-        for option in options:
-            self.possible_sets.append(option)
-            for number in option:
-                self.possible_numbers.add(number)
+        # the dense ids of the tiles at the locations, set by the board
+        self.tile_ids = ()
+
+        # the shared table entry for this sum, and the indexes of the
+        # combinations in it that are still possible for this constraint
+        self.combinations = None
+        self.possible_ids = ()
+        self.possible_numbers = EMPTY_MASK
+        self.set_combinations(get_combinations(total_sum, num_tiles, biggest_num))
+
+        # the running state of the numbers placed in this constraint's tiles
+        self.placed_mask = 0
+        self.partial_sum = 0
+        self.unfilled = num_tiles
+        self.violated = False
 
     def find_locations(self):
         """
         Finding the places of this constraint's tile on the board
         """
         if self.orientation == VERTICAL:
-            for i in range(self.start_tile_row + 1, self.start_tile_row + self.num_tiles + 1):
-                self.locations.append((i, self.start_tile_col))
+            self.locations = tuple((i, self.start_tile_col)
+                                   for i in range(self.start_tile_row + 1, self.start_tile_row + self.num_tiles + 1))
         else:
-            for i in range(self.start_tile_col + 1, self.start_tile_col + self.num_tiles + 1):
-                self.locations.append((self.start_tile_row, i))
+            self.locations = tuple((self.start_tile_row, i)
+                                   for i in range(self.start_tile_col + 1, self.start_tile_col + self.num_tiles + 1))
+
+    def __copy__(self):
+        """
+        :return: a new constraint with the same state, sharing the locations and the combinations
+        """
+        new_constraint = Constraint.__new__(Constraint)
+        for name in Constraint.__slots__:
+            setattr(new_constraint, name, getattr(self, name))
+        return new_constraint
 
     def get_total_sum(self):
         """
@@ -186,12 +297,24 @@ class Constraint:
         """
         return self.locations
 
+    def get_tile_ids(self):
+        """
+        :return: the dense ids of this constraint's tiles on its board, by location
+        """
+        return self.tile_ids
+
     def get_num_tiles(self):
         """
         :return: the number of tile in this constraint
         """
         return self.num_tiles
 
+    def get_orientation(self):
+        """
+        :return: HORIZONTAL or VERTICAL
+        """
+        return self.orientation
+
     def is_in(self, loc):
         """
         Check is loc is under this constraint
@@ -210,45 +333,89 @@ class Constraint:
         """
         :return: the list of possible values for the tiles
         """
-        return self.possible_sets
+        return [mask_to_digits(option) for option in self.get_possible_placement_masks()]
+
+    def get_possible_placement_masks(self):
+        """
+        :return: the list of possible values for the tiles, as masks, enumerated
+        when the combinations of this constraint aren't listed
+        """
+        masks = self.combinations.masks
+        if masks is None:
+            required = self.combinations.must_contain
+            return sorted(rest | required for rest in iter_combinations(
+                self.total_sum - mask_sum(required), self.num_tiles - required.bit_count(),
+                self.possible_numbers & ~required))
+        return [masks[option_id] for option_id in self.possible_ids]
+
+    def get_possible_ids(self):
+        """
+        :return: the indexes of the possible placements in the combinations table entry,
+        and a range as long as the number of placements if the entry isn't listed
+        """
+        return self.possible_ids
+
+    def is_listed(self):
+        """
+        :return: True if the combinations of this constraint are listed, and it
+        keeps the indexes of its possible placements
+        """
+        return self.combinations.masks is not None
+
+    def set_combinations(self, combinations):
+        """
+        Replacing the combinations table entry, with every placement in it possible
+        :param combinations: the entry, as returned by combinations.combinations_between
+        """
+        self.combinations = combinations
+        num_placements = num_combinations(combinations, self.total_sum, self.num_tiles)
+        self.possible_ids = tuple(range(num_placements)) if self.is_listed() else range(num_placements)
+        self.possible_numbers = combinations.may_contain
+
+    def get_required_mask(self):
+        """
+        :return: the numbers that every possible placement holds, as a mask
+        """
+        if not self.is_listed() or len(self.possible_ids) == len(self.combinations.masks):
+            return self.combinations.must_contain
+        return must_contain(self.get_possible_placement_masks())
 
     def get_possible_numbers(self):
         """
         :return: the possible numbers that can be places in this constraint
         """
+        return set(mask_digits(self.possible_numbers))
+
+    def get_possible_mask(self):
+        """
+        :return: the possible numbers that can be places in this constraint, as a mask
+        """
         return self.possible_numbers
 
-    def calculate_possible_subsets(self, total_sum, num_tiles):
-        if total_sum < num_tiles or total_sum <= 0 or num_tiles <= 0:
-            return []
-        if (total_sum, num_tiles) in possible_dict:
-            return possible_dict[(total_sum, num_tiles)]
-        possible_dict[(total_sum, num_tiles)] = []
-        if num_tiles == 1:
-            if total_sum > BIGGEST_NUM:
-                return []
-            possible_dict[(total_sum, num_tiles)].append([total_sum])
-            return possible_dict[(total_sum, num_tiles)]
-        cur_possible = set()
-        for i in range(1, BIGGEST_NUM + 1):
-            sub_options = self.calculate_possible_subsets(total_sum - i, num_tiles - 1)
-            for option in sub_options:
-                if i in option:
-                    continue
-                new_option = (tuple(sorted([i] + option)))
-                cur_possible.add(new_option)
-            i += 1
-        for option in cur_possible:
-            possible_dict[(total_sum, num_tiles)].append(list(option))
-        return possible_dict[(total_sum, num_tiles)]
+    @staticmethod
+    def calculate_possible_subsets(total_sum, num_tiles, biggest_num=BIGGEST_NUM):
+        """
+        :param total_sum: the number to sum up to
+        :param num_tiles: number of tiles to sum
+        :param biggest_num: the biggest number to use
+        :return: a new list of every list of distinct numbers summing up to total_sum
+        """
+        return [mask_to_digits(option)
+                for option in sorted(iter_combinations(total_sum, num_tiles, full_mask(biggest_num)))]
 
     def remove_placement(self, placement):
-        if placement in self.possible_sets:
-            self.possible_sets.remove(placement)
-            self.possible_numbers = set()
-            for option in self.possible_sets:
-                for number in option:
-                    self.possible_numbers.add(number)
+        """
+        Remove a single possibility, and updates the possible numbers. The placements
+        of a constraint whose combinations aren't listed are all kept, as in placements_between
+        :param placement: the list of numbers to remove
+        :return: True if the possibility got removed
+        """
+        placement = mask_from_digits(placement)
+        masks = self.combinations.masks
+        if masks is None:
+            return False
+        return self.set_possible_placements(tuple(option_id for option_id in self.possible_ids
+                                                  if masks[option_id] != placement))
 
     def remove_placements_without_numbers(self, numbers):
         """
@@ -256,16 +423,121 @@ class Constraint:
         and updates the possible numbers
         :param numbers: the numbers we know are in this constraint
         """
-        for possibility in self.possible_sets:
-            for number in numbers:
-                if number not in possibility:
-                    self.possible_sets.remove(possibility)
-                    break
+        self.remove_placements_without_mask(mask_from_digits(numbers))
+
+    def remove_placements_without_mask(self, mask):
+        """
+        Remove all the possibilities that don't hold every number of mask
+        :param mask: the numbers we know are in this constraint
+        :return: True if some possibility got removed
+        """
+        return self.set_possible_placements(self.placements_with_mask(mask))
+
+    def remove_placements_outside_mask(self, mask):
+        """
+        Remove all the possibilities using a number that is not in mask
+        :param mask: the numbers that can still be placed in this constraint
+        :return: True if some possibility got removed
+        """
+        return self.set_possible_placements(self.placements_within_mask(mask))
+
+    def placements_with_mask(self, mask):
+        """
+        :param mask: the numbers we know are in this constraint
+        :return: the indexes of the possible placements that hold every number of mask
+        """
+        return self.placements_between(mask, self.combinations.may_contain)
+
+    def placements_within_mask(self, mask):
+        """
+        :param mask: the numbers that can still be placed in this constraint
+        :return: the indexes of the possible placements using only numbers of mask
+        """
+        return self.placements_between(0, mask)
+
+    def placements_between(self, required, allowed):
+        """
+        :param required: the numbers we know are in this constraint
+        :param allowed: the numbers that can still be placed in this constraint
+        :return: the indexes of the possible placements holding every number of
+        required, and using only numbers of allowed. The placements of a constraint
+        whose combinations aren't listed are all kept, until it gets its entry
+        of the combinations left from set_combinations
+        """
+        masks = self.combinations.masks
+        if masks is None:
+            return self.possible_ids
+        return tuple(option_id for option_id in self.possible_ids
+                     if masks[option_id] & required == required and masks[option_id] & ~allowed == 0)
+
+    def set_possible_placements(self, placements):
+        """
+        Replacing the possible placements, and updates the possible numbers
+        :param placements: the indexes of the placements that are still possible
+        :return: True if some possibility got removed
+        """
+        if len(placements) == len(self.possible_ids):
+            return False
+        self.possible_ids = placements
+        masks = self.combinations.masks
+        self.possible_numbers = may_contain(masks[option_id] for option_id in placements)
+        return True
+
+    def get_state(self):
+        """
+        :return: the part of this constraint that changes while solving
+        """
+        return (self.combinations, self.possible_ids, self.possible_numbers,
+                self.placed_mask, self.partial_sum, self.unfilled, self.violated)
 
-        self.possible_numbers = set()
-        for possibility in self.possible_sets:
-            for number in possibility:
-                self.possible_numbers.add(number)
+    def set_state(self, state):
+        """
+        Bringing this constraint back to a state returned by get_state
+        :param state: the state to restore
+        """
+        (self.combinations, self.possible_ids, self.possible_numbers,
+         self.placed_mask, self.partial_sum, self.unfilled, self.violated) = state
+
+    def place_number(self, value):
+        """
+        Updating the running state after value was placed in one of this constraint's tiles
+        :param value: the placed number
+        :return: True if the placed numbers now break this constraint:
+        a repeated number, a sum too big, or all tiles filled with a wrong sum
+        """
+        value_bit = DIGIT_BITS[value]
+        if self.placed_mask & value_bit:
+            self.violated = True
+        self.placed_mask |= value_bit
+        self.partial_sum += value
+        self.unfilled -= 1
+        if self.partial_sum > self.total_sum or (self.unfilled == 0 and self.partial_sum != self.total_sum):
+            self.violated = True
+        return self.violated
+
+    def is_violated(self):
+        """
+        :return: True if the numbers placed in this constraint's tiles break it
+        """
+        return self.violated
+
+    def get_placed_mask(self):
+        """
+        :return: the numbers placed in this constraint's tiles, as a mask
+        """
+        return self.placed_mask
+
+    def get_partial_sum(self):
+        """
+        :return: the sum of the numbers placed in this constraint's tiles
+        """
+        return self.partial_sum
+
+    def get_unfilled(self):
+        """
+        :return: the number of this constraint's tiles without a number
+        """
+        return self.unfilled
 
     def __str__(self):
         """
@@ -282,39 +554,88 @@ class Board:
     This class represent a single game board
     """
 
-    def __init__(self, constraints):
+    def __init__(self, constraints, biggest_num=BIGGEST_NUM):
         """
         Constructs a new board
         :param constraints: list of constraints to place on this boars
+        :param biggest_num: the biggest number the tiles may hold, from 1 to MAX_BIGGEST_NUM
         """
+        if not 1 <= biggest_num <= MAX_BIGGEST_NUM:
+            raise ValueError("the biggest number must be between 1 and %d, not %r" % (MAX_BIGGEST_NUM, biggest_num))
+        self.biggest_num = biggest_num
+        self.full_mask = full_mask(biggest_num)
         self.dimensions = self.choose_board_dimensions(constraints)
         self.serial_num = BASE_SER_NUM
 
         self.tiles = {}
         self.constraints = {}
 
+        # the tiles by their dense id, which the constraints point at their tiles with
+        self.tiles_by_id = []
+
+        # when not None, every change made while solving is recorded here
+        # as (tile or constraint, old state), so it can be undone
+        self.trail = None
+
+        # when not None, a stats.SolverStats the propagation reports to
+        self.stats = None
+
+        # the indexes of the constraints to revise, since some of their tiles changed
+        self.pending = deque()
+        self.queued = set()
+
+        # when True, every narrowed tile gets the search levels that caused it
+        # (see Tile.reason), and a failure adds the levels that caused it to conflict
+        self.explain = False
+        self.conflict = 0
+
+        # the index of the last constraint found broken, for the orderings that learn from failures
+        self.failed_constraint = None
+
+        # when not None, a backjump.NogoodStore checked on every placement
+        self.nogoods = None
+
+        # when not None, the Zobrist tables of the tiles (see transposition.py),
+        # and hash_key is the key of the possible values of all the tiles
+        self.hash_tables = None
+        self.hash_key = 0
+
         # adding each constraint onto the board
         for constraint in constraints:
             self.add_const(constraint)
+        for const_index in self.constraints:
+            self.schedule_constraint(const_index)
+
+        # counters kept up to date by place_tile, for constant time checks
+        self.num_unvisited = len(self.tiles)
+        self.num_violated = 0
+
+        # the ids of the unvisited tiles, by number of possible values and
+        # then by number of constraints: buckets[size][degree] is a set of ids
+        self.max_degree = max([tile.get_degree() for tile in self.tiles.values()], default=0)
+        self.buckets = [[set() for _ in range(self.max_degree + 1)] for _ in range(biggest_num + 1)]
+        for tile in self.tiles.values():
+            self.index_tile(tile)
 
     @staticmethod
     def choose_board_dimensions(constraints):
         """
         Choosing the size of this board, based on the constraints list
         :param constraints: the list of constraint for this board
-        :return: the size for the board, based on the given constraints
-        """
-        max_x = 0
-        max_y = 0
-        for i in range(len(constraints)):
-            num_tiles = constraints[i][INDEX_NUM_TILES]
-            if constraints[i][INDEX_ORIENTATION] == HORIZONTAL:
-                new_max = constraints[i][INDEX_START_X] + num_tiles - 1
-                max_y = max(max_y, new_max)
+        :return: the number of rows and of columns holding the constraints and their tiles
+        """
+        num_rows = 0
+        num_cols = 0
+        for constraint in constraints:
+            last_row = constraint[INDEX_START_X]
+            last_col = constraint[INDEX_START_Y]
+            if constraint[INDEX_ORIENTATION] == HORIZONTAL:
+                last_col += constraint[INDEX_NUM_TILES]
             else:
-                new_max = constraints[i][INDEX_START_Y] + num_tiles - 1
-                max_x = max(max_x, new_max)
-        return max_x, max_y
+                last_row += constraint[INDEX_NUM_TILES]
+            num_rows = max(num_rows, last_row + 1)
+            num_cols = max(num_cols, last_col + 1)
+        return num_rows, num_cols
 
     def one_move_board_copy(self, value, row, col):
         """
@@ -324,13 +645,351 @@ class Board:
         :param col: the column
         :return: the newly created board
         """
-        if value not in BASE_SET:
+        if value not in range(1, self.biggest_num + 1):
             return None
-        new_board = copy.deepcopy(self)
-        new_board.place_tile(value, row, col)
-        new_board.serial_num += ">" + str(value) + "(" + str(row) + str(col) + ")"
+        # the copy reports to the same stats as this board
+        new_board = copy.deepcopy(self, {id(self.stats): self.stats})
+        new_board.one_move(value, row, col)
         return new_board
 
+    def one_move(self, value, row, col):
+        """
+        Making one extra move on this board itself, instead of on a copy
+        :param value: the number we want to place on the board
+        :param row: the row
+        :param col: the column
+        :return: False if the placement breaks one of the tile's constraints
+        """
+        placed = self.place_tile(value, row, col)
+        self.serial_num += SEPARATE + str(value) + "(" + str(row) + str(col) + ")"
+        return placed
+
+    def __deepcopy__(self, memo):
+        """
+        Copying only the parts of this board that change while solving: the
+        tiles, the constraints and the indexes over them. The locations, the
+        adjacency of the tiles and constraints and the combinations are shared
+        :param memo: the objects already copied, by id, as in copy.deepcopy
+        :return: the new board
+        """
+        new_board = Board.__new__(Board)
+        memo[id(self)] = new_board
+        new_board.__dict__.update(self.__dict__)
+        new_board.tiles_by_id = [copy.copy(tile) for tile in self.tiles_by_id]
+        new_board.tiles = {(tile.get_row(), tile.get_col()): tile for tile in new_board.tiles_by_id}
+        new_board.constraints = {const_index: copy.copy(constraint)
+                                 for const_index, constraint in self.constraints.items()}
+        new_board.buckets = [[set(bucket) for bucket in size_buckets] for size_buckets in self.buckets]
+        new_board.pending = deque(self.pending)
+        new_board.queued = set(self.queued)
+        new_board.stats = copy.deepcopy(self.stats, memo)
+        new_board.nogoods = copy.deepcopy(self.nogoods, memo)
+        if self.trail is not None:
+            # the recorded states are immutable, only what they belong to is replaced
+            copies = {id(self): new_board}
+            for tile, new_tile in zip(self.tiles_by_id, new_board.tiles_by_id):
+                copies[id(tile)] = new_tile
+            for const_index, constraint in self.constraints.items():
+                copies[id(constraint)] = new_board.constraints[const_index]
+            new_board.trail = [(copies[id(changed)], state) for changed, state in self.trail]
+        return new_board
+
+    def start_trail(self):
+        """
+        Start recording the changes made to this board, so they can be undone
+        """
+        self.trail = []
+
+    def trail_mark(self):
+        """
+        :return: a mark of the current state of the board, to pass to undo_to
+        """
+        return len(self.trail)
+
+    def undo_to(self, mark):
+        """
+        Undoing every change recorded after mark was taken
+        :param mark: a value returned by trail_mark
+        """
+        trail = self.trail
+        while len(trail) > mark:
+            changed, state = trail.pop()
+            if isinstance(changed, Tile):
+                if self.hash_tables is not None:
+                    self.hash_key ^= mask_key(self.hash_tables[changed.get_index()], changed.possible_mask() ^ state[0])
+                self.unindex_tile(changed)
+                changed.set_state(state)
+                self.index_tile(changed)
+            else:
+                changed.set_state(state)
+        self.clear_pending()
+
+    def get_zobrist_tables(self):
+        """
+        :return: the Zobrist tables of the tiles by id, followed by
+        those of the constraints, as returned by transposition.zobrist_tables
+        """
+        return zobrist_tables(len(self.tiles_by_id) + len(self.constraints), self.biggest_num)
+
+    def start_hashing(self):
+        """
+        Start keeping the Zobrist key of the possible values of the tiles up to date
+        """
+        self.hash_tables = self.get_zobrist_tables()
+        self.hash_key = 0
+        for tile in self.tiles_by_id:
+            self.hash_key ^= mask_key(self.hash_tables[tile.get_index()], tile.possible_mask())
+
+    def get_hash_key(self):
+        """
+        :return: the Zobrist key of the possible values of all the tiles, once start_hashing was called
+        """
+        return self.hash_key
+
+    def group_key(self, locations):
+        """
+        :param locations: the locations of a group of tiles, sharing no constraint with the other unvisited tiles
+        :return: the Zobrist key of the possible values of the group's tiles and of the numbers placed
+        in its constraints, which are all that decide whether the group has a solution
+        """
+        tables = self.get_zobrist_tables()
+        num_tiles = len(self.tiles_by_id)
+        key = 0
+        const_indexes = set()
+        for location in locations:
+            tile = self.tiles[location]
+            key ^= mask_key(tables[tile.get_index()], tile.possible_mask())
+            const_indexes.update(tile.get_constraints())
+        for const_index in const_indexes:
+            key ^= mask_key(tables[num_tiles + const_index], self.constraints[const_index].get_placed_mask())
+        return key
+
+    def get_state(self):
+        """
+        :return: the counters of this board that change while solving
+        """
+        return self.num_unvisited, self.num_violated
+
+    def set_state(self, state):
+        """
+        Bringing the counters of this board back to a state returned by get_state
+        :param state: the state to restore
+        """
+        self.num_unvisited, self.num_violated = state
+
+    def index_tile(self, tile):
+        """
+        Adding an unvisited tile to the bucket of its number of possible values
+        :param tile: the tile to add
+        """
+        if not tile.is_visited():
+            self.buckets[tile.num_possible()][tile.get_degree()].add(tile.get_index())
+
+    def unindex_tile(self, tile):
+        """
+        Removing a tile from its bucket, before it changes
+        :param tile: the tile to remove
+        """
+        if not tile.is_visited():
+            self.buckets[tile.num_possible()][tile.get_degree()].remove(tile.get_index())
+
+    def get_single_value_tile(self):
+        """
+        :return: the location of an unvisited tile with a single possible value,
+        the one with the highest id out of its bucket, None if there's no such tile
+        """
+        for bucket in self.buckets[1]:
+            if len(bucket) > 0:
+                return self.tiles_by_id[max(bucket)].get_location()
+        return None
+
+    def get_min_remaining_tile(self):
+        """
+        Choosing the unvisited tile with the least possible values, out of those
+        the one with the most constraints, and out of those the one with the highest
+        id, so the choice doesn't depend on the order the buckets were filled in, and
+        a search undoing its changes chooses the same tiles as one copying the board
+        :return: the location of the tile, FLAG if every tile is visited
+        """
+        for size_buckets in self.buckets:
+            for degree in range(self.max_degree, -1, -1):
+                if len(size_buckets[degree]) > 0:
+                    return self.tiles_by_id[max(size_buckets[degree])].get_location()
+        return FLAG
+
+    def get_min_remaining_tiles(self):
+        """
+        :return: the locations of the unvisited tiles tied for get_min_remaining_tile,
+        with as few possible values and as many constraints, by id, empty if every tile is visited
+        """
+        for size_buckets in self.buckets:
+            for degree in range(self.max_degree, -1, -1):
+                if len(size_buckets[degree]) > 0:
+                    return [self.tiles_by_id[tile_id].get_location() for tile_id in sorted(size_buckets[degree])]
+        return []
+
+    def get_min_remaining_tile_in(self, locations):
+        """
+        Same as get_min_remaining_tile, choosing out of some of the tiles, with the
+        ties broken the same way, so the choice doesn't depend on the order of locations
+        :param locations: the locations to choose from
+        :return: the location of the tile, FLAG if every one of them is visited
+        """
+        best_location = FLAG
+        best_key = None
+        for location in locations:
+            tile = self.tiles[location]
+            if not tile.is_visited():
+                key = (tile.num_possible(), -tile.get_degree(), -tile.get_index())
+                if best_key is None or key < best_key:
+                    best_location = location
+                    best_key = key
+        return best_location
+
+    def get_components(self, locations=None):
+        """
+        Splitting unvisited tiles into groups that share no constraint,
+        so each group can be solved apart from the others
+        :param locations: the locations to split, every unvisited tile if None
+        :return: a list of the groups, each a list of locations
+        """
+        if locations is None:
+            locations = self.tiles.keys()
+        unvisited = set(location for location in locations if not self.tiles[location].is_visited())
+        components = []
+        while len(unvisited) > 0:
+            component = [unvisited.pop()]
+            for location in component:
+                for const_index in self.tiles[location].get_constraints():
+                    for other in self.constraints[const_index].get_locations():
+                        if other in unvisited:
+                            unvisited.remove(other)
+                            component.append(other)
+            components.append(component)
+        return components
+
+    def schedule_constraint(self, const_index):
+        """
+        Adding a constraint to the queue of constraints to revise
+        :param const_index: the index of the constraint
+        """
+        if const_index not in self.queued:
+            self.queued.add(const_index)
+            self.pending.append(const_index)
+
+    def schedule_tile(self, tile):
+        """
+        Adding the constraints of a changed tile to the queue of constraints to revise
+        :param tile: the tile that changed
+        """
+        for const_index in tile.get_constraints():
+            self.schedule_constraint(const_index)
+
+    def clear_pending(self):
+        """
+        Emptying the queue of constraints to revise
+        """
+        self.pending.clear()
+        self.queued.clear()
+
+    def save_state(self, changed):
+        """
+        Recording the state of a tile or a constraint before changing it
+        :param changed: the tile or constraint that is about to change
+        """
+        if self.trail is not None:
+            self.trail.append((changed, changed.get_state()))
+
+    def pop_failed_constraint(self):
+        """
+        :return: the index of the last constraint found broken since the last call, None if there's none
+        """
+        const_index = self.failed_constraint
+        self.failed_constraint = None
+        return const_index
+
+    def narrow_tile(self, tile, mask, propagator=PROPAGATOR_PLACEMENT, reason=0):
+        """
+        Keeping only the possible values of tile that are in mask
+        :param tile: the tile to update
+        :param mask: the values that are still possible
+        :param propagator: the name of the propagator removing the values, for the stats
+        :param reason: the search levels that caused the change, when the board explains its changes
+        :return: True if some value got removed
+        """
+        if tile.possible_mask() & mask == tile.possible_mask():
+            return False
+        if self.stats is not None:
+            self.stats.add_pruning(propagator, (tile.possible_mask() & ~mask).bit_count())
+        self.save_state(tile)
+        self.schedule_tile(tile)
+        self.unindex_tile(tile)
+        if self.hash_tables is not None:
+            self.hash_key ^= mask_key(self.hash_tables[tile.get_index()], tile.possible_mask() & ~mask)
+        tile.intersect_possible_mask(mask)
+        self.index_tile(tile)
+        if self.explain:
+            tile.set_reason(tile.get_reason() | reason)
+            if tile.possible_mask() == EMPTY_MASK:
+                self.conflict |= tile.get_reason()
+        return True
+
+    def constraint_reason(self, constraint):
+        """
+        :param constraint: a constraint
+        :return: the search levels that narrowed its tiles, which explain
+        whatever the constraint removes from them
+        """
+        reason = 0
+        tiles_by_id = self.tiles_by_id
+        for tile_id in constraint.get_tile_ids():
+            reason |= tiles_by_id[tile_id].get_reason()
+        return reason
+
+    def place_choice(self, value, row, col, level):
+        """
+        Placing a value chosen by the search, when the board explains its changes
+        :param value: the number we want to place
+        :param row: the row to place
+        :param col: the col to place
+        :param level: the depth of the choice in the search, from 1
+        :return: False if the placement breaks one of the tile's constraints
+        """
+        tile = self.get_tile(row, col)
+        self.save_state(tile)
+        tile.set_reason(1 << level)
+        return self.place_tile(value, row, col)
+
+    def commit_placement(self, const_index, option_id):
+        """
+        Keeping a single possible placement of a constraint, chosen by the search,
+        and only its numbers in the constraint's tiles
+        :param const_index: the index of the constraint
+        :param option_id: the index of the placement in the combinations table entry
+        :return: False if a tile of the constraint has no possible value left
+        """
+        constraint = self.constraints[const_index]
+        self.filter_placements(constraint, (option_id,))
+        self.schedule_constraint(const_index)
+        mask = constraint.combinations.masks[option_id]
+        for tile_id in constraint.get_tile_ids():
+            tile = self.tiles_by_id[tile_id]
+            if not tile.is_visited():
+                self.narrow_tile(tile, mask, PROPAGATOR_COMBINATION)
+        return self.is_legal()
+
+    def filter_placements(self, constraint, placements):
+        """
+        Keeping only some of the possible placements of constraint
+        :param constraint: the constraint to update
+        :param placements: the indexes of the placements that are still possible
+        :return: True if some placement got removed
+        """
+        if len(placements) == len(constraint.get_possible_ids()):
+            return False
+        self.save_state(constraint)
+        return constraint.set_possible_placements(placements)
+
     def set_serial_num(self, num):
         """
         Sets the board serial number
@@ -346,23 +1005,20 @@ class Board:
         return self.serial_num
 
     def __str__(self):
-        s = ""
+        lines = []
         for row in range(self.dimensions[0]):
-            for col in range(self.dimensions[1]):
-                if (row, col) in self.tiles:
-                    tile = self.get_tile(row, col)
-                    s += str(tile.get_value())
-                else:
-                    s += TILE_START_VALUE
-            s += "\n"
-        return s
+            lines.append("".join(str(self.tiles[(row, col)].get_value()) if (row, col) in self.tiles
+                                 else TILE_START_VALUE for col in range(self.dimensions[1])))
+        return "".join(line + "\n" for line in lines)
 
-    def add_const(self, constraint):
+    def add_const(self, constraint, const_index=None):
         """
         Adding a constraint to the board's constraint list
         :param constraint: the information for this constraint
+        :param const_index: the index of the constraint, the next one if None
         """
-        const_index = len(self.constraints)
+        if const_index is None:
+            const_index = len(self.constraints)
 
         # creating the new constraint
         new_constraint = Constraint(constraint[INDEX_SUM],
@@ -370,27 +1026,113 @@ class Board:
                                     constraint[INDEX_ORIENTATION],
                                     constraint[INDEX_START_X],
                                     constraint[INDEX_START_Y],
-                                    const_index)
+                                    const_index,
+                                    self.biggest_num)
         self.constraints[const_index] = new_constraint
 
         # linking it to tiles on the board
-        possible_values = new_constraint.get_possible_numbers()
+        possible_values = new_constraint.get_possible_mask()
         for location in new_constraint.get_locations():
             row = location[X_INDEX]
             col = location[Y_INDEX]
 
             # if this tile not on board yet, we'll add it
             if (row, col) not in self.tiles:
-                self.tiles[(row, col)] = Tile(row, col)
+                self.tiles[(row, col)] = Tile(row, col, len(self.tiles_by_id), self.full_mask)
+                self.tiles_by_id.append(self.tiles[(row, col)])
 
             # remembering that this tile is under this constraint
             cur_tile = self.tiles[(row, col)]
             cur_tile.add_constraint(const_index)
 
             # updating the possible values for this tile
-            cur_tile.intersect_possible_values(possible_values)
+            cur_tile.intersect_possible_mask(possible_values)
+        new_constraint.tile_ids = tuple(self.tiles[location].get_index()
+                                        for location in new_constraint.get_locations())
         return
 
+    def edit_const(self, const_index, constraint=None):
+        """
+        Replacing, adding or removing a constraint of a built board, as when its
+        puzzle is edited. The tiles only the old constraint was on are removed, and
+        the new tiles are open with the numbers of the new constraint. Nothing is
+        propagated: the other tiles keep their possible values, and the other
+        constraints their placements and running state
+        :param const_index: the index of the constraint, len(self.constraints) to add one
+        :param constraint: the information for the new constraint, None to remove the
+        old one, moving the constraints after it one index down
+        """
+        old_constraint = self.constraints.pop(const_index, None)
+        if old_constraint is not None:
+            for location in old_constraint.get_locations():
+                tile = self.tiles[location]
+                tile.constraints = tuple(index for index in tile.get_constraints() if index != const_index)
+                if tile.get_degree() == 0:
+                    del self.tiles[location]
+
+        if constraint is not None:
+            self.add_const(constraint, const_index)
+            for location in self.constraints[const_index].get_locations():
+                self.tiles[location].constraints = tuple(sorted(self.tiles[location].get_constraints()))
+        elif old_constraint is not None:
+            self.constraints = {index - (index > const_index): self.constraints[index]
+                                for index in sorted(self.constraints)}
+            for index, moved in self.constraints.items():
+                moved.index = index
+            for tile in self.tiles.values():
+                tile.constraints = tuple(index - (index > const_index) for index in tile.get_constraints())
+
+        # the tiles get dense ids again, and the indexes over them are built anew
+        self.tiles_by_id = [tile for tile in self.tiles_by_id if self.tiles.get(tile.get_location()) is tile]
+        for tile_id, tile in enumerate(self.tiles_by_id):
+            tile.index = tile_id
+        for cur_constraint in self.constraints.values():
+            cur_constraint.tile_ids = tuple(self.tiles[location].get_index()
+                                            for location in cur_constraint.get_locations())
+        self.dimensions = self.choose_board_dimensions(
+            [(cur_constraint.get_total_sum(), cur_constraint.get_num_tiles(), cur_constraint.get_orientation(),
+              cur_constraint.start_tile_row, cur_constraint.start_tile_col)
+             for cur_constraint in self.constraints.values()])
+        self.max_degree = max([tile.get_degree() for tile in self.tiles.values()], default=0)
+        self.buckets = [[set() for _ in range(self.max_degree + 1)] for _ in range(self.biggest_num + 1)]
+        for tile in self.tiles_by_id:
+            self.index_tile(tile)
+        self.num_unvisited = sum(not tile.is_visited() for tile in self.tiles_by_id)
+        self.num_violated = sum(cur_constraint.is_violated() for cur_constraint in self.constraints.values())
+        self.clear_pending()
+        if self.hash_tables is not None:
+            self.start_hashing()
+
+    def reopen_tile(self, tile, mask):
+        """
+        Making a tile open again, with the possible values of mask, as when
+        a constraint it depended on was edited. The running state of its
+        constraints is brought up to date by recount_constraint
+        :param tile: the tile
+        :param mask: its possible values
+        """
+        self.unindex_tile(tile)
+        if tile.is_visited():
+            self.num_unvisited += 1
+        tile.set_state((mask, TILE_START_VALUE, False, tile.get_reason()))
+        self.index_tile(tile)
+
+    def recount_constraint(self, constraint):
+        """
+        Bringing the running state of a constraint up to date with the numbers placed in its tiles
+        :param constraint: the constraint
+        """
+        was_violated = constraint.is_violated()
+        constraint.placed_mask = 0
+        constraint.partial_sum = 0
+        constraint.unfilled = constraint.get_num_tiles()
+        constraint.violated = False
+        for tile_id in constraint.get_tile_ids():
+            tile = self.tiles_by_id[tile_id]
+            if tile.is_visited():
+                constraint.place_number(tile.get_value())
+        self.num_violated += constraint.is_violated() - was_violated
+
     def get_tile(self, row, col):
         """
         Gets the tile in location [row][col]
@@ -409,6 +1151,13 @@ class Board:
         """
         return self.tiles
 
+    def get_tile_by_id(self, tile_id):
+        """
+        :param tile_id: the dense id of a tile, as in Tile.get_index
+        :return: the tile
+        """
+        return self.tiles_by_id[tile_id]
+
     def get_constraint(self, index):
         """
         Gets the constraint with index [index]
@@ -428,9 +1177,9 @@ class Board:
         """
         related_tiles = set()
         cur_tile = self.get_tile(row, col)
-        for const_index in cur_tile.get_constraints:
+        for const_index in cur_tile.get_constraints():
             cur_const = self.get_constraint(const_index)
-            for location in cur_const.get_locations:
+            for location in cur_const.get_locations():
                 related_tiles.add(location)
         return related_tiles
 
@@ -446,24 +1195,45 @@ class Board:
         :param value: the number we want to place
         :param row: the row to place
         :param col: the col to place
+        :return: False if the placement breaks one of the tile's constraints
         """
         tile = self.get_tile(row, col)
+        value_bit = DIGIT_BITS[value]
+        self.save_state(self)
+        self.num_unvisited -= 1
         for const_index in tile.get_constraints():
             constraint = self.get_constraint(const_index)
-            constraint.remove_placements_without_numbers([value])
-            new_possible_values = constraint.get_possible_numbers()
-            if value in new_possible_values:
-                new_possible_values.remove(value)
-            for location in constraint.get_locations():
-                if location[X_INDEX] == row and location[Y_INDEX] == col:
+            self.save_state(constraint)
+            was_violated = constraint.is_violated()
+            reason = self.constraint_reason(constraint) if self.explain else 0
+            if constraint.place_number(value) and not was_violated:
+                self.num_violated += 1
+                self.conflict |= reason
+                self.failed_constraint = const_index
+            self.filter_placements(constraint, constraint.placements_with_mask(value_bit))
+            new_possible_values = constraint.get_possible_mask() & ~value_bit
+            for tile_id in constraint.get_tile_ids():
+                cur_tile = self.tiles_by_id[tile_id]
+                if cur_tile is tile or cur_tile.is_visited():
                     continue
-                cur_tile = self.get_tile(location[X_INDEX], location[Y_INDEX])
-                if cur_tile.is_visited():
-                    continue
-                cur_tile.intersect_possible_values(new_possible_values)
+                self.narrow_tile(cur_tile, new_possible_values, PROPAGATOR_PLACEMENT, reason)
 
         # placing the number in the location
+        self.save_state(tile)
+        self.schedule_tile(tile)
+        self.unindex_tile(tile)
+        if self.hash_tables is not None:
+            self.hash_key ^= mask_key(self.hash_tables[tile.get_index()], tile.possible_mask() ^ value_bit)
         tile.set_value(value)
+        if self.nogoods is not None and not self.nogoods.check_placement(self, tile, value):
+            return False
+        return self.num_violated == 0
+
+    def get_solution(self):
+        """
+        :return: a list of [row, col, value] for every tile of the board, by location
+        """
+        return [[row, col, tile.get_value()] for (row, col), tile in sorted(self.tiles.items())]
 
     def tile_poss_values(self, row, col):
         """
@@ -479,24 +1249,15 @@ class Board:
         """
         :return: True if this board is legal
         """
-        # do we have a tile with 0 possible values
-        for tile in self.tiles.values():
-            if tile.num_possible() == 0:
-                return False
-
         # checks that all the constraints are okay:
         # 1. they don't sum to more than the sum of the const
         # 2. we don't have number repetitions
-        for constraint in self.constraints.values():
-            cur_values = []
-            for tile_index in constraint.get_locations():
-                cur_tile = self.get_tile(tile_index[X_INDEX], tile_index[Y_INDEX])
-                if cur_tile.is_visited():
-                    cur_values.append(int(cur_tile.get_value()))
-            cur_sum = sum(cur_values)
-            if cur_sum > constraint.total_sum:
-                return False
-            if len(cur_values) < len(set(cur_values)):
+        if self.num_violated > 0:
+            return False
+
+        # do we have a tile with 0 possible values
+        for bucket in self.buckets[0]:
+            if len(bucket) > 0:
                 return False
         return True
 
@@ -504,51 +1265,259 @@ class Board:
         """
         :return: True if this board is complete, False otherwise
         """
-        # did we visit all the tiles?
-        for tile in self.tiles.values():
-            if not tile.is_visited():
-                return False
+        # did we visit all the tiles, and fill all the constraints?
+        return self.num_unvisited == 0 and self.num_violated == 0
 
-        # did we fill all the constraints?
+    def update_constraints_with_two(self):
         for constraint in self.constraints.values():
-            cur_sum = 0
-            for tile_index in constraint.get_locations():
-                tile = self.get_tile(tile_index[X_INDEX], tile_index[Y_INDEX])
-                cur_sum += tile.get_value()
-            if cur_sum != constraint.get_total_sum():
+            if constraint.get_num_tiles() == 2:
+                self.update_constraint_with_two(constraint)
+
+    def update_constraint_with_two(self, constraint):
+        """
+        Keeping only the values of a two tiles constraint that the other tile can sum up
+        :param constraint: a constraint with two tiles
+        """
+        const_sum = constraint.get_total_sum()
+        first_id, second_id = constraint.get_tile_ids()
+        first = self.tiles_by_id[first_id]
+        second = self.tiles_by_id[second_id]
+
+        if first.is_visited() or second.is_visited():
+            return
+
+        reason = self.constraint_reason(constraint) if self.explain else 0
+        self.narrow_tile(first, complement_mask(const_sum, second.possible_mask()), PROPAGATOR_TWO_TILES, reason)
+        self.narrow_tile(second, complement_mask(const_sum, first.possible_mask()), PROPAGATOR_TWO_TILES, reason)
+
+    def revise_constraint(self, constraint):
+        """
+        Keeping only the placements of constraint that can be spread over its
+        tiles, one distinct number in each tile out of its possible values,
+        and then only the tile values used by one of these spreads.
+        This also places a number that only one tile can hold, and removes
+        from the other tiles the numbers that every placement left holds
+        :param constraint: the constraint to revise
+        :return: False if the constraint or one of its tiles has no possibility left
+        """
+        if self.stats is not None:
+            self.stats.revisions += 1
+        possible_values = 0
+        placed_values = 0
+        open_tiles = []
+        for tile_id in constraint.get_tile_ids():
+            tile = self.tiles_by_id[tile_id]
+            possible_values |= tile.possible_mask()
+            if tile.is_visited():
+                placed_values |= tile.possible_mask()
+            else:
+                open_tiles.append(tile)
+
+        reason = self.constraint_reason(constraint) if self.explain else 0
+
+        # a constraint with too many combinations to list gets the entry of
+        # those left, and until it's listed only its possible numbers are kept
+        if not constraint.is_listed():
+            combinations = combinations_between(constraint.get_total_sum(), constraint.get_num_tiles(),
+                                                placed_values, possible_values)
+            if combinations is not constraint.combinations:
+                self.save_state(constraint)
+                constraint.set_combinations(combinations)
+            if not constraint.is_listed():
+                for tile in open_tiles:
+                    self.narrow_tile(tile, constraint.get_possible_mask() & ~placed_values, PROPAGATOR_ARC, reason)
+                return True
+
+        # a quick filter, before spreading each placement over the tiles
+        placements = constraint.placements_between(placed_values, possible_values)
+        if len(open_tiles) == 0:
+            self.filter_placements(constraint, placements)
+            if len(placements) == 0:
+                self.conflict |= reason
+            return len(placements) > 0
+
+        masks = constraint.combinations.masks
+        domains = tuple(tile.possible_mask() for tile in open_tiles)
+        supported = [0] * len(open_tiles)
+        kept = []
+        long_run = len(open_tiles) > MAX_SUBSET_TILES
+        for option_id in placements:
+            numbers = masks[option_id] & ~placed_values
+            if long_run and tuple(supported) == domains:
+                # every value is supported already, the placements left only need a matching
+                if match_numbers(numbers, domains) is not None:
+                    kept.append(option_id)
+                continue
+            support = matching_support(numbers, domains) if long_run else assignment_support(numbers, domains)
+            if support[0] == 0:
+                continue
+            kept.append(option_id)
+            for i in range(len(open_tiles)):
+                supported[i] |= support[i]
+
+        self.filter_placements(constraint, tuple(kept))
+        if len(kept) == 0:
+            self.conflict |= reason
+            return False
+        for i in range(len(open_tiles)):
+            self.narrow_tile(open_tiles[i], supported[i], PROPAGATOR_ARC, reason)
+        return True
+
+    def update_constraints(self):
+        """
+        Revising the constraints whose tiles changed, until nothing changes anymore
+        :return: False if some constraint or tile has no possibility left
+        """
+        if self.num_violated > 0:
+            self.clear_pending()
+            return False
+        while len(self.pending) > 0:
+            const_index = self.pending.popleft()
+            self.queued.discard(const_index)
+            if not self.revise_constraint(self.constraints[const_index]):
+                self.failed_constraint = const_index
+                self.clear_pending()
                 return False
         return True
 
-    def update_constraints_with_two(self):
-        for constraint in self.constraints.values():
-            const_sum = constraint.get_total_sum()
-            if constraint.get_num_tiles() == 2:
-                first_index = constraint.get_locations()[0]
-                first = self.get_tile(first_index[X_INDEX], first_index[Y_INDEX])
-                second_index = constraint.get_locations()[1]
-                second = self.get_tile(second_index[X_INDEX], second_index[Y_INDEX])
 
-                if first.is_visited() or second.is_visited():
-                    continue
+@lru_cache(maxsize=1 << 16)
+def assignment_support(numbers, domains):
+    """
+    Finding which values of each tile are used by some way to place the
+    numbers in the tiles, one distinct number in each tile
+    :param numbers: the mask of numbers to place, as many as there are tiles
+    :param domains: a tuple of the possible values masks of the tiles
+    :return: a tuple with the supported values mask of each tile,
+    all of them empty if the numbers can't be placed
+    """
+    # reachable[i] holds the sets of numbers the first i tiles can use
+    reachable = [{0}]
+    for domain in domains:
+        cur_reachable = set()
+        for used in reachable[-1]:
+            free = domain & numbers & ~used
+            while free:
+                bit = free & -free
+                cur_reachable.add(used | bit)
+                free ^= bit
+        if len(cur_reachable) == 0:
+            return (0,) * len(domains)
+        reachable.append(cur_reachable)
+    if numbers not in reachable[-1]:
+        return (0,) * len(domains)
+
+    # going back from the full placement, keeping the values on a complete path
+    support = [0] * len(domains)
+    completing = {numbers}
+    for i in range(len(domains) - 1, -1, -1):
+        cur_completing = set()
+        for used in reachable[i]:
+            free = domains[i] & numbers & ~used
+            while free:
+                bit = free & -free
+                if used | bit in completing:
+                    support[i] |= bit
+                    cur_completing.add(used)
+                free ^= bit
+        completing = cur_completing
+    return tuple(support)
+
+
+def match_numbers(numbers, domains):
+    """
+    Matching the numbers to the tiles: the smallest number left to every tile
+    that has one, and then the numbers along augmenting paths to the others
+    :param numbers: the mask of numbers to place, as many as there are tiles
+    :param domains: a tuple of the possible values masks of the tiles
+    :return: a list of the bit of the number matched to each tile, None if the numbers can't be placed
+    """
+    num_tiles = len(domains)
+    # the tile each number is matched to, by its bit, and the number of each tile
+    owners = {}
+    matched = [0] * num_tiles
+    taken = 0
+    for index in range(num_tiles):
+        free = domains[index] & numbers & ~taken
+        if free:
+            bit = free & -free
+            owners[bit] = index
+            matched[index] = bit
+            taken |= bit
+
+    def augment(index, seen):
+        free = domains[index] & numbers & ~seen[0]
+        while free:
+            bit = free & -free
+            seen[0] |= bit
+            if bit not in owners or augment(owners[bit], seen):
+                owners[bit] = index
+                matched[index] = bit
+                return True
+            free &= ~seen[0]
+        return False
+
+    for index in range(num_tiles):
+        if matched[index] == 0 and not augment(index, [0]):
+            return None
+    return matched
 
-                first_poss = first.possible_values()
-                second_poss = second.possible_values()
-                for number in first_poss:
-                    if const_sum - number not in second_poss:
-                        first.remove_value_from_possible(number)
-                for number in second_poss:
-                    if const_sum - number not in first_poss:
-                        second.remove_value_from_possible(number)
 
-    def update_constraints(self):
-        self.update_constraints_with_two()
-        for constraint in self.constraints.values():
-            possible_values = set()
-            for tile_index in constraint.get_locations():
-                tile = self.get_tile(tile_index[X_INDEX], tile_index[Y_INDEX])
-                for number in tile.possible_values():
-                    possible_values.add(number)
-            for option in constraint.get_possible_placements():
-                for number in option:
-                    if number not in possible_values:
-                        constraint.remove_placement(option)
+@lru_cache(maxsize=1 << 12)
+def matching_support(numbers, domains):
+    """
+    The same as assignment_support, in time polynomial in the number of tiles:
+    the numbers are matched to the tiles by match_numbers, and then a tile may
+    also take the number matched to another tile if that tile reaches it back,
+    through tiles that may each take the number matched to the next one, since
+    the tiles along this cycle can all move one number
+    :param numbers: the mask of numbers to place, as many as there are tiles
+    :param domains: a tuple of the possible values masks of the tiles
+    :return: a tuple with the supported values mask of each tile,
+    all of them empty if the numbers can't be placed
+    """
+    num_tiles = len(domains)
+    if all(numbers & ~domain == 0 for domain in domains):
+        return (numbers,) * num_tiles
+    matched = match_numbers(numbers, domains)
+    if matched is None:
+        return (0,) * num_tiles
+    owners = {bit: index for index, bit in enumerate(matched)}
+
+    # reaches[i] is the mask of the tiles reachable from tile i
+    reaches = [0] * num_tiles
+    for index in range(num_tiles):
+        others = domains[index] & numbers & ~matched[index]
+        while others:
+            bit = others & -others
+            reaches[index] |= 1 << owners[bit]
+            others ^= bit
+    for middle in range(num_tiles):
+        for index in range(num_tiles):
+            if (reaches[index] >> middle) & 1:
+                reaches[index] |= reaches[middle]
+
+    support = list(matched)
+    for index in range(num_tiles):
+        others = domains[index] & numbers & ~matched[index]
+        while others:
+            bit = others & -others
+            if (reaches[owners[bit]] >> index) & 1:
+                support[index] |= bit
+            others ^= bit
+    return tuple(support)
+
+
+def complement_mask(total_sum, mask):
+    """
+    Gets the numbers that complete a number of mask to total_sum
+    :param total_sum: the sum of a two tiles constraint
+    :param mask: the possible values of one of the tiles
+    :return: the mask of the matching values for the other tile
+    """
+    complement = 0
+    for number in mask_digits(mask):
+        other = total_sum - number
+        if 0 < other <= MAX_BIGGEST_NUM and other != number:
+            complement |= DIGIT_BITS[other]
+    return complement
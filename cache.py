@@ -0,0 +1,167 @@
+"""
+An on-disk cache of solved puzzles.
+Puzzles are keyed by a hash of their canonical clues: the clues sorted, in
+the orientation out of the puzzle and its transpose (where horizontal runs
+become vertical ones) that sorts first. A puzzle and its transpose share an
+entry, and a hit gives back the solution in the orientation of the clues it
+was asked for, without building a Board.
+The cache is an SQLite file, bounded to a number of puzzles by evicting the
+least recently used ones
+"""
+import hashlib
+import json
+import sqlite3
+from array import array
+from itertools import chain
+
+from board import INDEX_SUM, INDEX_NUM_TILES, INDEX_ORIENTATION, INDEX_START_X, INDEX_START_Y
+
+DEFAULT_MAX_ENTRIES = 100000
+
+# the seconds to wait for another process writing to the cache
+BUSY_TIMEOUT = 30
+
+# the hits whose use times are written together, instead of one at a time
+TOUCHES_PER_COMMIT = 100
+
+# a use time later than all the others in the file, taken from the file
+# itself so the processes sharing it keep a single order of use
+NEXT_USE_TIME = "SELECT COALESCE(MAX(last_used), 0) + 1 FROM solutions"
+
+
+def transpose_clues(clues):
+    """
+    :param clues: a list of clues, as (sum, number of tiles, orientation, x, y)
+    :return: the clues of the transposed puzzle
+    """
+    return [(clue[INDEX_SUM], clue[INDEX_NUM_TILES], 1 - clue[INDEX_ORIENTATION],
+             clue[INDEX_START_Y], clue[INDEX_START_X]) for clue in clues]
+
+
+def transpose_solution(solution):
+    """
+    :param solution: a solution, as returned by Board.get_solution
+    :return: the solution of the transposed puzzle, sorted by location
+    """
+    return sorted([col, row, value] for row, col, value in solution)
+
+
+def canonical_clues(clues):
+    """
+    :param clues: a list of clues
+    :return: the canonical clues, as a sorted list of tuples, and True if they're
+    the clues of the transposed puzzle
+    """
+    clues = sorted(tuple(clue) for clue in clues)
+    transposed = sorted(transpose_clues(clues))
+    if transposed < clues:
+        return transposed, True
+    return clues, False
+
+
+def puzzle_key(clues):
+    """
+    :param clues: a list of clues
+    :return: the hash keying the puzzle in the cache, shared with its transpose,
+    and True if the cache holds the puzzle transposed
+    """
+    canonical, transposed = canonical_clues(clues)
+    return hashlib.sha256(array("q", chain.from_iterable(canonical)).tobytes()).hexdigest(), transposed
+
+
+class SolutionCache:
+    """
+    An SQLite file of the solutions of puzzles, by their canonical hash
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Constructor of a cache, opening or creating its file
+        :param path: the path of the SQLite file, ":memory:" to keep it in memory
+        :param max_entries: the number of puzzles to keep
+        """
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                "(key TEXT PRIMARY KEY, solution TEXT, last_used INTEGER)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+        self.connection.commit()
+        self.num_entries = self.get_num_entries()
+
+        # the keys of the hits in the order of their use, written together so
+        # the file isn't locked for writing between the lookups
+        self.touched = {}
+
+    def get_solution(self, clues):
+        """
+        Looking a puzzle up
+        :param clues: the clues of the puzzle
+        :return: True if the puzzle is in the cache, and its solution as returned by
+        Board.get_solution (None if the puzzle has no solution, or it's not in the cache)
+        """
+        key, transposed = puzzle_key(clues)
+        row = self.connection.execute("SELECT solution FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+
+        self.touched.pop(key, None)
+        self.touched[key] = True
+        if len(self.touched) >= TOUCHES_PER_COMMIT:
+            self.commit()
+        solution = json.loads(row[0])
+        if solution is not None and transposed:
+            solution = transpose_solution(solution)
+        return True, solution
+
+    def put_solution(self, clues, solution):
+        """
+        Adding a solved puzzle, evicting the least recently used ones if the cache is full
+        :param clues: the clues of the puzzle
+        :param solution: its solution as returned by Board.get_solution, None if it has no solution
+        """
+        key, transposed = puzzle_key(clues)
+        if solution is not None and transposed:
+            solution = transpose_solution(solution)
+        # the hits before it were used earlier
+        self.write_touches()
+        if self.connection.execute("SELECT 1 FROM solutions WHERE key = ?", (key,)).fetchone() is None:
+            self.num_entries += 1
+        self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, (%s))" % NEXT_USE_TIME,
+                                (key, json.dumps(solution, separators=(",", ":"))))
+
+        if self.num_entries > self.max_entries:
+            # other processes may have added puzzles too
+            self.num_entries = self.get_num_entries()
+            self.connection.execute("DELETE FROM solutions WHERE key IN (SELECT key FROM solutions "
+                                    "ORDER BY last_used LIMIT ?)", (max(0, self.num_entries - self.max_entries),))
+            self.num_entries = min(self.num_entries, self.max_entries)
+        self.commit()
+
+    def get_num_entries(self):
+        """
+        :return: the number of puzzles in the cache
+        """
+        return self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def write_touches(self):
+        """
+        Writing the pending use times of the hits, without committing them
+        """
+        if len(self.touched) > 0:
+            self.connection.executemany("UPDATE solutions SET last_used = (%s) WHERE key = ?" % NEXT_USE_TIME,
+                                        [(key,) for key in self.touched])
+            self.touched = {}
+
+    def commit(self):
+        """
+        Writing and committing the pending use times of the hits
+        """
+        self.write_touches()
+        self.connection.commit()
+
+    def close(self):
+        """
+        Writing the pending changes and closing the file
+        """
+        self.commit()
+        self.connection.close()
@@ -0,0 +1,209 @@
+"""
+The ways to sum up a constraint as masks of distinct digits, built the first
+time a (sum, number of tiles, biggest digit) is asked for. The entries are read only
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from domain import BIGGEST_NUM, EMPTY_MASK, full_mask, mask_digits, mask_sum
+
+Combinations = namedtuple("Combinations", ["masks", "may_contain", "must_contain"])
+
+NO_COMBINATIONS = Combinations((), EMPTY_MASK, EMPTY_MASK)
+
+# the most combinations an entry lists, the bigger ones are only counted. The usual
+# digits have at most 12 for a sum, while spreading the hundreds of those of longer
+# runs of bigger digits over the tiles made every revision of them slow
+MAX_LISTED_COMBINATIONS = 16
+
+# the entries kept for the combinations left in constraints, besides the whole ones
+MAX_CACHED_ENTRIES = 1 << 12
+
+
+def reachable_sums(digits, num_tiles):
+    """
+    :param digits: the mask of the digits to use
+    :param num_tiles: the most digits to use
+    :return: a list whose item k is a bitset of the sums of k distinct digits of the mask
+    """
+    reachable = [1] + [0] * num_tiles
+    for digit in mask_digits(digits):
+        for count in range(num_tiles, 0, -1):
+            reachable[count] |= reachable[count - 1] << digit
+    return reachable
+
+
+def can_sum(total_sum, num_tiles, digits):
+    """
+    :param total_sum: the sum
+    :param num_tiles: the number of distinct digits to sum up
+    :param digits: the mask of the digits to use
+    :return: True if num_tiles distinct digits of the mask sum up to total_sum
+    """
+    if total_sum < 0 or num_tiles < 0:
+        return False
+    return (reachable_sums(digits, num_tiles)[num_tiles] >> total_sum) & 1 == 1
+
+
+@lru_cache(maxsize=MAX_CACHED_ENTRIES)
+def count_combinations(total_sum, num_tiles, digits):
+    """
+    :param total_sum: the sum
+    :param num_tiles: the number of distinct digits to sum up
+    :param digits: the mask of the digits to use
+    :return: the number of ways to sum up total_sum with num_tiles distinct digits of the mask
+    """
+    if total_sum < 0 or num_tiles < 0:
+        return 0
+    # counts[k] holds the number of ways k distinct digits sum up to s in its bits
+    # from s * width, and no count gets to 2 ** width, with fewer digits than width
+    width = digits.bit_count() + 1
+    kept = (1 << ((total_sum + 1) * width)) - 1
+    counts = [1] + [0] * num_tiles
+    for digit in mask_digits(digits):
+        for count in range(num_tiles, 0, -1):
+            counts[count] = (counts[count] + (counts[count - 1] << (digit * width))) & kept
+    return (counts[num_tiles] >> (total_sum * width)) & ((1 << width) - 1)
+
+
+def iter_combinations(total_sum, num_tiles, digits):
+    """
+    Enumerating the combinations that sum up, a digit at a time from the biggest,
+    skipping every digit that leaves a sum the smaller digits can't reach
+    :param total_sum: the sum
+    :param num_tiles: the number of distinct digits to sum up
+    :param digits: the mask of the digits to use
+    :return: a generator of the masks of num_tiles distinct digits of the mask summing up to total_sum
+    """
+    digit_list = mask_digits(digits)
+    # below[i] holds the sums reachable by the first i digits, as in reachable_sums
+    below = [[1] + [0] * num_tiles]
+    for digit in digit_list:
+        reachable = list(below[-1])
+        for count in range(num_tiles, 0, -1):
+            reachable[count] |= reachable[count - 1] << digit
+        below.append(reachable)
+
+    def extend(num_digits, count, rest, mask):
+        if count == 0:
+            yield mask
+            return
+        for index in range(num_digits - 1, count - 2, -1):
+            digit = digit_list[index]
+            if digit <= rest and (below[index][count - 1] >> (rest - digit)) & 1:
+                yield from extend(index, count - 1, rest - digit, mask | (1 << (digit - 1)))
+
+    if 0 <= num_tiles and 0 <= total_sum and (below[-1][num_tiles] >> total_sum) & 1:
+        yield from extend(len(digit_list), num_tiles, total_sum, EMPTY_MASK)
+
+
+def digits_in_combinations(total_sum, num_tiles, digits):
+    """
+    Finding the digits of the combinations by the sums the digits before and after
+    each digit reach: a digit is in a combination if some k digits before it and the
+    num_tiles - 1 - k after it sum up to the rest, and in all of them if no num_tiles
+    digits without it sum up to total_sum
+    :param total_sum: the sum
+    :param num_tiles: the number of distinct digits to sum up
+    :param digits: the mask of the digits to use
+    :return: the digits that are in some combination summing up, and those in all of them, as masks
+    """
+    digit_list = mask_digits(digits)
+    if num_tiles < 1 or total_sum < 0:
+        return EMPTY_MASK, EMPTY_MASK
+    # before[i][k] holds the sums of k of the first i digits, as in reachable_sums
+    before = [[1] + [0] * num_tiles]
+    for digit in digit_list:
+        reachable = list(before[-1])
+        for count in range(num_tiles, 0, -1):
+            reachable[count] |= reachable[count - 1] << digit
+        before.append(reachable)
+
+    # left[k] holds total_sum - s for every sum s of k of the digits after the current one
+    left = [1 << total_sum] + [0] * num_tiles
+    union = EMPTY_MASK
+    intersection = EMPTY_MASK
+    for index in range(len(digit_list) - 1, -1, -1):
+        digit = digit_list[index]
+        prefix = before[index]
+        if any((prefix[count] << digit) & left[num_tiles - 1 - count] for count in range(num_tiles)):
+            union |= 1 << (digit - 1)
+            if not any(prefix[count] & left[num_tiles - count] for count in range(num_tiles + 1)):
+                intersection |= 1 << (digit - 1)
+        for count in range(num_tiles, 0, -1):
+            left[count] |= left[count - 1] >> digit
+    return union, intersection
+
+
+@lru_cache(maxsize=MAX_CACHED_ENTRIES)
+def combinations_between(total_sum, num_tiles, required, allowed):
+    """
+    :param total_sum: the sum of the constraint
+    :param num_tiles: the number of tiles in the constraint
+    :param required: the numbers every combination must hold
+    :param allowed: the numbers the combinations may use
+    :return: the Combinations holding every number of required and using only numbers of allowed,
+    empty if there are none, and with masks None if there are more than MAX_LISTED_COMBINATIONS
+    """
+    if required & ~allowed:
+        return NO_COMBINATIONS
+    rest_sum = total_sum - mask_sum(required)
+    rest_tiles = num_tiles - required.bit_count()
+    digits = allowed & ~required
+    if not can_sum(rest_sum, rest_tiles, digits):
+        return NO_COMBINATIONS
+
+    if count_combinations(rest_sum, rest_tiles, digits) > MAX_LISTED_COMBINATIONS:
+        union, intersection = digits_in_combinations(rest_sum, rest_tiles, digits)
+        return Combinations(None, union | required, intersection | required)
+    masks = tuple(sorted(rest | required for rest in iter_combinations(rest_sum, rest_tiles, digits)))
+    return Combinations(masks, may_contain(masks), must_contain(masks))
+
+
+@lru_cache(maxsize=None)
+def get_combinations(total_sum, num_tiles, biggest_num=BIGGEST_NUM):
+    """
+    :param total_sum: the sum of the constraint
+    :param num_tiles: the number of tiles in the constraint
+    :param biggest_num: the biggest digit the tiles may hold
+    :return: the Combinations for this constraint, empty if it can't be summed up
+    """
+    if num_tiles < 1:
+        return NO_COMBINATIONS
+    return combinations_between(total_sum, num_tiles, EMPTY_MASK, full_mask(biggest_num))
+
+
+def num_combinations(combinations, total_sum, num_tiles):
+    """
+    :param combinations: an entry of get_combinations or combinations_between
+    :param total_sum: the sum of the constraint
+    :param num_tiles: the number of tiles in the constraint
+    :return: the number of combinations of the entry, counted when it isn't listed
+    """
+    if combinations.masks is not None:
+        return len(combinations.masks)
+    required = combinations.must_contain
+    return count_combinations(total_sum - mask_sum(required), num_tiles - required.bit_count(),
+                              combinations.may_contain & ~required)
+
+
+def may_contain(masks):
+    """
+    :param masks: some combination masks
+    :return: the numbers that are in at least one of them
+    """
+    union = EMPTY_MASK
+    for mask in masks:
+        union |= mask
+    return union
+
+
+def must_contain(masks):
+    """
+    :param masks: some combination masks
+    :return: the numbers that are in all of them (nothing if there are none)
+    """
+    intersection = None
+    for mask in masks:
+        intersection = mask if intersection is None else intersection & mask
+    return EMPTY_MASK if intersection is None else intersection
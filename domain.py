@@ -0,0 +1,78 @@
+"""
+Bitmask domains for tiles and constraints.
+A domain is a plain int where bit (d - 1) is set while the digit d is
+still possible, so intersecting or removing digits is a single operation.
+The digits go from 1 to BIGGEST_NUM by default, and a board may use any
+range up to MAX_BIGGEST_NUM. The tables indexed by a mask only cover the
+default range, the functions below fall back on the bits for bigger masks
+"""
+
+BIGGEST_NUM = 9
+NUM_MASKS = 1 << BIGGEST_NUM
+FULL_MASK = NUM_MASKS - 1
+EMPTY_MASK = 0
+
+# the biggest digit a board may use
+MAX_BIGGEST_NUM = 64
+
+# DIGIT_BITS[d] is the mask holding only the digit d (index 0 is unused)
+DIGIT_BITS = [0] + [1 << (digit - 1) for digit in range(1, MAX_BIGGEST_NUM + 1)]
+
+# tables indexed by a mask of the default digits
+MASK_DIGITS = [tuple(digit for digit in range(1, BIGGEST_NUM + 1)
+                     if mask & DIGIT_BITS[digit])
+               for mask in range(NUM_MASKS)]
+MASK_SUM = [sum(MASK_DIGITS[mask]) for mask in range(NUM_MASKS)]
+
+
+def full_mask(biggest_num=BIGGEST_NUM):
+    """
+    :param biggest_num: the biggest digit
+    :return: the mask holding every digit from 1 to biggest_num
+    """
+    return (1 << biggest_num) - 1
+
+
+def mask_from_digits(digits):
+    """
+    Building a mask out of some digits
+    :param digits: an iterable of digits
+    :return: the mask holding exactly these digits
+    """
+    mask = EMPTY_MASK
+    for digit in digits:
+        mask |= DIGIT_BITS[digit]
+    return mask
+
+
+def mask_digits(mask):
+    """
+    :param mask: a domain mask
+    :return: a tuple of the digits in this mask, from small to big
+    """
+    if mask < NUM_MASKS:
+        return MASK_DIGITS[mask]
+    digits = []
+    while mask:
+        bit = mask & -mask
+        digits.append(bit.bit_length())
+        mask ^= bit
+    return tuple(digits)
+
+
+def mask_to_digits(mask):
+    """
+    :param mask: a domain mask
+    :return: a list of the digits in this mask, from small to big
+    """
+    return list(mask_digits(mask))
+
+
+def mask_sum(mask):
+    """
+    :param mask: a domain mask
+    :return: the sum of the digits in this mask
+    """
+    if mask < NUM_MASKS:
+        return MASK_SUM[mask]
+    return sum(mask_digits(mask))
@@ -0,0 +1,284 @@
+"""
+Re-solving a puzzle while it's edited, a clue at a time.
+The editor keeps the board of the puzzle propagated, and every tile of it
+knows the constraints its possible values were narrowed by: a tile starts
+out narrowed by its own constraints, and the board explains its changes
+(see Board.explain) with a bit for every constraint instead of every search
+level. An edit replaces only the edited clue's constraint on the board, and
+only the tiles that depend on it get their possible values back, so only
+the constraints around them are propagated again. The search is then warm
+started from the last solution, trying its values first, and isn't needed
+at all when the last solution fits the edited puzzle.
+Most single edits of a sum leave a puzzle with no solution, which the
+search could take long to prove. When every tile of a group is in a
+horizontal and a vertical run, both kinds of runs sum up to the total of
+the group's tiles, so such an edit is found out without searching
+"""
+import time
+
+from batch import check_clues, STATUS_SOLVED, STATUS_UNSOLVABLE, STATUS_TIMEOUT
+from board import Board, HORIZONTAL
+from combinations import get_combinations
+from kakuro import propagate_board, search_trail, SearchTimeout
+
+
+def constraint_bits(tile):
+    """
+    :param tile: a tile
+    :return: the mask of the indexes of the tile's constraints
+    """
+    bits = 0
+    for const_index in tile.get_constraints():
+        bits |= 1 << const_index
+    return bits
+
+
+def remove_bit(mask, index):
+    """
+    :param mask: a mask of constraint indexes
+    :param index: the index of a removed constraint
+    :return: the mask, with the indexes above index moved one down
+    """
+    return (mask & ((1 << index) - 1)) | ((mask >> (index + 1)) << index)
+
+
+def tile_groups(board, locations):
+    """
+    :param board: a board
+    :param locations: the locations of some of its tiles
+    :return: the groups of tiles connected by the constraints, visited or not, that
+    hold the tiles at locations, each a list of locations
+    """
+    seen = set()
+    groups = []
+    for start in locations:
+        if start in seen:
+            continue
+        seen.add(start)
+        group = [start]
+        for location in group:
+            for const_index in board.get_tile(location[0], location[1]).get_constraints():
+                for other in board.get_constraint(const_index).get_locations():
+                    if other not in seen:
+                        seen.add(other)
+                        group.append(other)
+        groups.append(group)
+    return groups
+
+
+def sums_balance(board, locations=None):
+    """
+    Checking that in every group of tiles connected by the constraints, with
+    every tile in a horizontal and a vertical run, the sums of the horizontal
+    runs add up to the same total as the sums of the vertical runs
+    :param board: the board of the puzzle
+    :param locations: the locations of tiles whose groups are checked, every group if None
+    :return: False if some group's totals differ, so the puzzle has no solution
+    """
+    if locations is None:
+        locations = board.get_tiles()
+    for group in tile_groups(board, locations):
+        totals = [0, 0]
+        const_indexes = set()
+        for location in group:
+            tile = board.get_tile(location[0], location[1])
+            if tile.get_degree() != 2:
+                break
+            const_indexes.update(tile.get_constraints())
+        else:
+            for const_index in const_indexes:
+                constraint = board.get_constraint(const_index)
+                totals[constraint.get_orientation() == HORIZONTAL] += constraint.get_total_sum()
+            if totals[0] != totals[1]:
+                return False
+    return True
+
+
+class PuzzleEditor:
+    """
+    A puzzle changing a clue at a time, and the state kept to re-solve it quickly
+    """
+
+    def __init__(self, clues):
+        """
+        Constructor of an editor, propagating the puzzle
+        :param clues: the clues of the puzzle, as for Board
+        """
+        self.clues = check_clues(clues)
+        self.board = None
+        self.consistent = False
+
+        # the last solution found, as a dict from locations to values
+        self.solution = None
+
+        # the number of tiles whose possible values were kept by the last edit
+        self.num_kept = 0
+        self.propagate()
+
+    def get_clues(self):
+        """
+        :return: the current clues, by index
+        """
+        return list(self.clues)
+
+    def get_board(self):
+        """
+        :return: the propagated board of the current clues
+        """
+        return self.board
+
+    def get_num_kept(self):
+        """
+        :return: the number of tiles whose possible values the last edit kept
+        """
+        return self.num_kept
+
+    def add_clue(self, clue):
+        """
+        :param clue: a new clue, as (sum, number of tiles, orientation, x, y)
+        :return: the index of the clue
+        """
+        self.clues.append(check_clues([clue])[0])
+        self.propagate(len(self.clues) - 1)
+        return len(self.clues) - 1
+
+    def remove_clue(self, index):
+        """
+        :param index: the index of the clue to remove, the clues after it move one down
+        """
+        del self.clues[index]
+        self.propagate(index, removed=True)
+
+    def set_clue(self, index, clue):
+        """
+        :param index: the index of the clue to change
+        :param clue: the new clue, as (sum, number of tiles, orientation, x, y)
+        """
+        self.clues[index] = check_clues([clue])[0]
+        self.propagate(index)
+
+    def propagate(self, edited=None, removed=False):
+        """
+        Propagating the board of the current clues, editing the old board in place
+        :param edited: the index of the edited clue, None to propagate from scratch
+        :param removed: True if the clue at index edited was removed
+        """
+        if self.board is None or edited is None:
+            self.board = Board(self.clues)
+            for tile in self.board.get_tiles().values():
+                tile.set_reason(constraint_bits(tile))
+            self.num_kept = 0
+            balanced = sums_balance(self.board)
+        else:
+            balanced = self.edit_board(edited, removed)
+
+        board = self.board
+        board.explain = True
+        try:
+            self.consistent = balanced and propagate_board(board)
+        finally:
+            board.explain = False
+        board.start_trail()
+
+    def edit_board(self, edited, removed):
+        """
+        Replacing the edited clue's constraint on the board, opening again the
+        tiles that depend on it with the possible values of their constraints,
+        and scheduling the constraints around them
+        :param edited: the index of the edited clue
+        :param removed: True if the clue at index edited was removed
+        :return: False if the sums of some group of tiles don't balance, as in sums_balance
+        """
+        board = self.board
+        edited_bit = 1 << edited
+        old_locations = set(board.get_tiles())
+        reset = [tile for tile in board.get_tiles().values() if tile.get_reason() & edited_bit]
+        board.edit_const(edited, None if removed else self.clues[edited])
+        tiles = board.get_tiles()
+        reset = [tile for tile in reset if tiles.get(tile.get_location()) is tile]
+        if removed:
+            for tile in tiles.values():
+                tile.set_reason(remove_bit(tile.get_reason(), edited))
+
+        # the constraints of the reset tiles get all their placements back,
+        # the other constraints keep theirs, since none of their tiles changed
+        revise = set()
+        for tile in reset:
+            revise.update(tile.get_constraints())
+        for const_index in revise:
+            constraint = board.get_constraint(const_index)
+            constraint.set_combinations(get_combinations(constraint.get_total_sum(), constraint.get_num_tiles(),
+                                                         board.biggest_num))
+        for tile in reset:
+            mask = board.full_mask
+            for const_index in tile.get_constraints():
+                mask &= board.get_constraint(const_index).get_possible_mask()
+            board.reopen_tile(tile, mask)
+            tile.set_reason(constraint_bits(tile))
+
+        # the numbers placed in the new constraint's tiles are placed again by the propagation
+        edited_locations = []
+        if not removed:
+            for location in board.get_constraint(edited).get_locations():
+                tile = tiles[location]
+                if tile.is_visited():
+                    board.reopen_tile(tile, tile.possible_mask())
+                tile.set_reason(tile.get_reason() | edited_bit)
+                revise.update(tile.get_constraints())
+                edited_locations.append(location)
+        for const_index in revise:
+            board.recount_constraint(board.get_constraint(const_index))
+        self.num_kept = len(old_locations & set(tiles)) - len(reset)
+
+        if not self.consistent:
+            # the last propagation didn't finish, so every constraint is revised
+            for const_index in board.constraints:
+                board.schedule_constraint(const_index)
+            return sums_balance(board)
+        for const_index in sorted(revise):
+            board.schedule_constraint(const_index)
+        return sums_balance(board, [tile.get_location() for tile in reset] + edited_locations)
+
+    def solution_fits(self):
+        """
+        :return: True if the last solution has a value for every tile, and fits every clue.
+        The values of tiles that are gone don't matter
+        """
+        if self.solution is None:
+            return False
+        for constraint in self.board.constraints.values():
+            values = [self.solution.get(location) for location in constraint.get_locations()]
+            if None in values or len(set(values)) != len(values) or sum(values) != constraint.get_total_sum():
+                return False
+        return True
+
+    def solve(self, deadline=None, max_boards=None):
+        """
+        Solving the current puzzle, trying the values of the last solution first.
+        The board is left propagated, for the next edit
+        :param deadline: a time.monotonic() value to give up at, None to never give up
+        :param max_boards: the number of boards to give up after, None to never give up
+        :return: a dict with the status (STATUS_TIMEOUT if it gave up), the solution as returned
+        by Board.get_solution, the number of used boards and the seconds it took
+        """
+        start = time.perf_counter()
+        result = {"status": STATUS_UNSOLVABLE, "solution": None, "used_boards": 0}
+        if self.solution_fits():
+            result["status"] = STATUS_SOLVED
+            result["solution"] = [[row, col, self.solution[(row, col)]]
+                                  for row, col in sorted(self.board.get_tiles())]
+        elif self.consistent:
+            mark = self.board.trail_mark()
+            try:
+                solved, result["used_boards"] = search_trail(self.board, deadline, max_boards, hint=self.solution)
+                if solved is not None:
+                    result["status"] = STATUS_SOLVED
+                    result["solution"] = solved.get_solution()
+                    self.solution = {(row, col): value for row, col, value in result["solution"]}
+            except SearchTimeout as timeout:
+                result["status"] = STATUS_TIMEOUT
+                result["used_boards"] = timeout.num_used_boards
+            finally:
+                self.board.undo_to(mark)
+        result["seconds"] = time.perf_counter() - start
+        return result
@@ -0,0 +1,288 @@
+"""
+Generating random puzzles, to build corpora and to load test the solvers.
+A puzzle is made of a random layout of white tiles, filled with digits that
+are distinct in every run, and the clues are the sums of the runs, in the
+format of the Board constructor. The generated puzzles always have a
+solution, and with unique=True the layout is cut down, a tile at a time,
+until the solver finds that the solution is the only one. Without it
+thousands of big puzzles are generated a minute, while unique puzzles
+take as long as the solves checking them.
+The puzzles are written as JSONL, in the format read by batch.py
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from board import Board, HORIZONTAL, VERTICAL
+from domain import BIGGEST_NUM, DIGIT_BITS, full_mask, mask_digits
+from kakuro import count_solutions, SearchTimeout
+
+DEFAULT_DENSITY = 0.3
+
+# the backtracks a fill may use before starting over with a new layout
+MAX_FILL_BACKTRACKS = 1000
+
+# the tiles turned black to make a puzzle unique before giving up on it
+MAX_UNIQUE_CUTS = 50
+
+# how far a skewed filling strays from the low or high digits its runs prefer
+SKEW_NOISE = 3
+
+
+def make_layout(rng, rows, cols, density=DEFAULT_DENSITY, biggest_num=BIGGEST_NUM):
+    """
+    Building a random layout of white tiles. The first row and column are
+    black, to hold the clues, and every white tile is in a horizontal and a
+    vertical run of 2 to biggest_num tiles
+    :param rng: a random.Random
+    :param rows: the number of rows
+    :param cols: the number of columns
+    :param density: the chance of every tile to be black
+    :param biggest_num: the biggest digit, and the longest run
+    :return: the layout, as a list of rows of booleans, True for a white tile
+    """
+    white = [[row > 0 and col > 0 and rng.random() >= density for col in range(cols)] for row in range(rows)]
+    return clean_layout(white, biggest_num)
+
+
+def clean_layout(white, biggest_num=BIGGEST_NUM):
+    """
+    Turning tiles black until every white tile is in a horizontal and a
+    vertical run of 2 to biggest_num tiles
+    :param white: the layout to clean, changed in place
+    :param biggest_num: the biggest digit, and the longest run
+    :return: the layout
+    """
+    rows = len(white)
+    cols = len(white[0])
+    changed = True
+    while changed:
+        changed = False
+        for row in range(rows):
+            run = 0
+            for col in range(cols):
+                run = run + 1 if white[row][col] else 0
+                if run > biggest_num:
+                    white[row][col] = False
+                    run = 0
+                    changed = True
+        for col in range(cols):
+            run = 0
+            for row in range(rows):
+                run = run + 1 if white[row][col] else 0
+                if run > biggest_num:
+                    white[row][col] = False
+                    run = 0
+                    changed = True
+        for row in range(rows):
+            for col in range(cols):
+                if white[row][col] and not (is_in_run(white, row, col, 0, 1) and is_in_run(white, row, col, 1, 0)):
+                    white[row][col] = False
+                    changed = True
+    return white
+
+
+def is_in_run(white, row, col, row_step, col_step):
+    """
+    :return: True if the white tile at (row, col) has a white neighbour
+    in the direction of (row_step, col_step), forwards or backwards
+    """
+    for step in (-1, 1):
+        neighbour_row = row + step * row_step
+        neighbour_col = col + step * col_step
+        if 0 <= neighbour_row < len(white) and 0 <= neighbour_col < len(white[0]) and \
+                white[neighbour_row][neighbour_col]:
+            return True
+    return False
+
+
+def find_runs(white):
+    """
+    :param white: a layout, as returned by make_layout
+    :return: a dict from every white tile to the indexes of its horizontal and vertical
+    runs, and the list of the runs, each as (orientation, clue row, clue col, tiles)
+    """
+    runs = []
+    tile_runs = {}
+    for orientation, row_step, col_step in ((HORIZONTAL, 0, 1), (VERTICAL, 1, 0)):
+        for row in range(len(white)):
+            for col in range(len(white[0])):
+                if white[row][col]:
+                    continue
+                tiles = []
+                tile_row, tile_col = row + row_step, col + col_step
+                while tile_row < len(white) and tile_col < len(white[0]) and white[tile_row][tile_col]:
+                    tiles.append((tile_row, tile_col))
+                    tile_runs.setdefault((tile_row, tile_col), [None, None])[orientation] = len(runs)
+                    tile_row, tile_col = tile_row + row_step, tile_col + col_step
+                if len(tiles) > 0:
+                    runs.append((orientation, row, col, tiles))
+    return tile_runs, runs
+
+
+def fill_layout(rng, white, skewed=False, max_backtracks=MAX_FILL_BACKTRACKS, biggest_num=BIGGEST_NUM):
+    """
+    Filling a layout with random digits, distinct in every run
+    :param rng: a random.Random
+    :param white: a layout, as returned by make_layout
+    :param skewed: True to have every run prefer low or high digits, so its sum
+    has few combinations and the puzzle is more likely to have a single solution
+    :param max_backtracks: the backtracks to use before giving up
+    :param biggest_num: the biggest digit
+    :return: a dict from every white tile to its digit, None if no filling was found
+    """
+    digits = full_mask(biggest_num)
+    tile_runs, runs = find_runs(white)
+    prefers_low = [rng.random() < 0.5 for _ in runs]
+    tiles = sorted(tile_runs)
+    used_masks = [0] * len(runs)
+    values = {}
+    choices = [None] * len(tiles)
+    num_backtracks = 0
+    index = 0
+    while index < len(tiles):
+        horizontal, vertical = tile_runs[tiles[index]]
+        if choices[index] is None:
+            choices[index] = list(mask_digits(digits & ~(used_masks[horizontal] | used_masks[vertical])))
+            if skewed:
+                # the last digit is tried first
+                choices[index].sort(key=lambda digit: (digit if prefers_low[horizontal] else -digit) +
+                                    (digit if prefers_low[vertical] else -digit) +
+                                    rng.random() * SKEW_NOISE, reverse=True)
+            else:
+                rng.shuffle(choices[index])
+        if len(choices[index]) > 0:
+            digit = choices[index].pop()
+            values[tiles[index]] = digit
+            used_masks[horizontal] |= DIGIT_BITS[digit]
+            used_masks[vertical] |= DIGIT_BITS[digit]
+            index += 1
+            continue
+
+        # no digit is left for this tile, so the previous one takes its next digit
+        num_backtracks += 1
+        if index == 0 or num_backtracks > max_backtracks:
+            return None
+        choices[index] = None
+        index -= 1
+        horizontal, vertical = tile_runs[tiles[index]]
+        digit = values.pop(tiles[index])
+        used_masks[horizontal] &= ~DIGIT_BITS[digit]
+        used_masks[vertical] &= ~DIGIT_BITS[digit]
+    return values
+
+
+def make_clues(white, values):
+    """
+    :param white: a layout, as returned by make_layout
+    :param values: the digits of its white tiles, as returned by fill_layout
+    :return: the list of clues, as (sum, number of tiles, orientation, x, y)
+    """
+    return [(sum(values[tile] for tile in tiles), len(tiles), orientation, row, col)
+            for orientation, row, col, tiles in find_runs(white)[1]]
+
+
+def make_unique(white, values, deadline=None, max_cuts=MAX_UNIQUE_CUTS, biggest_num=BIGGEST_NUM):
+    """
+    Turning tiles black until the solution of the puzzle is its only one.
+    While the solver finds two solutions, a tile where they differ is turned
+    black, which keeps the filling valid for the smaller layout
+    :param white: a layout, changed in place
+    :param values: its filling, changed in place
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param max_cuts: the tiles to turn black before giving up
+    :param biggest_num: the biggest digit
+    :return: the clues of the unique puzzle, None if it wasn't made unique
+    """
+    for _ in range(max_cuts + 1):
+        clues = make_clues(white, values)
+        if len(clues) == 0:
+            return None
+        try:
+            counted = count_solutions(Board(clues, biggest_num), limit=2, keep=2, deadline=deadline)
+        except SearchTimeout:
+            return None
+        if counted["count"] < 2:
+            return clues
+
+        # the cut that leaves the most white tiles once the layout is cleaned
+        first, second = counted["solutions"]
+        best_layout = None
+        for (row, col, value), (_, _, other) in zip(first, second):
+            if value != other:
+                cut = [list(layout_row) for layout_row in white]
+                cut[row][col] = False
+                clean_layout(cut, biggest_num)
+                if best_layout is None or sum(map(sum, cut)) > sum(map(sum, best_layout)):
+                    best_layout = cut
+        white[:] = best_layout
+        for tile in list(values):
+            if not white[tile[0]][tile[1]]:
+                del values[tile]
+    return None
+
+
+def generate_puzzle(rows, cols=None, density=DEFAULT_DENSITY, rng=None, unique=False, timeout=None,
+                    biggest_num=BIGGEST_NUM):
+    """
+    Generating a random puzzle
+    :param rows: the number of rows, counting the first row of clues
+    :param cols: the number of columns, the same as rows if None
+    :param density: the chance of every tile to be black, before the layout is cleaned
+    :param rng: a random.Random, a new one if None
+    :param unique: True to make sure the puzzle has a single solution
+    :param timeout: the seconds to give up on making a puzzle unique after, for each layout tried
+    :param biggest_num: the biggest digit, and the longest run
+    :return: the list of clues, and a dict from every white tile to its digit in the solution
+    """
+    if cols is None:
+        cols = rows
+    if rows < 3 or cols < 3 or not 0 <= density < 1:
+        raise ValueError("a puzzle needs at least 3 rows and columns, and a density under 1")
+    if rng is None:
+        rng = random.Random()
+    while True:
+        white = make_layout(rng, rows, cols, density, biggest_num)
+        values = fill_layout(rng, white, unique, biggest_num=biggest_num)
+        if values is None or len(values) == 0:
+            continue
+        if not unique:
+            return make_clues(white, values), values
+        deadline = None if timeout is None else time.monotonic() + timeout
+        clues = make_unique(white, values, deadline, biggest_num=biggest_num)
+        if clues is not None:
+            return clues, values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate random kakuro puzzles as JSONL")
+    parser.add_argument("rows", type=int, help="the number of rows, counting the first row of clues")
+    parser.add_argument("cols", type=int, nargs="?", help="the number of columns, the same as rows if not given")
+    parser.add_argument("-n", "--count", type=int, default=1, help="the number of puzzles")
+    parser.add_argument("-d", "--density", type=float, default=DEFAULT_DENSITY,
+                        help="the chance of every tile to be black")
+    parser.add_argument("-s", "--seed", type=int, help="the random seed, for a repeatable output")
+    parser.add_argument("-o", "--output", help="the puzzles file, the standard output if not given")
+    parser.add_argument("--unique", action="store_true", help="only generate puzzles with a single solution")
+    parser.add_argument("-t", "--timeout", type=float, default=10,
+                        help="the seconds to spend on making a layout unique before trying another")
+    parser.add_argument("--biggest", type=int, default=BIGGEST_NUM,
+                        help="the biggest digit, and the longest run, 16 for hex kakuro")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    output_file = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        for index in range(args.count):
+            clues = generate_puzzle(args.rows, args.cols, args.density, rng, args.unique, args.timeout,
+                                    args.biggest)[0]
+            output_file.write(json.dumps({"id": index + 1, "clues": clues}) + "\n")
+    finally:
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == '__main__':
+    main()
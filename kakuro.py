@@ -1,6 +1,9 @@
 from board import *
 from collections import deque
 import time
+import tracemalloc
+
+from stats import SolverStats, PHASE_PROPAGATION, PHASE_SELECTION, PHASE_COPY, PHASE_CHECK
 
 # 0 = horizontal 1 = vertical
 
@@ -43,55 +46,211 @@ EXAMPLE_3 = [(9, 2, 0, 1, 0), (21, 4, 0, 2, 0),
              (13, 3, 1, 1, 3), (11, 3, 1, 1, 4)]
 
 
+# what search_trail branches on: a tile's values, or at every node whichever
+# has fewer branches of them and the placements of the tile's constraints
+BRANCH_TILES = "tiles"
+BRANCH_ADAPTIVE = "adaptive"
+BRANCHINGS = (BRANCH_TILES, BRANCH_ADAPTIVE)
+
+# the tile branches a placement branch is estimated to be worth, since
+# the tiles of the placement are still to be filled under it
+PLACEMENT_BRANCH_COST = 2
+
+
+class SearchTimeout(Exception):
+    """
+    Raised when a search reaches its deadline or its boards budget before finishing
+    """
+
+    def __init__(self, num_used_boards, frontier=()):
+        """
+        :param num_used_boards: the number of boards used until now
+        :param frontier: the branches that were not searched yet, each as
+        a list of moves (see apply_move) from the board the search started at
+        """
+        super().__init__("search timed out after " + str(num_used_boards) + " boards")
+        self.num_used_boards = num_used_boards
+        self.frontier = frontier
+
+
 def minimal_remaining_values(board):
     """
-    :return: the location with the minimal number of remaining values to place
+    :return: the location with the minimal number of remaining values to place,
+    ties broken by the number of constraints on the tile
     """
-    min_values = float('inf')
-    best_tile = FLAG
-    for location in board.tiles:
-        cur_tile = board.get_tile(location[0], location[1])
-        if cur_tile.is_visited():
-            continue
-        tile_num_pos = cur_tile.num_possible()
-        if tile_num_pos < min_values:
-            min_values = tile_num_pos
-            best_tile = location
-    return best_tile
+    return board.get_min_remaining_tile()
 
 
-def single_turn(board, board_queue, num_used_boards):
+def propagate_board(board, stats=None):
+    """
+    Placing every forced value on the board, and propagating the constraints
+    :param board: the board we're looking at
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :return: False if the board turned out to have no solution
+    """
+    if stats is not None:
+        now = time.perf_counter()
     while True:
         single_value_tile = get_single_value_tiles(board)
+        if stats is not None:
+            now = stats.add_time(PHASE_SELECTION, now)
         if single_value_tile is not None:
             cur_tile = board.get_tile(single_value_tile[X_INDEX], single_value_tile[Y_INDEX])
             value = cur_tile.possible_values()[0]
-            board.place_tile(value, single_value_tile[X_INDEX], single_value_tile[Y_INDEX])
+            placed = board.place_tile(value, single_value_tile[X_INDEX], single_value_tile[Y_INDEX])
+            if stats is not None:
+                now = stats.add_time(PHASE_PROPAGATION, now)
+                stats.placed(board, single_value_tile, value, True)
+                if not placed:
+                    stats.wiped_out(board)
+            if not placed:
+                return False
             continue
 
-        board.update_constraints()
+        consistent = board.update_constraints()
+        if stats is not None:
+            now = stats.add_time(PHASE_PROPAGATION, now)
+            stats.propagation_passes += 1
+            if not consistent:
+                stats.wiped_out(board)
+        if not consistent:
+            return False
 
-        if not board.is_legal():
-            return
+        legal = board.is_legal()
+        if stats is not None:
+            stats.add_time(PHASE_CHECK, now)
+            if not legal:
+                stats.wiped_out(board)
+        return legal
 
-        if board.is_complete():
-            return
 
+def expand_board(board, stats=None, depth=0, ordering=None):
+    """
+    Placing every forced value on the board, and choosing the tile to branch on
+    :param board: the board we're looking at
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param depth: the number of branch moves leading to this board, for the stats
+    :param ordering: an ordering.Ordering choosing the tile, None for minimal_remaining_values
+    :return: the location to branch on, None if the board is complete or illegal
+    """
+    if stats is not None:
+        stats.node_expanded(board, depth)
+    if not propagate_board(board, stats) or board.is_complete():
+        return None
+
+    if stats is not None:
+        now = time.perf_counter()
+    if ordering is None:
         best_tile = minimal_remaining_values(board)
-        tile = board.get_tile(best_tile[X_INDEX], best_tile[Y_INDEX])
-        if tile is None:
-            board.print_board()
-            return
-
-        possible_values = tile.possible_values()
-
-        # more than one value, so we'll push them all into the queue as new boards
-        for possible in possible_values:
-            num_used_boards[0] += 1
-            n_board = board.one_move_board_copy(possible, best_tile[X_INDEX], best_tile[Y_INDEX])
-            board_queue.append(n_board)
+    else:
+        best_tile = ordering.choose_tile(board)
+    if stats is not None:
+        stats.add_time(PHASE_SELECTION, now)
+    if best_tile == FLAG:
+        return None
+    return best_tile
+
+
+def choose_branch(board, best_tile, branching=BRANCH_TILES, hint=None, ordering=None):
+    """
+    Choosing what to branch on: the tile chosen by expand_board, or a
+    constraint's possible placements. With BRANCH_ADAPTIVE the tile's own
+    listed constraint with the least placements is chosen when its estimated
+    branching factor, its number of placements times PLACEMENT_BRANCH_COST,
+    is at most the tile's number of values
+    :param board: the expanded board
+    :param best_tile: the location returned by expand_board
+    :param branching: one of BRANCHINGS
+    :param hint: a dict from locations to the values to try first in them, None for no hint
+    :param ordering: an ordering.Ordering ordering the tile's values, None to keep them increasing
+    :return: the tile's location or the constraint's index, and the list
+    of its values or its placement indexes, the last to be tried first
+    """
+    possible_values = board.tile_poss_values(best_tile[X_INDEX], best_tile[Y_INDEX])
+    if ordering is not None:
+        possible_values = ordering.order_values(board, best_tile, possible_values)
+    if hint is not None and hint.get(best_tile) in possible_values:
+        possible_values.remove(hint[best_tile])
+        possible_values.append(hint[best_tile])
+    if branching == BRANCH_TILES:
+        return best_tile, possible_values
+    best_index = None
+    best_size = None
+    for const_index in board.get_tile(best_tile[X_INDEX], best_tile[Y_INDEX]).get_constraints():
+        constraint = board.get_constraint(const_index)
+        # the placements of a constraint that isn't listed can't be branched on
+        if not constraint.is_listed():
+            continue
+        size = len(constraint.get_possible_ids())
+        if size > 1 and (best_size is None or size < best_size):
+            best_index = const_index
+            best_size = size
+    if best_index is None or best_size * PLACEMENT_BRANCH_COST > len(possible_values):
+        return best_tile, possible_values
+    return best_index, list(board.get_constraint(best_index).get_possible_ids())
+
+
+def apply_move(board, move):
+    """
+    Making a branch move: (location, value) places a value in a tile, and
+    (constraint index, placement index) keeps a single placement of a constraint
+    :param board: the board
+    :param move: the move
+    :return: False if the move breaks the board
+    """
+    branch, value = move
+    if isinstance(branch, int):
+        return board.commit_placement(branch, value)
+    return board.place_tile(value, branch[X_INDEX], branch[Y_INDEX])
+
+
+def single_turn(board, board_queue, num_used_boards, stats=None):
+    """
+    Expanding a board, and pushing a choice point for its branches into the
+    queue. The boards of the branches are only built when popped, by next_board
+    :param board: the board we're looking at
+    :param board_queue: the queue of choice points, as [board, location, values left]
+    :param num_used_boards: a list holding the number of used boards, added to for every branch
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    """
+    depth = 0
+    if stats is not None:
+        depth = board.get_serial_num().count(SEPARATE)
+    best_tile = expand_board(board, stats, depth)
+    if best_tile is None:
+        if stats is not None and not board.is_complete():
+            stats.backtracks += 1
         return
 
+    possible_values = board.tile_poss_values(best_tile[X_INDEX], best_tile[Y_INDEX])
+    num_used_boards[0] += len(possible_values)
+    board_queue.append([board, best_tile, possible_values])
+
+
+def next_board(board_queue, stats=None):
+    """
+    Building the board of the next branch of the last choice point in the queue.
+    The last branch of a choice point takes its board instead of a copy,
+    since no other branch needs it anymore
+    :param board_queue: the queue of choice points, as pushed by single_turn
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :return: the board of the branch
+    """
+    board, best_tile, possible_values = board_queue[-1]
+    possible = possible_values.pop()
+    if stats is not None:
+        start = time.perf_counter()
+    if len(possible_values) > 0:
+        n_board = board.one_move_board_copy(possible, best_tile[X_INDEX], best_tile[Y_INDEX])
+    else:
+        board_queue.pop()
+        n_board = board
+        n_board.one_move(possible, best_tile[X_INDEX], best_tile[Y_INDEX])
+    if stats is not None:
+        stats.add_time(PHASE_COPY, start)
+        stats.placed(n_board, best_tile, possible, False)
+    return n_board
+
 
 def get_single_value_tiles(board):
     """
@@ -99,28 +258,488 @@ def get_single_value_tiles(board):
     :param board: the board we're looking at
     :return:
     """
-    for tile_index, tile in board.get_tiles().items():
-        if tile.num_possible() == 1 and not tile.is_visited():
-            return tile_index
-    return None
+    return board.get_single_value_tile()
 
 
-def solve_kakuro_new(board):
+def search_copies(board, stats=None, deadline=None):
+    """
+    Searching for a solution, copying the board for every branch.
+    The queue holds a choice point for every level of the current branch,
+    each with a single board, so there are never more boards waiting than
+    there are tiles on the board (see SolverStats.max_frontier)
+    :param board: the board to solve
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :return: the solved board (None if there is none) and the number of used boards
+    """
+    board.stats = stats
+    if stats is not None:
+        start = time.perf_counter()
     num_used_boards = [1]
     board_queue = deque()
-    board_queue.append(board)
-    while len(board_queue) > 0:
-        cur_b = board_queue.pop()
-        single_turn(cur_b, board_queue, num_used_boards)
-        if cur_b.is_complete():
-            print(cur_b)
-            print("Number of used boards:", num_used_boards[0])
-            return
+    cur_b = board
+    solved = None
+    try:
+        while True:
+            single_turn(cur_b, board_queue, num_used_boards, stats)
+            if stats is not None:
+                stats.frontier_size(len(board_queue))
+            if cur_b.is_complete():
+                solved = cur_b
+                break
+            if len(board_queue) == 0:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise SearchTimeout(num_used_boards[0])
+            cur_b = next_board(board_queue, stats)
+    finally:
+        if stats is not None:
+            stats.used_boards = num_used_boards[0]
+            stats.total_seconds += time.perf_counter() - start
+    return solved, num_used_boards[0]
+
+
+def search_trail(board, deadline=None, max_boards=None, on_solution=None, stats=None, branching=BRANCH_TILES,
+                 should_stop=None, hint=None, table=None, ordering=None):
+    """
+    Searching for a solution on a single board, undoing the changes of
+    every failed branch instead of copying the board.
+    Visits the branches in the same order as search_copies when branching on tiles
+    :param board: the board to solve, it's left solved if there's a solution
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param max_boards: the number of boards to give up after, None to never give up
+    :param on_solution: if given, called with the board on every solution.
+    The search goes on to the next solution if it returns True, and stops otherwise
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param branching: one of BRANCHINGS, see choose_branch
+    :param should_stop: if given, called with no arguments before every branch,
+    and the search gives up like on its deadline when it returns True
+    :param hint: a dict from locations to the values to try first in them, like an earlier
+    solution of a similar puzzle, None to try the values in the usual order
+    :param table: a TranspositionTable of the puzzle to skip the boards it knows
+    to have no solution, and to remember the ones this search finds, None for no table.
+    A single search never reaches the same board twice, so the table is for sharing what
+    was learned between searches of the same puzzle, like the restarts of a search
+    :param ordering: an ordering.Ordering choosing the tile to branch on and the order
+    of its values, and told about every failure, None for the usual order
+    :return: the solved board (None if there is none) and the number of used boards
+    """
+    num_used_boards = 1
+    if board.trail is None:
+        board.start_trail()
+    if table is not None and board.hash_tables is None:
+        board.start_hashing()
+    board.stats = stats
+    if stats is not None:
+        search_start = time.perf_counter()
+
+    # the moves leading to the current branch, as taken by apply_move
+    moves = []
+
+    # the branches we didn't try yet, as (trail mark, number of moves, tile location
+    # or constraint index, values or placements left)
+    choice_points = []
+
+    # the boards branched on whose branches are still searched, as (trail mark,
+    # key, used boards when reached), to remember in table once they all failed
+    open_nodes = []
+    try:
+        best_tile = expand_board(board, stats, ordering=ordering)
+        while True:
+            if best_tile is not None and table is not None:
+                key = board.get_hash_key()
+                if table.is_dead(key, stats):
+                    best_tile = None
+                else:
+                    open_nodes.append((board.trail_mark(), key, num_used_boards))
+            if best_tile is not None:
+                branch, possible_values = choose_branch(board, best_tile, branching, hint, ordering)
+                num_used_boards += len(possible_values)
+                choice_points.append((board.trail_mark(), len(moves), branch, possible_values))
+            elif board.is_complete():
+                # the boards leading to a solution aren't dead ends
+                open_nodes.clear()
+                if on_solution is None or not on_solution(board):
+                    break
+            else:
+                if ordering is not None:
+                    ordering.on_failure(board)
+                if stats is not None:
+                    stats.backtracks += 1
+
+            if stats is not None:
+                stats.frontier_size(len(choice_points))
+
+            if len(choice_points) == 0:
+                close_nodes(open_nodes, -1, table, num_used_boards)
+                return None, num_used_boards
+
+            if (deadline is not None and time.monotonic() > deadline) or \
+                    (max_boards is not None and num_used_boards > max_boards) or \
+                    (should_stop is not None and should_stop()):
+                raise SearchTimeout(num_used_boards, unsearched_branches(moves, choice_points))
+
+            # the last pushed value is the first to be popped, like in board_queue
+            mark, num_moves, branch, possible_values = choice_points[-1]
+            close_nodes(open_nodes, mark, table, num_used_boards)
+            if stats is not None:
+                start = time.perf_counter()
+            board.undo_to(mark)
+            if stats is not None:
+                start = stats.add_time(PHASE_COPY, start)
+            del moves[num_moves:]
+            value = possible_values.pop()
+            if len(possible_values) == 0:
+                choice_points.pop()
+            moves.append((branch, value))
+            placed = apply_move(board, (branch, value))
+            if stats is not None:
+                stats.add_time(PHASE_PROPAGATION, start)
+                if isinstance(branch, int):
+                    stats.placement_branches += 1
+                else:
+                    stats.placed(board, branch, value, False)
+                if not placed:
+                    stats.wiped_out(board)
+                    stats.backtracks += 1
+            if placed:
+                best_tile = expand_board(board, stats, len(moves), ordering)
+            else:
+                best_tile = None
+    finally:
+        if stats is not None:
+            stats.used_boards = num_used_boards
+            stats.total_seconds += time.perf_counter() - search_start
+    return board, num_used_boards
+
+
+def close_nodes(open_nodes, mark, table, num_used_boards):
+    """
+    Remembering in the table the boards branched on after mark, since the
+    search goes back to mark after trying all their branches with no solution
+    :param open_nodes: the boards branched on, as kept by search_trail
+    :param mark: the trail mark the search goes back to, -1 once it's done
+    :param table: the transposition table, or None
+    :param num_used_boards: the number of used boards until now
+    """
+    while len(open_nodes) > 0 and open_nodes[-1][0] > mark:
+        _, key, start_boards = open_nodes.pop()
+        table.add_dead(key, num_used_boards - start_boards)
+
+
+def unsearched_branches(moves, choice_points):
+    """
+    :param moves: the moves leading to the current branch of a search_trail
+    :param choice_points: the choice points of that search
+    :return: a list of the branches left, each as a list of moves
+    """
+    branches = []
+    for _, num_moves, location, possible_values in choice_points:
+        for value in possible_values:
+            branches.append(moves[:num_moves] + [(location, value)])
+    return branches
+
+
+def replay_moves(board, moves):
+    """
+    Bringing a board from the state a search_trail started at to the state
+    reached after some moves, such as the ones of SearchTimeout.frontier
+    :param board: the board, in the state the search started at
+    :param moves: a list of moves, as taken by apply_move
+    :return: the location to branch on, None if the board is complete or illegal
+    """
+    best_tile = expand_board(board)
+    for move in moves:
+        if best_tile is None or not apply_move(board, move):
+            return None
+        best_tile = expand_board(board)
+    return best_tile
+
+
+def solve_component(board, locations, limit, num_used_boards, deadline=None, stats=None, depth=0, table=None,
+                    checked_key=None):
+    """
+    Counting the solutions of a group of tiles, branching only on its own tiles.
+    Whenever the unvisited tiles of the group fall apart into groups sharing
+    no constraint, each of them is solved apart, and their numbers of
+    solutions are multiplied instead of searching them as a single product.
+    The board is left in the state it was given in
+    :param board: the board, with a trail
+    :param locations: the locations of the group, sharing no constraint with the other unvisited tiles
+    :param limit: the number of solutions to stop at, None to count them all
+    :param num_used_boards: a list holding the number of used boards, added to as the search goes
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param depth: the number of branch moves leading to this board, for the stats
+    :param table: a TranspositionTable of the groups known to have no solution,
+    which the groups found to have none are added to, None for no table
+    :param checked_key: the Board.group_key of the group if the caller already looked it up in table
+    :return: the number of solutions found, up to limit, and a dict from each
+    of the locations to its value in the first of them (None if there's none)
+    """
+    mark = board.trail_mark()
+    start_boards = num_used_boards[0]
+    try:
+        key = checked_key
+        if table is not None and key is None:
+            key = board.group_key(locations)
+            if table.is_dead(key, stats):
+                if stats is not None:
+                    stats.backtracks += 1
+                return 0, None
+        if stats is not None:
+            stats.node_expanded(board, depth)
+        if not propagate_board(board, stats):
+            if stats is not None:
+                stats.backtracks += 1
+            return 0, None
+
+        values = {}
+        unvisited = []
+        for location in locations:
+            tile = board.get_tile(location[X_INDEX], location[Y_INDEX])
+            if tile.is_visited():
+                values[location] = tile.get_value()
+            else:
+                unvisited.append(location)
+        if len(unvisited) == 0:
+            return 1, values
+
+        components = board.get_components(unvisited)
+        if len(components) > 1:
+            # the small groups first, they're the quickest to find out if there's no solution
+            components.sort(key=len)
+            component_keys = [None] * len(components)
+            if table is not None:
+                # a group already known to have no solution fails them all, before solving any
+                for index, component in enumerate(components):
+                    component_keys[index] = board.group_key(component)
+                    if table.is_dead(component_keys[index], stats):
+                        table.add_dead(key, num_used_boards[0] - start_boards)
+                        return 0, None
+
+            num_solutions = 1
+            for component, component_key in zip(components, component_keys):
+                component_limit = None if limit is None else -(-limit // num_solutions)
+                component_solutions, component_values = solve_component(board, component, component_limit,
+                                                                        num_used_boards, deadline, stats, depth,
+                                                                        table, component_key)
+                if component_solutions == 0:
+                    if table is not None:
+                        table.add_dead(key, num_used_boards[0] - start_boards)
+                    return 0, None
+                num_solutions *= component_solutions
+                if limit is not None:
+                    num_solutions = min(num_solutions, limit)
+                values.update(component_values)
+            return num_solutions, values
+
+        location = board.get_min_remaining_tile_in(unvisited)
+        possible_values = board.tile_poss_values(location[X_INDEX], location[Y_INDEX])
+        num_used_boards[0] += len(possible_values)
+        if deadline is not None and time.monotonic() > deadline:
+            raise SearchTimeout(num_used_boards[0])
+
+        num_solutions = 0
+        first_values = None
+        branch_mark = board.trail_mark()
+        # the last value first, like search_trail
+        for value in reversed(possible_values):
+            branch_solutions = 0
+            placed = board.place_tile(value, location[X_INDEX], location[Y_INDEX])
+            if stats is not None:
+                stats.placed(board, location, value, False)
+                if not placed:
+                    stats.wiped_out(board)
+                    stats.backtracks += 1
+            if placed:
+                branch_limit = None if limit is None else limit - num_solutions
+                branch_solutions, branch_values = solve_component(board, unvisited, branch_limit, num_used_boards,
+                                                                  deadline, stats, depth + 1, table)
+                if branch_solutions > 0 and first_values is None:
+                    first_values = dict(values)
+                    first_values.update(branch_values)
+            board.undo_to(branch_mark)
+            num_solutions += branch_solutions
+            if limit is not None and num_solutions >= limit:
+                break
+        if num_solutions == 0 and table is not None:
+            table.add_dead(key, num_used_boards[0] - start_boards)
+        return num_solutions, first_values
+    finally:
+        board.undo_to(mark)
+
+
+def solve_components(board, limit=None, deadline=None, stats=None, table=None):
+    """
+    Counting the solutions of a board with solve_component, starting from all its tiles
+    :param board: the board to solve, left in the state it was given in
+    :param limit: the number of solutions to stop at, None to count them all
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param table: a TranspositionTable of the puzzle to learn the groups with no solution into, None for no
+    table. A group with no solution seldom comes back with the same possible values and the same numbers
+    placed around it, so the table is mostly for sharing what was learned between searches of a puzzle
+    :return: the number of solutions found (up to limit), the solution found first
+    as returned by Board.get_solution (None if there's none), and the number of used boards
+    """
+    num_used_boards = [1]
+    if board.trail is None:
+        board.start_trail()
+    board.stats = stats
+    if stats is not None:
+        search_start = time.perf_counter()
+    try:
+        num_solutions, values = solve_component(board, list(board.get_tiles()), limit, num_used_boards,
+                                                deadline, stats, table=table)
+    finally:
+        if stats is not None:
+            stats.used_boards = num_used_boards[0]
+            stats.total_seconds += time.perf_counter() - search_start
+    solution = None
+    if values is not None:
+        solution = [[row, col, value] for (row, col), value in sorted(values.items())]
+    return num_solutions, solution, num_used_boards[0]
+
+
+def search_components(board, deadline=None, stats=None):
+    """
+    Searching for a solution, solving apart the groups of tiles that share no constraint
+    :param board: the board to solve, it's left solved if there's a solution
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :return: the solved board (None if there is none) and the number of used boards
+    """
+    num_solutions, solution, num_used_boards = solve_components(board, 1, deadline, stats)
+    if num_solutions == 0:
+        return None, num_used_boards
+    for row, col, value in solution:
+        if not board.get_tile(row, col).is_visited():
+            board.place_tile(value, row, col)
+    return board, num_used_boards
+
+
+def count_solutions(board, limit=None, keep=1, deadline=None, stats=None, decompose=False,
+                    branching=BRANCH_TILES):
+    """
+    Counting the solutions of a board, stopping once limit of them are found.
+    A limit of 2 checks that a puzzle has a single solution
+    :param board: the board to solve
+    :param limit: the number of solutions to stop at, None to count them all
+    :param keep: the number of solutions to return, out of the first ones found
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param decompose: True to count with solve_components, multiplying the numbers of
+    solutions of independent groups of tiles. Only the first solution is kept then
+    :param branching: what search_trail branches on, one of BRANCHINGS
+    :return: a dict with the number of solutions found, the first solutions
+    (each as returned by Board.get_solution), whether the whole search tree was
+    searched (so the count is exact), the number of used boards and the seconds it took
+    """
+    start = time.perf_counter()
+    if decompose:
+        count, solution, num_used_boards = solve_components(board, limit, deadline, stats)
+        return {"count": count,
+                "solutions": [solution] if solution is not None and keep > 0 else [],
+                "exhausted": limit is None or count < limit,
+                "used_boards": num_used_boards,
+                "seconds": time.perf_counter() - start}
+
+    solutions = []
+    num_solutions = [0]
+
+    def on_solution(solved):
+        num_solutions[0] += 1
+        if len(solutions) < keep:
+            solutions.append(solved.get_solution())
+        return limit is None or num_solutions[0] < limit
+
+    num_used_boards = search_trail(board, deadline, on_solution=on_solution, stats=stats,
+                                   branching=branching)[1]
+    return {"count": num_solutions[0],
+            "solutions": solutions,
+            "exhausted": limit is None or num_solutions[0] < limit,
+            "used_boards": num_used_boards,
+            "seconds": time.perf_counter() - start}
+
+
+def has_single_solution(board, deadline=None):
+    """
+    :param board: the board to check
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :return: True if the board has exactly one solution
+    """
+    return count_solutions(board, limit=2, keep=0, deadline=deadline)["count"] == 1
+
+
+def solve_kakuro_new(board):
+    """
+    Solving a board, copying it for every branch
+    :param board: the board to solve
+    :return: the solved board (None if there is no solution) and the SolverStats of the solve
+    """
+    stats = SolverStats()
+    return search_copies(board, stats=stats)[0], stats
+
+
+def solve_kakuro_trail(board):
+    """
+    Same as solve_kakuro_new, without copying the board on every branch
+    :param board: the board to solve
+    :return: the solved board (None if there is no solution) and the SolverStats of the solve
+    """
+    stats = SolverStats()
+    return search_trail(board, stats=stats)[0], stats
+
+
+def solve_kakuro_components(board):
+    """
+    Same as solve_kakuro_trail, solving apart the groups of tiles that share no constraint
+    :param board: the board to solve
+    :return: the solved board (None if there is no solution) and the SolverStats of the solve
+    """
+    stats = SolverStats()
+    return search_components(board, stats=stats)[0], stats
+
+
+def measure_search(search, constraints):
+    """
+    Solving a new board, while measuring the time and memory it takes
+    :param search: search_copies, search_trail or search_components
+    :param constraints: the constraints of the board to solve
+    :return: a dict with the solution and the measurements
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    solved, num_used_boards = search(Board(constraints))
+    elapsed = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"solution": None if solved is None else str(solved),
+            "used_boards": num_used_boards,
+            "seconds": elapsed,
+            "boards_per_second": num_used_boards / elapsed if elapsed > 0 else float('inf'),
+            "peak_memory": peak_memory}
+
+
+def compare_searches(constraints):
+    """
+    Comparing the copying search against the trail searches on the same board
+    :param constraints: the constraints of the board to solve
+    :return: the measurements of each search, by name
+    """
+    return {"copies": measure_search(search_copies, constraints),
+            "trail": measure_search(search_trail, constraints),
+            "components": measure_search(search_components, constraints)}
 
 
 if __name__ == '__main__':
-    start = time.time()
-    board1 = Board(EXAMPLE_1)
-    solve_kakuro_new(board1)
-    end = time.time()
-    print("Time to solve (seconds):", end - start)
+    solved_board, solve_stats = solve_kakuro_new(Board(EXAMPLE_1))
+    print(solved_board)
+    print("Number of used boards:", solve_stats.used_boards)
+    print("Time to solve (seconds):", solve_stats.total_seconds)
+
+    for name, result in compare_searches(EXAMPLE_1).items():
+        print(name + ":", result["used_boards"], "boards,",
+              int(result["boards_per_second"]), "boards/second,",
+              result["peak_memory"], "bytes peak memory")
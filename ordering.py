@@ -0,0 +1,306 @@
+"""
+Pluggable orderings of the search: which tile to branch on, and in
+which order to try its values, with randomized restarts.
+The tile orderings:
+- mrv: the tile with the least values left, as search_trail does by default
+- dom_wdeg: the tile with the least values left over the weights of its
+  constraints, where a constraint weighs one more for every failure it caused,
+  so the search turns to the parts of the board that keep failing
+The value orderings:
+- increasing: the values in increasing order, the last one tried first as usual
+- lcv: the least constraining value first, the one keeping the most
+  placements in the tile's constraints
+- run_sum: the values at the end the tile's runs lean to first, so a run
+  whose sum is close to the smallest (or biggest) its tiles can sum up to
+  gets its small (or big) digits first
+An ordering is given a seed to break its ties at random, which makes every
+run of the search different. search_restarts gives up on a run after a
+number of boards, and starts over with the next run, keeping the weights
+learned. The numbers of boards follow a restart policy: the Luby sequence
+or a geometric one
+"""
+import random
+import time
+
+from board import FLAG, X_INDEX, Y_INDEX
+from domain import DIGIT_BITS, mask_digits
+from kakuro import search_trail, SearchTimeout
+
+VARIABLE_MRV = "mrv"
+VARIABLE_DOM_WDEG = "dom_wdeg"
+
+VALUE_INCREASING = "increasing"
+VALUE_LCV = "lcv"
+VALUE_RUN_SUM = "run_sum"
+
+RESTART_LUBY = "luby"
+RESTART_GEOMETRIC = "geometric"
+RESTARTS = (RESTART_LUBY, RESTART_GEOMETRIC)
+
+# the boards of the first run, which the policies multiply
+DEFAULT_RESTART_BASE = 100
+DEFAULT_GEOMETRIC_FACTOR = 1.5
+
+
+def choose_mrv(board, ordering):
+    """
+    :param board: the expanded board
+    :param ordering: the Ordering, breaking the ties at random if it has a seed
+    :return: the location of the tile with the least values left, and the most
+    constraints out of those, FLAG if every tile is visited
+    """
+    if ordering.rng is None:
+        return board.get_min_remaining_tile()
+    locations = board.get_min_remaining_tiles()
+    if len(locations) == 0:
+        return FLAG
+    return ordering.rng.choice(locations)
+
+
+def choose_dom_wdeg(board, ordering):
+    """
+    :param board: the expanded board
+    :param ordering: the Ordering, holding the weights of the constraints
+    :return: the location of the unvisited tile with the smallest number of values
+    over the weights of its constraints that have other tiles to fill, FLAG if
+    every tile is visited
+    """
+    best_tile = None
+    best_key = None
+    for tile in board.tiles_by_id:
+        if tile.is_visited():
+            continue
+        weighted_degree = 0
+        for const_index in tile.get_constraints():
+            if board.get_constraint(const_index).get_unfilled() > 1:
+                weighted_degree += ordering.get_weight(const_index)
+        score = tile.num_possible() / weighted_degree if weighted_degree > 0 else float("inf")
+        key = (score, ordering.tie_breaker(tile.get_index()))
+        if best_key is None or key < best_key:
+            best_tile = tile
+            best_key = key
+    if best_tile is None:
+        return FLAG
+    return best_tile.get_row(), best_tile.get_col()
+
+
+def order_increasing(board, location, values, ordering):
+    """
+    :param board: the expanded board
+    :param location: the location of the tile to branch on
+    :param values: the possible values of the tile, increasing
+    :param ordering: the Ordering
+    :return: the values, the last to be tried first
+    """
+    return values
+
+
+def order_lcv(board, location, values, ordering):
+    """
+    :param board: the expanded board
+    :param location: the location of the tile to branch on
+    :param values: the possible values of the tile, increasing
+    :param ordering: the Ordering, breaking the ties at random if it has a seed
+    :return: the values, the one keeping the most placements of the tile's constraints last, to be tried first
+    """
+    constraints = [board.get_constraint(const_index)
+                   for const_index in board.get_tile(location[X_INDEX], location[Y_INDEX]).get_constraints()]
+
+    def kept_placements(value):
+        kept = 1
+        for constraint in constraints:
+            kept *= len(constraint.placements_with_mask(DIGIT_BITS[value]))
+        return kept, ordering.tie_breaker(value)
+
+    return sorted(values, key=kept_placements)
+
+
+def order_run_sum(board, location, values, ordering):
+    """
+    :param board: the expanded board
+    :param location: the location of the tile to branch on
+    :param values: the possible values of the tile, increasing
+    :param ordering: the Ordering, breaking the ties at random if it has a seed
+    :return: the values, the ones the tile's runs lean to the most last, to be tried first
+    """
+    # for every run, how close its sum left is to the biggest its unfilled tiles can
+    # sum up to, from -0.5 at the smallest to 0.5 at the biggest
+    leanings = []
+    for const_index in board.get_tile(location[X_INDEX], location[Y_INDEX]).get_constraints():
+        constraint = board.get_constraint(const_index)
+        num_unfilled = constraint.get_unfilled()
+        left = constraint.get_total_sum() - constraint.get_partial_sum()
+        digits = mask_digits(board.full_mask & ~constraint.get_placed_mask())
+        smallest = sum(digits[:num_unfilled])
+        biggest = sum(digits[len(digits) - num_unfilled:])
+        if biggest > smallest:
+            leanings.append((left - smallest) / (biggest - smallest) - 0.5)
+
+    def leaning(value):
+        return sum(run_leaning * value for run_leaning in leanings), ordering.tie_breaker(value)
+
+    return sorted(values, key=leaning)
+
+
+VARIABLE_ORDERINGS = {VARIABLE_MRV: choose_mrv, VARIABLE_DOM_WDEG: choose_dom_wdeg}
+VALUE_ORDERINGS = {VALUE_INCREASING: order_increasing, VALUE_LCV: order_lcv, VALUE_RUN_SUM: order_run_sum}
+
+
+class Ordering:
+    """
+    The tile and value orderings of a search, and what they learn from its failures
+    """
+
+    def __init__(self, variable=VARIABLE_MRV, value=VALUE_INCREASING, seed=None):
+        """
+        Constructor of an ordering
+        :param variable: the name of a tile ordering in VARIABLE_ORDERINGS, or a function
+        taking the board and this ordering and returning the location to branch on
+        :param value: the name of a value ordering in VALUE_ORDERINGS, or a function taking the
+        board, the location, its values and this ordering and returning the values, the last first
+        :param seed: the seed to break ties at random with, None to break them the same way every time
+        """
+        self.choose_variable = VARIABLE_ORDERINGS.get(variable, variable)
+        self.order_value = VALUE_ORDERINGS.get(value, value)
+        self.rng = None if seed is None else random.Random(seed)
+
+        # the number of failures each constraint caused, by index
+        self.failures = {}
+
+    def get_weight(self, const_index):
+        """
+        :param const_index: the index of a constraint
+        :return: the weight of the constraint, one more than the failures it caused
+        """
+        return 1 + self.failures.get(const_index, 0)
+
+    def tie_breaker(self, default):
+        """
+        :param default: the key to break ties with when there's no seed
+        :return: a random key if the ordering has a seed, default otherwise
+        """
+        return default if self.rng is None else self.rng.random()
+
+    def choose_tile(self, board):
+        """
+        :param board: the expanded board
+        :return: the location of the tile to branch on, FLAG if every tile is visited
+        """
+        return self.choose_variable(board, self)
+
+    def order_values(self, board, location, values):
+        """
+        :param board: the expanded board
+        :param location: the location of the tile to branch on
+        :param values: the possible values of the tile
+        :return: the values, the last to be tried first
+        """
+        return self.order_value(board, location, values, self)
+
+    def on_failure(self, board):
+        """
+        Learning from a board found to have no solution
+        :param board: the board
+        """
+        const_index = board.pop_failed_constraint()
+        if const_index is not None:
+            self.failures[const_index] = self.failures.get(const_index, 0) + 1
+
+
+def luby(index):
+    """
+    :param index: the index of a term of the Luby sequence, from 0
+    :return: the term: 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    """
+    size = 1
+    power = 0
+    while size < index + 1:
+        size = 2 * size + 1
+        power += 1
+    while size - 1 != index:
+        size //= 2
+        power -= 1
+        index %= size
+    return 1 << power
+
+
+def restart_cutoffs(restarts=RESTART_LUBY, base=DEFAULT_RESTART_BASE, factor=DEFAULT_GEOMETRIC_FACTOR):
+    """
+    :param restarts: one of RESTARTS
+    :param base: the number of boards of the first run
+    :param factor: the number the boards of every run are multiplied by, for RESTART_GEOMETRIC
+    :return: an endless generator of the numbers of boards to give up each run after
+    """
+    index = 0
+    while True:
+        if restarts == RESTART_LUBY:
+            yield base * luby(index)
+        else:
+            yield int(base * factor ** index)
+        index += 1
+
+
+def search_ordered(board, deadline=None, max_boards=None, stats=None, variable=VARIABLE_MRV,
+                   value=VALUE_INCREASING, seed=None):
+    """
+    Searching for a solution with search_trail, in the order of a new Ordering
+    :param board: the board to solve, it's left solved if there's a solution
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param max_boards: the number of boards to give up after, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param variable: the tile ordering, as for Ordering
+    :param value: the value ordering, as for Ordering
+    :param seed: the seed to break ties at random with, None to break them the same way every time
+    :return: the solved board (None if there is none) and the number of used boards
+    """
+    return search_trail(board, deadline, max_boards, stats=stats, ordering=Ordering(variable, value, seed))
+
+
+def search_restarts(board, deadline=None, max_boards=None, stats=None, variable=VARIABLE_DOM_WDEG,
+                    value=VALUE_INCREASING, seed=0, restarts=RESTART_LUBY, base=DEFAULT_RESTART_BASE,
+                    table=None, should_stop=None):
+    """
+    Searching for a solution with runs of search_trail, each given up after the
+    number of boards of the restart policy and started over from the board given.
+    The runs share an Ordering with a seed, so every run breaks the ties its own
+    way, and the constraint weights it learned
+    :param board: the board to solve, it's left solved if there's a solution
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param max_boards: the number of boards to give up after, over all the runs, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :param variable: the tile ordering, as for Ordering
+    :param value: the value ordering, as for Ordering
+    :param seed: the seed of the ordering
+    :param restarts: one of RESTARTS
+    :param base: the number of boards of the first run
+    :param table: a TranspositionTable of the puzzle shared by the runs, so no run searches again
+    the boards the runs before it found to have no solution, None for no table. The runs seldom
+    reach the exact same boards, so it's mostly worth it for long runs
+    :param should_stop: a function to give up when it returns True, as in search_trail
+    :return: the solved board (None if there is none) and the number of used boards
+    """
+    if board.trail is None:
+        board.start_trail()
+    mark = board.trail_mark()
+    ordering = Ordering(variable, value, seed)
+    num_used_boards = 0
+    try:
+        for cutoff in restart_cutoffs(restarts, base):
+            run_boards = cutoff if max_boards is None else min(cutoff, max_boards - num_used_boards)
+            try:
+                solved, run_used_boards = search_trail(board, deadline, run_boards, stats=stats,
+                                                       table=table, ordering=ordering, should_stop=should_stop)
+                num_used_boards += run_used_boards
+                return solved, num_used_boards
+            except SearchTimeout as timeout:
+                num_used_boards += timeout.num_used_boards
+                if (deadline is not None and time.monotonic() > deadline) or \
+                        (max_boards is not None and num_used_boards >= max_boards) or \
+                        (should_stop is not None and should_stop()):
+                    raise SearchTimeout(num_used_boards)
+            board.undo_to(mark)
+            if stats is not None:
+                stats.restarts += 1
+    finally:
+        if stats is not None:
+            stats.used_boards = num_used_boards
@@ -0,0 +1,160 @@
+"""
+Solving a single hard puzzle on a pool of processes.
+The search tree is split at a shallow depth into branches, each sent to a
+worker as the short list of moves leading to it. A worker that searches a
+branch for too long gives back the branches it didn't search yet, so big
+subtrees are split again and shared between the workers
+"""
+import multiprocessing
+import os
+import queue
+from collections import deque
+
+from board import Board, X_INDEX, Y_INDEX
+from kakuro import expand_board, replay_moves, search_trail, SearchTimeout
+
+# how many branches each worker gets at once, and before starting
+BRANCHES_PER_WORKER = 4
+
+# the boards a worker may use on a branch before splitting it again
+BOARDS_PER_BRANCH = 2000
+
+# the board of a worker process, and its trail mark at the expanded root
+worker_board = None
+worker_root_mark = None
+
+
+def init_worker(constraints):
+    """
+    Building the board of a worker process, once for all its branches
+    :param constraints: the constraints of the puzzle
+    """
+    global worker_board, worker_root_mark
+    worker_board = Board(constraints)
+    worker_board.start_trail()
+    expand_board(worker_board)
+    worker_root_mark = worker_board.trail_mark()
+
+
+def search_branch(moves, max_boards, count_all):
+    """
+    Searching a single branch in a worker process
+    :param moves: the list of (location, value) moves leading to the branch
+    :param max_boards: the number of boards to use before giving the rest back
+    :param count_all: True to go on after a solution, counting them all
+    :return: the number of solutions found, the first of them (None if there's none),
+    the number of used boards and the list of branches that were not searched
+    """
+    board = worker_board
+    board.undo_to(worker_root_mark)
+    solutions = []
+
+    def on_solution(solved):
+        solutions.append(solved.get_solution() if len(solutions) == 0 else None)
+        return count_all
+
+    if replay_moves(board, moves) is None:
+        if board.is_complete():
+            on_solution(board)
+        return len(solutions), solutions[0] if solutions else None, 1, []
+
+    try:
+        num_used_boards = search_trail(board, max_boards=max_boards, on_solution=on_solution)[1]
+        branches_left = []
+    except SearchTimeout as timed_out:
+        num_used_boards = timed_out.num_used_boards
+        branches_left = [moves + branch for branch in timed_out.frontier]
+    return len(solutions), solutions[0] if solutions else None, num_used_boards, branches_left
+
+
+def split_branches(board, num_branches, count_all):
+    """
+    Splitting the search tree of a board, level by level, until it has enough branches
+    :param board: the board to split
+    :param num_branches: the number of branches to stop at
+    :param count_all: True to go on after a solution, counting them all
+    :return: the list of branches as lists of moves, the number of solutions
+    found while splitting, the first of them and the number of used boards
+    """
+    board.start_trail()
+    expand_board(board)
+    root_mark = board.trail_mark()
+
+    branches = deque([[]])
+    num_solutions = 0
+    solution = None
+    num_used_boards = 1
+    while 0 < len(branches) < num_branches:
+        moves = branches.popleft()
+        board.undo_to(root_mark)
+        best_tile = replay_moves(board, moves)
+        if best_tile is None:
+            if board.is_complete():
+                num_solutions += 1
+                if solution is None:
+                    solution = board.get_solution()
+                if not count_all:
+                    return [], num_solutions, solution, num_used_boards
+            continue
+
+        possible_values = board.tile_poss_values(best_tile[X_INDEX], best_tile[Y_INDEX])
+        num_used_boards += len(possible_values)
+        for value in possible_values:
+            branches.append(moves + [(best_tile, value)])
+    return list(branches), num_solutions, solution, num_used_boards
+
+
+def solve_parallel(constraints, workers=None, count_all=False, max_boards=BOARDS_PER_BRANCH):
+    """
+    Solving a single puzzle on a pool of processes
+    :param constraints: the constraints of the puzzle
+    :param workers: the number of processes, all the cpus if None
+    :param count_all: False to stop the workers at the first solution,
+    True to search the whole tree and count the solutions
+    :param max_boards: the number of boards a worker uses on a branch before splitting it
+    :return: a dict with the first solution found (a list of [row, col, value],
+    None if there's none), the number of solutions found, the number of used
+    boards over all the processes and the number of branches searched
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    branches, num_solutions, solution, num_used_boards = \
+        split_branches(Board(constraints), workers * BRANCHES_PER_WORKER, count_all)
+    num_branches = 0
+
+    if solution is None or count_all:
+        results = queue.Queue()
+        waiting = deque(branches)
+        running = 0
+        pool = multiprocessing.Pool(workers, init_worker, (constraints,))
+        try:
+            while len(waiting) > 0 or running > 0:
+                while len(waiting) > 0 and running < workers * BRANCHES_PER_WORKER:
+                    pool.apply_async(search_branch, (waiting.popleft(), max_boards, count_all),
+                                     callback=results.put, error_callback=results.put)
+                    running += 1
+
+                result = results.get()
+                running -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                branch_solutions, branch_solution, branch_boards, branches_left = result
+                num_solutions += branch_solutions
+                num_used_boards += branch_boards
+                num_branches += 1
+                if solution is None:
+                    solution = branch_solution
+                if solution is not None and not count_all:
+                    break
+
+                # the split branches go first, to finish the big subtree before starting new ones
+                waiting.extendleft(reversed(branches_left))
+        finally:
+            # stops the workers still searching right away
+            pool.terminate()
+            pool.join()
+
+    return {"solution": solution,
+            "solutions": num_solutions,
+            "used_boards": num_used_boards,
+            "branches": num_branches}
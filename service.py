@@ -0,0 +1,370 @@
+"""
+An asyncio service solving puzzles on a pool of workers, to embed the
+solver in a server without blocking its event loop.
+Requests wait in a bounded queue, so a caller trying to add to a full
+queue waits for room until its deadline (or gets asyncio.QueueFull), and
+each of the workers solves one request at a time. Every request has a deadline and a boards
+budget, which the search checks between its branches. A request that times
+out or is cancelled by its caller raises the stop flag of its worker, so the
+search gives up at its next branch and the worker is free again. A request
+for a puzzle already queued or being solved (or its transpose) joins that
+solve instead of starting another one, and the solve then goes on until the
+latest deadline of the requests that joined it. Closing the service gives the
+requests still waiting an error result.
+It's used from a coroutine, in the same process as the event loop:
+
+async with SolveService(workers=4, timeout=10) as service:
+    result = await service.solve(clues)
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from batch import check_clues, read_puzzles, solve_puzzle, JSONL_FORMAT, TEXT_FORMAT, STATUS_TIMEOUT, STATUS_ERROR
+from cache import puzzle_key, transpose_solution
+
+DEFAULT_MAX_QUEUE = 100
+
+# the stop flag of every worker process, one byte each, set up by init_worker
+stop_flags = None
+
+
+def init_worker(flags):
+    """
+    Setting up a worker with the stop flags shared with the service
+    :param flags: a shared array of a byte for each worker
+    """
+    global stop_flags
+    stop_flags = flags
+
+
+def solve_request(clues, max_boards, slot, flags=None):
+    """
+    Solving a single request in a worker, giving up once its stop flag is raised,
+    which the service also does at the deadline of the request
+    :param clues: the clues of the puzzle
+    :param max_boards: the number of boards to give up after, None to never give up
+    :param slot: the index of the worker's stop flag
+    :param flags: the stop flags of the service, the ones set up by init_worker if None.
+    Threads get them here, since the services of a process don't share them
+    :return: the result, as returned by batch.solve_puzzle
+    """
+    if flags is None:
+        flags = stop_flags
+    return solve_puzzle(None, clues, max_boards=max_boards, should_stop=lambda: flags[slot] != 0)
+
+
+def timeout_result(start):
+    """
+    :param start: the time.perf_counter() value the request started at
+    :return: the result of a request that timed out before its puzzle was solved
+    """
+    return {"id": None, "status": STATUS_TIMEOUT, "solution": None, "used_boards": 0,
+            "seconds": time.perf_counter() - start}
+
+
+def closed_result():
+    """
+    :return: the result of a request still waiting when the service was closed
+    """
+    return {"id": None, "status": STATUS_ERROR, "solution": None, "used_boards": 0, "seconds": 0.0,
+            "error": "the service was closed"}
+
+
+class SolveJob:
+    """
+    A puzzle queued or being solved, and the requests waiting for it
+    """
+
+    def __init__(self, key, clues, transposed, deadline, max_boards, future):
+        """
+        Constructor of a job
+        :param key: the key of the job in the requests in flight
+        :param clues: the clues of the puzzle, as given by the first request
+        :param transposed: True if the clues are the transposed ones, as in cache.puzzle_key
+        :param deadline: a time.monotonic() value to give up at, None to never give up.
+        It's moved to the deadline of every later request joining the job, if it's later
+        :param max_boards: the number of boards to give up after, None to never give up
+        :param future: the asyncio future of the result
+        """
+        self.key = key
+        self.clues = clues
+        self.transposed = transposed
+        self.deadline = deadline
+        self.max_boards = max_boards
+        self.future = future
+        self.num_waiting = 0
+        self.cancelled = False
+
+        # the index of the worker solving the job, None while it's queued
+        self.slot = None
+
+
+class SolveService:
+    """
+    Solving puzzles on a pool of workers, for the coroutines of one event loop
+    """
+
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE, timeout=None, max_boards=None, processes=True):
+        """
+        Constructor of a service, started by start() or async with
+        :param workers: the number of workers, all the cpus if None
+        :param max_queue: the number of requests that may wait for a worker
+        :param timeout: the seconds a request may take by default, None to never give up
+        :param max_boards: the number of boards a request may use by default, None for no limit
+        :param processes: True to solve on processes, False to solve on threads of this process,
+        which doesn't solve in parallel but needs no process to start
+        """
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_boards = max_boards
+        self.processes = processes
+
+        self.executor = None
+        self.stop_flags = None
+        self.queue = None
+        self.runners = []
+
+        # the jobs queued or being solved, by the key of their puzzle
+        self.in_flight = {}
+
+    async def start(self):
+        """
+        Starting the workers
+        """
+        if self.processes:
+            self.stop_flags = multiprocessing.RawArray("b", self.workers)
+            self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                                initargs=(self.stop_flags,))
+        else:
+            self.stop_flags = bytearray(self.workers)
+            self.executor = ThreadPoolExecutor(self.workers)
+        self.queue = asyncio.Queue(self.max_queue)
+        self.runners = [asyncio.create_task(self.run_worker(slot)) for slot in range(self.workers)]
+
+    async def close(self):
+        """
+        Stopping every solve, and the workers. The requests still waiting get closed_result()
+        """
+        for job in list(self.in_flight.values()):
+            self.cancel_job(job)
+            if not job.future.done():
+                job.future.set_result(closed_result())
+        for runner in self.runners:
+            runner.cancel()
+        await asyncio.gather(*self.runners, return_exceptions=True)
+        self.runners = []
+
+        # making room for the requests waiting to be queued, their jobs are done already
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def get_queue_size(self):
+        """
+        :return: the number of requests waiting for a worker
+        """
+        return self.queue.qsize()
+
+    def get_num_in_flight(self):
+        """
+        :return: the number of distinct puzzles queued or being solved
+        """
+        return len(self.in_flight)
+
+    async def solve(self, clues, timeout=None, max_boards=None, wait=True):
+        """
+        Solving a puzzle on one of the workers
+        :param clues: the clues of the puzzle
+        :param timeout: the seconds to give up after, the service's timeout if None
+        :param max_boards: the number of boards to give up after, the service's limit if None
+        :param wait: True to wait for room in a full queue, False to raise asyncio.QueueFull
+        :return: the result, as returned by batch.solve_puzzle, with "shared" True if
+        the request joined the solve of an identical one
+        """
+        start = time.perf_counter()
+        clues = check_clues(clues)
+        timeout = self.timeout if timeout is None else timeout
+        max_boards = self.max_boards if max_boards is None else max_boards
+        deadline = None if timeout is None else time.monotonic() + timeout
+        key, transposed = puzzle_key(clues)
+        key = (key, max_boards)
+
+        job = self.in_flight.get(key)
+        shared = job is not None
+        if job is None:
+            job = SolveJob(key, clues, transposed, deadline, max_boards, asyncio.get_running_loop().create_future())
+            if not wait and self.queue.full():
+                raise asyncio.QueueFull()
+            self.in_flight[key] = job
+        elif job.deadline is not None:
+            # the solve goes on for the request with the latest deadline
+            job.deadline = None if deadline is None else max(job.deadline, deadline)
+
+        job.num_waiting += 1
+        try:
+            if not shared and not await self.queue_job(job):
+                # the requests that joined meanwhile get the timeout too
+                self.cancel_job(job)
+                job.future.set_result(timeout_result(start))
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                result = dict(await asyncio.wait_for(asyncio.shield(job.future), remaining))
+            except asyncio.TimeoutError:
+                result = timeout_result(start)
+        finally:
+            job.num_waiting -= 1
+            if job.num_waiting == 0 and not job.future.done():
+                self.cancel_job(job)
+
+        if result["solution"] is not None and transposed != job.transposed:
+            result["solution"] = transpose_solution(result["solution"])
+        result["shared"] = shared
+        result["seconds"] = time.perf_counter() - start
+        return result
+
+    async def queue_job(self, job):
+        """
+        Queueing a job, waiting for room in a full queue until its deadline,
+        which may move later meanwhile
+        :param job: the job
+        :return: False if the deadline passed before there was room
+        """
+        while True:
+            remaining = None if job.deadline is None else job.deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.queue.put(job), remaining)
+                return True
+            except asyncio.TimeoutError:
+                pass
+
+    def cancel_job(self, job):
+        """
+        Giving up on a job no request waits for anymore, raising the stop flag of its worker
+        :param job: the job
+        """
+        job.cancelled = True
+        if self.in_flight.get(job.key) is job:
+            del self.in_flight[job.key]
+        if job.slot is not None:
+            self.stop_flags[job.slot] = 1
+
+    async def stop_at_deadline(self, job, slot):
+        """
+        Raising the stop flag of the worker solving a job once its deadline passed,
+        which may move later while it's solved
+        :param job: the job
+        :param slot: the index of the worker solving it
+        """
+        while job.deadline is not None:
+            remaining = job.deadline - time.monotonic()
+            if remaining <= 0:
+                self.stop_flags[slot] = 1
+                return
+            await asyncio.sleep(remaining)
+
+    async def run_worker(self, slot):
+        """
+        Solving the queued jobs one at a time, on a single worker
+        :param slot: the index of the worker, and of its stop flag
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.cancelled:
+                    continue
+                start = time.perf_counter()
+                remaining = None if job.deadline is None else job.deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    job.future.set_result(timeout_result(start))
+                    continue
+
+                self.stop_flags[slot] = 0
+                job.slot = slot
+                watchdog = asyncio.create_task(self.stop_at_deadline(job, slot))
+                try:
+                    # processes read the flags set up by init_worker
+                    flags = None if self.processes else self.stop_flags
+                    result = await asyncio.shield(loop.run_in_executor(self.executor, solve_request, job.clues,
+                                                                       job.max_boards, slot, flags))
+                except asyncio.CancelledError:
+                    # the service is closing, the flag stops the search
+                    self.stop_flags[slot] = 1
+                    raise
+                finally:
+                    watchdog.cancel()
+                    job.slot = None
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                if self.in_flight.get(job.key) is job:
+                    del self.in_flight[job.key]
+                self.queue.task_done()
+
+
+async def solve_all(puzzles, workers=None, timeout=None, max_boards=None, processes=True):
+    """
+    Solving puzzles through a SolveService, all of them requested at once
+    :param puzzles: a list of (puzzle id, clues)
+    :param workers: the number of workers, all the cpus if None
+    :param timeout: the seconds to give up on each puzzle after, None to never give up
+    :param max_boards: the number of boards to give up on each puzzle after, None for no limit
+    :param processes: True to solve on processes, False on threads
+    :return: the list of results, in the order of the puzzles
+    """
+    async def solve_one(service, puzzle_id, clues):
+        try:
+            result = await service.solve(clues)
+        except ValueError as error:
+            result = {"status": STATUS_ERROR, "solution": None, "used_boards": 0, "seconds": 0.0,
+                      "error": repr(error)}
+        result["id"] = puzzle_id
+        return result
+
+    async with SolveService(workers, timeout=timeout, max_boards=max_boards, processes=processes) as service:
+        return await asyncio.gather(*(solve_one(service, puzzle_id, clues) for puzzle_id, clues in puzzles))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of kakuro puzzles through the asyncio service")
+    parser.add_argument("puzzles", help="the puzzles file, - to read from the standard input")
+    parser.add_argument("-f", "--format", choices=[JSONL_FORMAT, TEXT_FORMAT],
+                        help="the format of the puzzles file, by its extension if not given")
+    parser.add_argument("-j", "--workers", type=int, help="the number of workers, all the cpus if not given")
+    parser.add_argument("-t", "--timeout", type=float, help="the seconds to give up on each puzzle after")
+    parser.add_argument("--max-boards", type=int, help="the number of boards to give up on each puzzle after")
+    parser.add_argument("--threads", action="store_true", help="solve on threads of this process")
+    args = parser.parse_args(argv)
+
+    line_format = args.format
+    if line_format is None:
+        line_format = JSONL_FORMAT if args.puzzles.endswith((".jsonl", ".json")) else TEXT_FORMAT
+    input_file = sys.stdin if args.puzzles == "-" else open(args.puzzles)
+    try:
+        puzzles = list(read_puzzles(input_file, line_format))
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+    for result in asyncio.run(solve_all(puzzles, args.workers, args.timeout, args.max_boards, not args.threads)):
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Counters and timings of a single solve.
+A SolverStats passed to a search is filled in as it goes, and callbacks
+added to it are called on every expanded board, placement and wipeout.
+Without a SolverStats the search only pays for a few None checks
+"""
+import time
+
+PHASE_PROPAGATION = "propagation"
+PHASE_SELECTION = "selection"
+PHASE_COPY = "copy"
+PHASE_CHECK = "check"
+PHASES = (PHASE_PROPAGATION, PHASE_SELECTION, PHASE_COPY, PHASE_CHECK)
+
+
+class SolverStats:
+    """
+    The statistics of a single solve
+    """
+
+    def __init__(self):
+        """
+        Constructor of empty statistics
+        """
+        self.nodes_expanded = 0
+        self.forced_placements = 0
+        self.branch_placements = 0
+        self.placement_branches = 0
+        self.propagation_passes = 0
+        self.revisions = 0
+        self.wipeouts = 0
+        self.backtracks = 0
+        self.skipped_levels = 0
+        self.learned_nogoods = 0
+        self.transposition_hits = 0
+        self.transposition_misses = 0
+        self.restarts = 0
+        self.max_depth = 0
+        self.max_frontier = 0
+        self.used_boards = 0
+
+        # the number of values removed from the tiles, by propagator name
+        self.prunings = {}
+
+        # the seconds spent in each phase, and in the whole solve
+        self.phase_seconds = {phase: 0.0 for phase in PHASES}
+        self.total_seconds = 0.0
+
+        self.node_callbacks = []
+        self.placement_callbacks = []
+        self.wipeout_callbacks = []
+
+    def add_node_callback(self, callback):
+        """
+        :param callback: called with the board and its depth, on every expanded board
+        """
+        self.node_callbacks.append(callback)
+
+    def add_placement_callback(self, callback):
+        """
+        :param callback: called with the board, the location, the value and
+        True if the value was forced, on every placement
+        """
+        self.placement_callbacks.append(callback)
+
+    def add_wipeout_callback(self, callback):
+        """
+        :param callback: called with the board, on every board found to have no solution
+        """
+        self.wipeout_callbacks.append(callback)
+
+    def add_time(self, phase, start):
+        """
+        Adding the time since start to a phase
+        :param phase: one of PHASES
+        :param start: a time.perf_counter() value
+        :return: the current time.perf_counter(), to start the next phase from
+        """
+        now = time.perf_counter()
+        self.phase_seconds[phase] += now - start
+        return now
+
+    def add_pruning(self, propagator, count):
+        """
+        :param propagator: the name of the propagator that removed values
+        :param count: the number of values it removed
+        """
+        self.prunings[propagator] = self.prunings.get(propagator, 0) + count
+
+    def node_expanded(self, board, depth):
+        """
+        Recording a board the search starts to expand
+        :param board: the board
+        :param depth: the number of branch moves leading to it
+        """
+        self.nodes_expanded += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        for callback in self.node_callbacks:
+            callback(board, depth)
+
+    def placed(self, board, location, value, forced):
+        """
+        Recording a placement
+        :param board: the board
+        :param location: the location of the tile
+        :param value: the placed value
+        :param forced: True if it was the only value left for the tile
+        """
+        if forced:
+            self.forced_placements += 1
+        else:
+            self.branch_placements += 1
+        for callback in self.placement_callbacks:
+            callback(board, location, value, forced)
+
+    def wiped_out(self, board):
+        """
+        Recording a board found to have no solution
+        :param board: the board
+        """
+        self.wipeouts += 1
+        for callback in self.wipeout_callbacks:
+            callback(board)
+
+    def frontier_size(self, size):
+        """
+        :param size: the current number of boards or branches waiting to be searched
+        """
+        if size > self.max_frontier:
+            self.max_frontier = size
+
+    def transposition_hit_rate(self):
+        """
+        :return: the fraction of the transposition table lookups that found
+        their state, 0 if there was none
+        """
+        lookups = self.transposition_hits + self.transposition_misses
+        return self.transposition_hits / lookups if lookups > 0 else 0.0
+
+    def as_dict(self):
+        """
+        :return: the statistics as a dict of plain values, to export
+        """
+        return {"nodes_expanded": self.nodes_expanded,
+                "forced_placements": self.forced_placements,
+                "branch_placements": self.branch_placements,
+                "placement_branches": self.placement_branches,
+                "propagation_passes": self.propagation_passes,
+                "revisions": self.revisions,
+                "prunings": dict(self.prunings),
+                "wipeouts": self.wipeouts,
+                "backtracks": self.backtracks,
+                "skipped_levels": self.skipped_levels,
+                "learned_nogoods": self.learned_nogoods,
+                "transposition_hits": self.transposition_hits,
+                "transposition_misses": self.transposition_misses,
+                "transposition_hit_rate": self.transposition_hit_rate(),
+                "restarts": self.restarts,
+                "max_depth": self.max_depth,
+                "max_frontier": self.max_frontier,
+                "used_boards": self.used_boards,
+                "phase_seconds": dict(self.phase_seconds),
+                "total_seconds": self.total_seconds}
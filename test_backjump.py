@@ -0,0 +1,66 @@
+"""
+Tests of the backjumping search against search_trail
+"""
+from benchmark import load_corpus
+from board import Board
+from backjump import search_backjump, NogoodStore
+from kakuro import search_trail
+
+# a 2x2 puzzle with a single solution, and one whose rows sum up to less than its columns
+TINY = [(3, 2, 0, 1, 0), (4, 2, 0, 2, 0), (4, 2, 1, 0, 1), (3, 2, 1, 0, 2)]
+UNSOLVABLE = [(3, 2, 0, 1, 0), (3, 2, 0, 2, 0), (5, 2, 1, 0, 1), (5, 2, 1, 0, 2)]
+
+GRADES = ("examples", "small", "medium", "large")
+
+# the hard puzzles of the other grades take search_trail seconds
+HARD_PUZZLES = ("hard-12x12-102",)
+
+
+def check_solution(clues, solution):
+    """
+    :param clues: the clues of a puzzle
+    :param solution: a solution of it, as returned by Board.get_solution
+    """
+    values = {(row, col): value for row, col, value in solution}
+    for constraint in Board(clues).constraints.values():
+        run = [values[location] for location in constraint.get_locations()]
+        assert len(set(run)) == len(run)
+        assert sum(run) == constraint.get_total_sum()
+
+
+def test_solves_like_search_trail():
+    for puzzle in load_corpus():
+        if puzzle["grade"] not in GRADES and puzzle["id"] not in HARD_PUZZLES:
+            continue
+        # big nogoods too, so there are more of them to check
+        nogoods = NogoodStore(max_size=8)
+        solved = search_backjump(Board(puzzle["clues"]), nogoods=nogoods)[0]
+        expected = search_trail(Board(puzzle["clues"]))[0]
+        assert (solved is None) == (expected is None), puzzle["id"]
+        check_solution(puzzle["clues"], solved.get_solution())
+
+        # no nogood learned rules out a solution
+        for solution in (solved.get_solution(), expected.get_solution()):
+            values = {(row, col): value for row, col, value in solution}
+            for placements in nogoods.nogoods.values():
+                assert not all(values[location] == value for location, value in placements), puzzle["id"]
+
+
+def test_unsolvable():
+    assert search_backjump(Board(UNSOLVABLE))[0] is None
+
+
+def test_nogood_prunes():
+    nogoods = NogoodStore()
+    assert nogoods.add_nogood([((1, 1), 1)])
+    # the only solution has a 1 in (1, 1)
+    assert search_backjump(Board(TINY), nogoods=nogoods)[0] is None
+    assert search_backjump(Board(TINY))[0].get_solution() == [[1, 1, 1], [1, 2, 2], [2, 1, 3], [2, 2, 1]]
+
+
+def test_store_is_bounded():
+    nogoods = NogoodStore(max_nogoods=2, max_size=2)
+    assert not nogoods.add_nogood([((1, 1), 1), ((1, 2), 2), ((2, 1), 3)])
+    for value in (1, 2, 3):
+        assert nogoods.add_nogood([((1, 1), value)])
+    assert nogoods.get_num_nogoods() == 2
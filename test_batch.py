@@ -0,0 +1,52 @@
+"""
+Tests of the result lines of batch.py
+"""
+import json
+
+from batch import main, solve_puzzle, STATUS_SOLVED, STATUS_UNSOLVABLE, STATUS_TIMEOUT, STATUS_ERROR
+from kakuro import EXAMPLE_1
+
+# a 2x2 puzzle, and one whose rows sum up to less than its columns
+TINY = [(3, 2, 0, 1, 0), (4, 2, 0, 2, 0), (4, 2, 1, 0, 1), (3, 2, 1, 0, 2)]
+UNSOLVABLE = [(3, 2, 0, 1, 0), (3, 2, 0, 2, 0), (5, 2, 1, 0, 1), (5, 2, 1, 0, 2)]
+
+
+def test_solved():
+    result = solve_puzzle("tiny", TINY)
+    assert result["id"] == "tiny"
+    assert result["status"] == STATUS_SOLVED
+    assert result["solution"] == [[1, 1, 1], [1, 2, 2], [2, 1, 3], [2, 2, 1]]
+
+
+def test_unsolvable():
+    result = solve_puzzle(1, UNSOLVABLE)
+    assert result["status"] == STATUS_UNSOLVABLE
+    assert result["solution"] is None
+
+
+def test_timeout():
+    result = solve_puzzle(1, EXAMPLE_1, timeout=0)
+    assert result["status"] == STATUS_TIMEOUT
+    assert result["solution"] is None
+    assert result["used_boards"] > 0
+
+
+def test_errors():
+    for clues in ("not clues", [], [(3, 2, 0, 1)], [(3, 2, 5, 1, 0)]):
+        result = solve_puzzle(1, clues)
+        assert result["status"] == STATUS_ERROR
+        assert "error" in result
+        assert result["solution"] is None
+
+
+def test_main_writes_a_line_for_each_puzzle(tmp_path):
+    puzzles_path = tmp_path / "puzzles.jsonl"
+    puzzles_path.write_text(json.dumps({"id": "tiny", "clues": TINY}) + "\n"
+                            + "# a comment\n"
+                            + "{not json\n"
+                            + json.dumps(UNSOLVABLE) + "\n")
+    results_path = tmp_path / "results.jsonl"
+    main([str(puzzles_path), "-o", str(results_path), "-j", "2"])
+    results = [json.loads(line) for line in results_path.read_text().splitlines()]
+    assert [(result["id"], result["status"]) for result in results] == \
+        [("tiny", STATUS_SOLVED), (3, STATUS_ERROR), (4, STATUS_UNSOLVABLE)]
@@ -0,0 +1,105 @@
+"""
+Tests of the solution cache
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import get_cache
+from board import Board
+from cache import SolutionCache, transpose_clues, transpose_solution, puzzle_key
+from kakuro import search_trail, EXAMPLE_1, EXAMPLE_3
+
+# three small puzzles, none the transpose of another
+TINY = [(3, 2, 0, 1, 0), (4, 2, 0, 2, 0), (4, 2, 1, 0, 1), (3, 2, 1, 0, 2)]
+PUZZLES = [TINY, EXAMPLE_1, EXAMPLE_3]
+
+
+def solve(clues):
+    """
+    :param clues: the clues of a puzzle
+    :return: its solution, as returned by Board.get_solution
+    """
+    return search_trail(Board(clues))[0].get_solution()
+
+
+def test_transpose_round_trip():
+    solution = solve(EXAMPLE_1)
+    assert sorted(transpose_clues(transpose_clues(EXAMPLE_1))) == sorted(EXAMPLE_1)
+    assert transpose_solution(transpose_solution(solution)) == solution
+    assert puzzle_key(EXAMPLE_1)[0] == puzzle_key(transpose_clues(EXAMPLE_1))[0]
+
+    cache = SolutionCache(":memory:")
+    cache.put_solution(EXAMPLE_1, solution)
+    assert cache.get_solution(EXAMPLE_1) == (True, solution)
+    # the transposed puzzle gets the solution in its own orientation
+    assert cache.get_solution(transpose_clues(EXAMPLE_1)) == (True, solve(transpose_clues(EXAMPLE_1)))
+    cache.close()
+
+
+def test_unsolvable_and_missing():
+    cache = SolutionCache(":memory:")
+    cache.put_solution(TINY, None)
+    assert cache.get_solution(TINY) == (True, None)
+    assert cache.get_solution(EXAMPLE_1) == (False, None)
+    cache.close()
+
+
+def test_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "solutions.sqlite")
+    cache = SolutionCache(path, max_entries=2)
+    first, second, third = PUZZLES
+    cache.put_solution(first, solve(first))
+    cache.put_solution(second, solve(second))
+    # using the first puzzle makes the second one the least recently used
+    assert cache.get_solution(first)[0]
+    cache.put_solution(third, solve(third))
+    assert cache.get_num_entries() == 2
+    cache.close()
+
+    # the use times were written to the file
+    cache = SolutionCache(path, max_entries=2)
+    assert cache.get_solution(first)[0]
+    assert not cache.get_solution(second)[0]
+    assert cache.get_solution(third)[0]
+    cache.close()
+
+
+def test_connections_share_the_order_of_use(tmp_path):
+    path = str(tmp_path / "solutions.sqlite")
+    first, second, third = PUZZLES
+    # opened on an empty file, before the other connection adds to it
+    early = SolutionCache(path, max_entries=2)
+    late = SolutionCache(path, max_entries=2)
+    late.put_solution(first, solve(first))
+    late.put_solution(second, solve(second))
+
+    # the hit is later than every use the other connection wrote
+    assert early.get_solution(first)[0]
+    early.commit()
+    late.put_solution(third, solve(third))
+    assert late.get_solution(first)[0]
+    assert not late.get_solution(second)[0]
+    early.close()
+    late.close()
+
+
+def hit_in_worker(path):
+    """
+    :param path: the path of a cache file
+    :return: True if TINY was found in the cache opened for the worker process
+    """
+    return get_cache((path, 2)).get_solution(TINY)[0]
+
+
+def test_worker_writes_its_hits_at_exit(tmp_path):
+    path = str(tmp_path / "solutions.sqlite")
+    cache = SolutionCache(path, max_entries=2)
+    cache.put_solution(TINY, solve(TINY))
+    cache.put_solution(EXAMPLE_1, solve(EXAMPLE_1))
+    with ProcessPoolExecutor(1) as executor:
+        assert executor.submit(hit_in_worker, path).result()
+
+    # the worker's hit made EXAMPLE_1 the least recently used
+    cache.put_solution(EXAMPLE_3, solve(EXAMPLE_3))
+    assert cache.get_solution(TINY)[0]
+    assert not cache.get_solution(EXAMPLE_1)[0]
+    cache.close()
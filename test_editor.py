@@ -0,0 +1,89 @@
+"""
+Tests of the editor against fresh solves of the edited puzzles
+"""
+import random
+
+from batch import STATUS_SOLVED, STATUS_UNSOLVABLE, STATUS_TIMEOUT
+from benchmark import load_corpus
+from board import Board
+from editor import PuzzleEditor
+from kakuro import search_trail
+
+
+def corpus_clues(puzzle_id):
+    """
+    :param puzzle_id: the id of a puzzle of the corpus
+    :return: the clues of the puzzle
+    """
+    return next([tuple(clue) for clue in puzzle["clues"]] for puzzle in load_corpus() if puzzle["id"] == puzzle_id)
+
+
+def check_like_fresh(editor):
+    """
+    Checking that the board of an edited puzzle is propagated as the board of a new editor
+    :param editor: the editor
+    """
+    fresh = PuzzleEditor(editor.get_clues())
+    assert editor.consistent == fresh.consistent
+    if fresh.consistent:
+        tiles = editor.get_board().get_tiles()
+        assert set(tiles) == set(fresh.get_board().get_tiles())
+        for location, tile in fresh.get_board().get_tiles().items():
+            assert tiles[location].possible_mask() == tile.possible_mask(), location
+
+
+def test_edits_propagate_like_a_fresh_board():
+    rng = random.Random(5)
+    original = corpus_clues("medium-12x12-100")
+    editor = PuzzleEditor(original)
+    assert editor.solve()["status"] == STATUS_SOLVED
+    for _ in range(30):
+        clues = editor.get_clues()
+        kind = rng.random()
+        if kind < 0.15:
+            editor.remove_clue(rng.randrange(len(clues)))
+        elif kind < 0.3:
+            editor.add_clue(rng.choice(original))
+        else:
+            index = rng.randrange(len(clues))
+            total, num_tiles, orientation, row, col = clues[index]
+            total = min(45, max(num_tiles * (num_tiles + 1) // 2, total + rng.choice((-2, -1, 1, 2))))
+            editor.set_clue(index, (total, num_tiles, orientation, row, col))
+        check_like_fresh(editor)
+
+
+def test_changing_a_value_re_solves():
+    editor = PuzzleEditor(corpus_clues("large-16x16-100"))
+    solution = {(row, col): value for row, col, value in editor.solve()["solution"]}
+    board = editor.get_board()
+
+    # moving a tile to a value its two runs don't use yet
+    for location, value in sorted(solution.items()):
+        const_indexes = board.get_tile(location[0], location[1]).get_constraints()
+        used = set(solution[other] for const_index in const_indexes
+                   for other in board.get_constraint(const_index).get_locations())
+        free = [new_value for new_value in range(1, 10) if new_value not in used]
+        if len(const_indexes) == 2 and len(free) > 0:
+            break
+    for const_index in const_indexes:
+        total, num_tiles, orientation, row, col = editor.get_clues()[const_index]
+        editor.set_clue(const_index, (total + free[0] - value, num_tiles, orientation, row, col))
+    check_like_fresh(editor)
+
+    result = editor.solve()
+    expected = search_trail(Board(editor.get_clues()))[0]
+    assert result["status"] == (STATUS_UNSOLVABLE if expected is None else STATUS_SOLVED)
+    if expected is not None:
+        values = {(row, col): value for row, col, value in result["solution"]}
+        for constraint in Board(editor.get_clues()).constraints.values():
+            run = [values[location] for location in constraint.get_locations()]
+            assert len(set(run)) == len(run) and sum(run) == constraint.get_total_sum()
+
+
+def test_solve_times_out():
+    editor = PuzzleEditor(corpus_clues("hard-12x12-102"))
+    result = editor.solve(max_boards=1)
+    assert result["status"] == STATUS_TIMEOUT
+    assert result["solution"] is None
+    # the board is left as it was, so the next solve finds the solution
+    assert editor.solve()["status"] == STATUS_SOLVED
@@ -0,0 +1,67 @@
+"""
+Tests of the clues of generated puzzles
+"""
+import random
+
+from board import Board, HORIZONTAL
+from domain import BIGGEST_NUM
+from generator import generate_puzzle
+from kakuro import search_trail, count_solutions
+
+ROWS = 10
+COLS = 12
+
+
+def run_tiles(clue):
+    """
+    :param clue: a clue, as (sum, number of tiles, orientation, x, y)
+    :return: the locations of the tiles of its run
+    """
+    total_sum, num_tiles, orientation, row, col = clue
+    if orientation == HORIZONTAL:
+        return [(row, col + step) for step in range(1, num_tiles + 1)]
+    return [(row + step, col) for step in range(1, num_tiles + 1)]
+
+
+def check_clues(clues, values, rows, cols):
+    """
+    Checking that every white tile is in one horizontal and one vertical run
+    of 2 to BIGGEST_NUM tiles, inside the grid, whose distinct digits add up to its clue
+    :param clues: the generated clues
+    :param values: the generated digit of every white tile
+    :param rows: the number of rows of the grid
+    :param cols: the number of columns of the grid
+    """
+    runs_of = {location: [] for location in values}
+    for clue in clues:
+        tiles = run_tiles(clue)
+        assert 2 <= len(tiles) <= BIGGEST_NUM
+        assert (clue[3], clue[4]) not in values
+        digits = [values[tile] for tile in tiles]
+        assert len(set(digits)) == len(digits)
+        assert sum(digits) == clue[0]
+        for tile in tiles:
+            assert 0 < tile[0] < rows and 0 < tile[1] < cols
+            runs_of[tile].append(clue[2])
+        # the run ends at a black tile or at the edge
+        after = run_tiles((0, len(tiles) + 1, clue[2], clue[3], clue[4]))[-1]
+        assert after not in values
+    assert all(sorted(orientations) == [0, 1] for orientations in runs_of.values())
+
+
+def test_generated_clues():
+    rng = random.Random(5)
+    for _ in range(10):
+        clues, values = generate_puzzle(ROWS, COLS, rng=rng)
+        check_clues(clues, values, ROWS, COLS)
+        assert search_trail(Board(clues))[0] is not None
+
+
+def test_unique_puzzles():
+    rng = random.Random(5)
+    for _ in range(3):
+        clues, values = generate_puzzle(8, rng=rng, unique=True)
+        check_clues(clues, values, 8, 8)
+        counted = count_solutions(Board(clues), limit=2)
+        assert counted["count"] == 1
+        assert counted["solutions"][0] == sorted([row, col, value] for (row, col), value in values.items())
@@ -0,0 +1,87 @@
+"""
+Regression tests of the searches, on puzzles of benchmarks/corpus.jsonl
+"""
+import random
+import time
+
+import pytest
+
+from batch import solve_puzzle, STATUS_SOLVED
+from benchmark import load_corpus
+from board import Board
+from generator import generate_puzzle
+from kakuro import search_components, search_trail, count_solutions, BRANCH_ADAPTIVE
+
+# a search taking longer than this on a corpus puzzle is a regression
+DEADLINE_SECONDS = 10
+
+
+def corpus_clues(puzzle_id):
+    """
+    :param puzzle_id: the id of a puzzle of the corpus
+    :return: the clues of the puzzle
+    """
+    for puzzle in load_corpus():
+        if puzzle["id"] == puzzle_id:
+            return puzzle["clues"]
+    raise KeyError(puzzle_id)
+
+
+def check_values(board, values):
+    """
+    :param board: the board of a puzzle
+    :param values: a dict from the location of every tile of the board to its value
+    """
+    for constraint in board.constraints.values():
+        run = [values[location] for location in constraint.get_locations()]
+        assert len(set(run)) == len(run)
+        assert sum(run) == constraint.get_total_sum()
+        assert all(1 <= value <= board.biggest_num for value in run)
+
+
+def check_solution(solved):
+    """
+    :param solved: a board found to be solved
+    """
+    assert solved.is_complete()
+    check_values(solved, {location: tile.get_value() for location, tile in solved.tiles.items()})
+
+
+def test_components_medium_12x12_109():
+    # the components search used to branch on other tiles than search_trail,
+    # and took over 50k boards on this puzzle instead of 74
+    clues = corpus_clues("medium-12x12-109")
+    solved, num_used_boards = search_components(Board(clues), time.monotonic() + DEADLINE_SECONDS)
+    assert solved is not None
+    check_solution(solved)
+    assert num_used_boards <= search_trail(Board(clues))[1]
+
+
+def test_count_components_medium_12x12_109():
+    clues = corpus_clues("medium-12x12-109")
+    result = count_solutions(Board(clues), limit=1, deadline=time.monotonic() + DEADLINE_SECONDS, decompose=True)
+    assert result["count"] == 1
+
+
+@pytest.mark.parametrize("biggest_num", [12, 16])
+def test_solve_generated_big_digits(biggest_num):
+    # single searches got stuck past 20 seconds on some of these
+    rng = random.Random(10)
+    for _ in range(4):
+        clues = generate_puzzle(14, rng=rng, biggest_num=biggest_num)[0]
+        result = solve_puzzle(None, clues, timeout=DEADLINE_SECONDS, biggest_num=biggest_num)
+        assert result["status"] == STATUS_SOLVED
+        check_values(Board(clues, biggest_num), {(row, col): value for row, col, value in result["solution"]})
+
+
+@pytest.mark.parametrize("biggest_num", [40, 64])
+def test_adaptive_branching_big_digits(biggest_num):
+    # the long runs of these ranges have too many combinations to list, and
+    # branching on their placements used to index their missing masks
+    rng = random.Random(1)
+    for _ in range(10):
+        clues = generate_puzzle(10, rng=rng, biggest_num=biggest_num)[0]
+        solved = search_trail(Board(clues, biggest_num), time.monotonic() + DEADLINE_SECONDS,
+                              branching=BRANCH_ADAPTIVE)[0]
+        assert solved is not None
+        check_solution(solved)
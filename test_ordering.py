@@ -0,0 +1,77 @@
+"""
+Tests of the search orderings and the restarts
+"""
+import itertools
+
+import pytest
+
+from benchmark import load_corpus
+from board import Board
+from kakuro import search_trail, SearchTimeout
+from ordering import search_ordered, search_restarts, luby, restart_cutoffs, VARIABLE_ORDERINGS, \
+    VALUE_ORDERINGS, VARIABLE_MRV, VALUE_INCREASING, RESTART_GEOMETRIC
+from stats import SolverStats
+
+GRADES = ("examples", "small", "medium")
+
+
+def graded_puzzles(grades=GRADES):
+    """
+    :param grades: the grades of the puzzles
+    :return: the puzzles of the corpus in these grades
+    """
+    return [puzzle for puzzle in load_corpus() if puzzle["grade"] in grades]
+
+
+def check_solution(clues, solved):
+    """
+    :param clues: the clues of a puzzle
+    :param solved: a board found to be solved
+    """
+    assert solved is not None
+    values = {(row, col): value for row, col, value in solved.get_solution()}
+    for constraint in Board(clues).constraints.values():
+        run = [values[location] for location in constraint.get_locations()]
+        assert len(set(run)) == len(run)
+        assert sum(run) == constraint.get_total_sum()
+
+
+def test_luby():
+    assert [luby(index) for index in range(15)] == [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8]
+    assert list(itertools.islice(restart_cutoffs(base=10), 4)) == [10, 10, 20, 10]
+    assert list(itertools.islice(restart_cutoffs(RESTART_GEOMETRIC, 10, 2), 4)) == [10, 20, 40, 80]
+
+
+def test_default_ordering_searches_like_search_trail():
+    for puzzle in graded_puzzles():
+        expected = search_trail(Board(puzzle["clues"]))
+        solved, num_used_boards = search_ordered(Board(puzzle["clues"]), variable=VARIABLE_MRV,
+                                                 value=VALUE_INCREASING)
+        assert num_used_boards == expected[1], puzzle["id"]
+        assert solved.get_solution() == expected[0].get_solution()
+
+
+@pytest.mark.parametrize("variable, value", list(itertools.product(VARIABLE_ORDERINGS, VALUE_ORDERINGS)))
+def test_orderings_solve(variable, value):
+    # dom_wdeg with a value ordering takes seconds on some medium puzzles
+    for puzzle in graded_puzzles(("examples", "small")):
+        for seed in (None, 3):
+            solved = search_ordered(Board(puzzle["clues"]), variable=variable, value=value, seed=seed)[0]
+            check_solution(puzzle["clues"], solved)
+
+
+def test_restarts_solve():
+    for puzzle in graded_puzzles():
+        stats = SolverStats()
+        solved, num_used_boards = search_restarts(Board(puzzle["clues"]), stats=stats, base=5)
+        check_solution(puzzle["clues"], solved)
+        assert stats.used_boards == num_used_boards
+        # the same seed searches the same way
+        assert search_restarts(Board(puzzle["clues"]), base=5)[1] == num_used_boards
+
+
+def test_restarts_give_up_after_max_boards():
+    clues = next(puzzle["clues"] for puzzle in load_corpus() if puzzle["id"] == "hard-12x12-102")
+    with pytest.raises(SearchTimeout) as timed_out:
+        search_restarts(Board(clues), max_boards=50, base=10)
+    assert 50 <= timed_out.value.num_used_boards < 100
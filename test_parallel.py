@@ -0,0 +1,48 @@
+"""
+Tests of the search of a single puzzle on a pool of processes
+"""
+from board import Board
+from kakuro import search_trail, EXAMPLE_1
+from parallel import solve_parallel
+
+# a 3x3 square of tiles whose rows and columns all sum up to 15, with many solutions
+SQUARE = [(15, 3, 0, row, 0) for row in (1, 2, 3)] + [(15, 3, 1, 0, col) for col in (1, 2, 3)]
+
+
+def count_trail(clues):
+    """
+    :param clues: the clues of a puzzle
+    :return: the number of solutions search_trail finds, going on after each of them
+    """
+    num_solutions = [0]
+
+    def on_solution(solved):
+        num_solutions[0] += 1
+        return True
+
+    search_trail(Board(clues), on_solution=on_solution)
+    return num_solutions[0]
+
+
+def check_rows_and_columns(solution):
+    """
+    :param solution: a solution of SQUARE, as a list of [row, col, value]
+    """
+    grid = {(row, col): value for row, col, value in solution}
+    for index in (1, 2, 3):
+        for run in ([grid[index, col] for col in (1, 2, 3)], [grid[row, index] for row in (1, 2, 3)]):
+            assert len(set(run)) == len(run)
+            assert sum(run) == 15
+
+
+def test_count_all_matches_sequential_count():
+    # few boards per branch, so the branches are split and given back many times
+    result = solve_parallel(SQUARE, workers=2, count_all=True, max_boards=3)
+    assert result["solutions"] == count_trail(SQUARE)
+    check_rows_and_columns(result["solution"])
+
+
+def test_first_solution():
+    result = solve_parallel(EXAMPLE_1, workers=2)
+    assert result["solutions"] >= 1
+    assert result["solution"] is not None
@@ -0,0 +1,85 @@
+"""
+Tests of the asyncio service, solving on threads of the test process
+"""
+import asyncio
+import time
+
+from batch import STATUS_SOLVED, STATUS_TIMEOUT
+from cache import transpose_clues
+from kakuro import EXAMPLE_1
+from service import SolveService
+
+# a 2x2 puzzle with a single solution
+TINY = [(3, 2, 0, 1, 0), (4, 2, 0, 2, 0), (4, 2, 1, 0, 1), (3, 2, 1, 0, 2)]
+
+# a 5x5 square whose first column sums up to more than its rows allow,
+# which takes the search many seconds to find out
+ENDLESS = [(25, 5, 0, row, 0) for row in range(1, 6)] + \
+          [(26 if col == 1 else 25, 5, 1, 0, col) for col in range(1, 6)]
+
+
+def test_requests_join_an_identical_solve():
+    async def run():
+        async with SolveService(workers=1, processes=False) as service:
+            return await asyncio.gather(service.solve(EXAMPLE_1), service.solve(transpose_clues(EXAMPLE_1)))
+
+    first, transposed = asyncio.run(run())
+    assert first["status"] == transposed["status"] == STATUS_SOLVED
+    assert not first["shared"] and transposed["shared"]
+    assert sorted(transposed["solution"]) == sorted([col, row, value] for row, col, value in first["solution"])
+
+
+def test_cancelled_request_frees_its_worker():
+    async def run():
+        async with SolveService(workers=1, processes=False) as service:
+            endless = asyncio.create_task(service.solve(ENDLESS))
+            await asyncio.sleep(0.1)
+            endless.cancel()
+            start = time.monotonic()
+            result = await service.solve(TINY)
+            return result, time.monotonic() - start, service.get_num_in_flight()
+
+    result, seconds, num_in_flight = asyncio.run(run())
+    assert result["status"] == STATUS_SOLVED
+    assert seconds < 2
+    assert num_in_flight == 0
+
+
+def test_deadline_stops_the_solve():
+    async def run():
+        async with SolveService(workers=1, processes=False, timeout=0.2) as service:
+            timed_out = await service.solve(ENDLESS)
+            return timed_out, await service.solve(TINY)
+
+    timed_out, solved = asyncio.run(run())
+    assert timed_out["status"] == STATUS_TIMEOUT
+    assert timed_out["seconds"] < 2
+    assert solved["status"] == STATUS_SOLVED
+
+
+def test_deadline_bounds_waiting_for_the_queue():
+    async def run():
+        async with SolveService(workers=1, max_queue=1, processes=False) as service:
+            # one solve keeps the worker busy and another one fills the queue
+            busy = [asyncio.create_task(service.solve(ENDLESS, timeout=3)),
+                    asyncio.create_task(service.solve(ENDLESS, timeout=3, max_boards=10 ** 9))]
+            await asyncio.sleep(0.1)
+            result = await service.solve(TINY, timeout=0.2)
+            for task in busy:
+                task.cancel()
+            return result
+
+    result = asyncio.run(run())
+    assert result["status"] == STATUS_TIMEOUT
+    assert result["seconds"] < 1
+
+
+def test_services_keep_their_own_stop_flags():
+    async def run():
+        async with SolveService(workers=1, processes=False) as first, \
+                SolveService(workers=1, processes=False) as second:
+            second.stop_flags[0] = 1
+            # a puzzle that needs a branch, where the search checks its flag
+            return await first.solve(EXAMPLE_1)
+
+    assert asyncio.run(run())["status"] == STATUS_SOLVED
@@ -0,0 +1,62 @@
+"""
+Tests of the Zobrist keys and the transposition table
+"""
+from benchmark import load_corpus
+from board import Board
+from kakuro import search_trail, solve_components, expand_board
+from transposition import TranspositionTable
+
+# a 3x3 square of tiles whose rows and columns all sum up to 15, with many solutions
+SQUARE = [(15, 3, 0, row, 0) for row in (1, 2, 3)] + [(15, 3, 1, 0, col) for col in (1, 2, 3)]
+
+
+def corpus_clues(puzzle_id):
+    """
+    :param puzzle_id: the id of a puzzle of the corpus
+    :return: the clues of the puzzle
+    """
+    return next(puzzle["clues"] for puzzle in load_corpus() if puzzle["id"] == puzzle_id)
+
+
+def test_key_comes_back_after_undo():
+    board = Board(corpus_clues("medium-12x12-110"))
+    board.start_trail()
+    board.start_hashing()
+    expand_board(board)
+    key = board.get_hash_key()
+    mark = board.trail_mark()
+    location = board.get_min_remaining_tile()
+    board.place_tile(board.tile_poss_values(*location)[0], *location)
+    board.update_constraints()
+    assert board.get_hash_key() != key
+    board.undo_to(mark)
+    assert board.get_hash_key() == key
+
+
+def test_shared_table_skips_dead_boards():
+    clues = corpus_clues("medium-12x12-100")
+    table = TranspositionTable()
+    solved, num_used_boards = search_trail(Board(clues), table=table)
+    assert table.num_hits == 0 and table.get_num_entries() > 0
+
+    # the second search skips the boards the first one found to have no solution
+    solved_again, num_used_again = search_trail(Board(clues), table=table)
+    assert table.num_hits > 0
+    assert num_used_again < num_used_boards
+    assert solved_again.get_solution() == solved.get_solution()
+
+
+def test_table_keeps_the_biggest_proof():
+    table = TranspositionTable(size=2)
+    table.add_dead(1, 100)
+    table.add_dead(3, 5)
+    table.add_dead(5, 7)
+    # the first place kept the biggest proof, the second one the latest state
+    assert table.is_dead(1) and table.is_dead(5)
+    assert not table.is_dead(3)
+    assert table.get_num_entries() == 2
+    assert table.get_hit_rate() == 2 / 3
+
+
+def test_components_count_with_a_table():
+    assert solve_components(Board(SQUARE), table=TranspositionTable())[0] == solve_components(Board(SQUARE))[0]
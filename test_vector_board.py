@@ -0,0 +1,68 @@
+"""
+Tests of the NumPy board engine, skipped when NumPy isn't installed
+"""
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmark import load_corpus
+from board import Board
+from kakuro import search_trail
+from vector_board import VectorBoard, search_vector, stack_puzzles
+
+# a 2x2 puzzle with a single solution, and one whose rows sum up to less than its columns
+TINY = [(3, 2, 0, 1, 0), (4, 2, 0, 2, 0), (4, 2, 1, 0, 1), (3, 2, 1, 0, 2)]
+UNSOLVABLE = [(3, 2, 0, 1, 0), (3, 2, 0, 2, 0), (5, 2, 1, 0, 1), (5, 2, 1, 0, 2)]
+
+GRADES = ("examples", "small")
+
+
+def check_solution(clues, solution):
+    """
+    :param clues: the clues of a puzzle
+    :param solution: a solution of it, as a list of [row, col, value]
+    """
+    values = {(row, col): value for row, col, value in solution}
+    for constraint in Board(clues).constraints.values():
+        run = [values[location] for location in constraint.get_locations()]
+        assert len(set(run)) == len(run)
+        assert sum(run) == constraint.get_total_sum()
+
+
+def test_solves_the_corpus():
+    for puzzle in load_corpus():
+        if puzzle["grade"] in GRADES:
+            solution = search_vector(VectorBoard(puzzle["clues"]))[0]
+            assert solution is not None, puzzle["id"]
+            check_solution(puzzle["clues"], solution)
+
+
+def test_tiny_and_unsolvable():
+    assert search_vector(VectorBoard(TINY))[0] == search_trail(Board(TINY))[0].get_solution()
+    assert search_vector(VectorBoard(UNSOLVABLE))[0] is None
+
+
+def test_stacked_puzzles_propagate_apart():
+    puzzles = [puzzle["clues"] for puzzle in load_corpus() if puzzle["grade"] in GRADES]
+    constraints, row_offsets = stack_puzzles(puzzles)
+    stacked = VectorBoard(constraints)
+    boards, solvable = stacked.propagate(stacked.empty_board()[None])
+    assert solvable[0]
+    stacked_masks = dict(zip(stacked.get_locations(), boards[0]))
+
+    for puzzle, row_offset in zip(puzzles, row_offsets):
+        alone = VectorBoard(puzzle)
+        alone_boards = alone.propagate(alone.empty_board()[None])[0]
+        for (row, col), mask in zip(alone.get_locations(), alone_boards[0]):
+            assert stacked_masks[row + row_offset, col] == mask
+
+
+def test_rejects_puzzles_it_cannot_hold():
+    with pytest.raises(ValueError):
+        VectorBoard(TINY, biggest_num=16)
+    # a run of ten tiles needs digits above 9
+    with pytest.raises(ValueError):
+        VectorBoard([(55, 10, 0, 1, 0)] + [(value, 1, 1, 0, col) for value, col in zip(range(1, 11), range(1, 11))])
+    # the first tile is in the same horizontal run twice, and in a vertical one
+    with pytest.raises(ValueError):
+        VectorBoard(TINY + [(3, 2, 0, 1, 0)])
@@ -0,0 +1,138 @@
+"""
+Zobrist keys of board states, and a table of the states of a single puzzle
+the search already proved to have no solution
+"""
+import random
+
+from domain import BIGGEST_NUM
+
+ZOBRIST_SEED = 1
+
+# the masks are hashed a few bits at a time, with a table of
+# the XOR of the keys of every combination of these bits
+CHUNK_BITS = 5
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+DEFAULT_TABLE_SIZE = 1 << 16
+
+# the fields of an entry of the table
+ENTRY_KEY = 0
+ENTRY_EFFORT = 1
+
+
+# the chunk tables of every tile or constraint id asked for until now,
+# by the biggest number of the boards and then by id
+ZOBRIST_TABLES = {}
+zobrist_random = random.Random(ZOBRIST_SEED)
+
+
+def zobrist_tables(num_ids, biggest_num=BIGGEST_NUM):
+    """
+    :param num_ids: the number of ids to have keys for
+    :param biggest_num: the biggest number the tiles may hold
+    :return: a list with the chunk tables of every id, as taken by mask_key, with at least
+    num_ids of them. The ids keep their keys as the list grows, for bigger boards
+    """
+    tables = ZOBRIST_TABLES.setdefault(biggest_num, [])
+    while len(tables) < num_ids:
+        tile_tables = []
+        for chunk in range(-(-biggest_num // CHUNK_BITS)):
+            chunk_table = [0] * (1 << CHUNK_BITS)
+            num_digits = min(CHUNK_BITS, biggest_num - chunk * CHUNK_BITS)
+            digit_keys = [zobrist_random.getrandbits(64) for _ in range(num_digits)]
+            for bits in range(1, 1 << num_digits):
+                lowest = bits & -bits
+                chunk_table[bits] = chunk_table[bits ^ lowest] ^ digit_keys[lowest.bit_length() - 1]
+            tile_tables.append(tuple(chunk_table))
+        tables.append(tuple(tile_tables))
+    return tables
+
+
+def mask_key(tile_tables, mask):
+    """
+    :param tile_tables: the chunk tables of a tile or constraint, out of zobrist_tables
+    :param mask: the possible values of the tile
+    :return: the XOR of the keys of the values in mask
+    """
+    key = 0
+    for chunk_table in tile_tables:
+        key ^= chunk_table[mask & CHUNK_MASK]
+        mask >>= CHUNK_BITS
+    return key
+
+
+class TranspositionTable:
+    """
+    A bounded set of the keys of states with no solution. Every key has two
+    places it may be kept in: the first keeps the state whose proof took the
+    most boards, and the second always takes the latest state, so a big proof
+    is only replaced by a bigger one and the small ones replace each other
+    """
+
+    def __init__(self, size=DEFAULT_TABLE_SIZE):
+        """
+        Constructor of an empty table
+        :param size: the number of states to keep, rounded up to an even number
+        """
+        self.num_buckets = max(1, (size + 1) // 2)
+        self.entries = [None] * (2 * self.num_buckets)
+
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_stored = 0
+        self.num_replaced = 0
+
+    def get_num_entries(self):
+        """
+        :return: the number of states in the table
+        """
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def get_hit_rate(self):
+        """
+        :return: the fraction of the lookups that found their state, 0 before any lookup
+        """
+        lookups = self.num_hits + self.num_misses
+        return self.num_hits / lookups if lookups > 0 else 0.0
+
+    def is_dead(self, key, stats=None):
+        """
+        :param key: the key of a state
+        :param stats: a SolverStats to count the hit or miss in, None to skip the statistics
+        :return: True if the state is known to have no solution
+        """
+        bucket = 2 * (key % self.num_buckets)
+        found = any(entry is not None and entry[ENTRY_KEY] == key for entry in self.entries[bucket:bucket + 2])
+        if found:
+            self.num_hits += 1
+        else:
+            self.num_misses += 1
+        if stats is not None:
+            if found:
+                stats.transposition_hits += 1
+            else:
+                stats.transposition_misses += 1
+        return found
+
+    def add_dead(self, key, effort):
+        """
+        Remembering a state with no solution
+        :param key: the key of the state
+        :param effort: the number of boards it took to find out, which decides what it replaces
+        """
+        bucket = 2 * (key % self.num_buckets)
+        entries = self.entries
+        if any(entry is not None and entry[ENTRY_KEY] == key for entry in entries[bucket:bucket + 2]):
+            return
+        self.num_stored += 1
+        if entries[bucket] is None:
+            entries[bucket] = (key, effort)
+            return
+        if entries[bucket][ENTRY_EFFORT] <= effort:
+            # the state the first place held moves down to the second one
+            demoted, entries[bucket] = entries[bucket], (key, effort)
+        else:
+            demoted = (key, effort)
+        if entries[bucket + 1] is not None:
+            self.num_replaced += 1
+        entries[bucket + 1] = demoted
@@ -0,0 +1,253 @@
+"""
+Experimental: a board kept in NumPy arrays, propagating all its constraints at once.
+The possible values of every tile are a mask in a single array, every
+constraint is a row of tile indexes, and its combinations are a row of
+masks. A propagation pass works on whole arrays instead of calling the
+methods of each Tile and Constraint, and takes a batch of boards at once:
+the children of a search node, or many puzzles stacked into one board.
+The masks are 16 bit, for the usual digits 1 to BIGGEST_NUM only, and a tile
+is in at most two runs, so other puzzles raise ValueError.
+Needs NumPy, which the rest of the solver doesn't.
+Its search takes 7 to 8 times longer for each board than search_trail,
+since every pass goes over all the constraints of the board, so it isn't
+used by the other modules and the benchmark only runs it when asked for
+"""
+import time
+
+import numpy as np
+
+from board import Constraint, INDEX_SUM, INDEX_NUM_TILES, INDEX_ORIENTATION, INDEX_START_X, INDEX_START_Y, \
+    VERTICAL
+from domain import BIGGEST_NUM, NUM_MASKS, FULL_MASK, MASK_DIGITS, DIGIT_BITS
+from kakuro import SearchTimeout
+
+MASK_TYPE = np.uint16
+
+# the number of digits of every mask, to look whole arrays of masks up in
+POPCOUNT_ARRAY = np.array([mask.bit_count() for mask in range(NUM_MASKS)], dtype=np.uint8)
+DIGIT_SHIFTS = np.arange(BIGGEST_NUM, dtype=MASK_TYPE)
+DIGIT_MASKS = np.array(DIGIT_BITS[1:BIGGEST_NUM + 1], dtype=MASK_TYPE)
+
+
+class VectorBoard:
+    """
+    The arrays describing a puzzle, and the propagation of batches of its boards.
+    A board is a row of masks, one for each tile and a last one that is
+    always empty, which the short constraints are padded with
+    """
+
+    def __init__(self, constraints, biggest_num=BIGGEST_NUM):
+        """
+        Constructor of the arrays of a puzzle
+        :param constraints: list of constraints to place on this board, as for Board
+        :param biggest_num: the biggest number the tiles may hold, only BIGGEST_NUM fits the masks
+        :raise ValueError: if the puzzle needs bigger numbers, or a tile is in more than two runs
+        """
+        if biggest_num != BIGGEST_NUM:
+            raise ValueError("the vector board only holds the digits 1 to %d, not 1 to %r" % (BIGGEST_NUM, biggest_num))
+        for constraint in constraints:
+            if constraint[INDEX_NUM_TILES] > BIGGEST_NUM:
+                raise ValueError("a run of %d tiles needs bigger digits than %d: %r"
+                                 % (constraint[INDEX_NUM_TILES], BIGGEST_NUM, tuple(constraint)))
+        runs = [Constraint(constraint[INDEX_SUM], constraint[INDEX_NUM_TILES], constraint[INDEX_ORIENTATION],
+                           constraint[INDEX_START_X], constraint[INDEX_START_Y], index)
+                for index, constraint in enumerate(constraints)]
+        self.locations = sorted(set(location for run in runs for location in run.get_locations()))
+        self.num_tiles = len(self.locations)
+        tile_indexes = {location: index for index, location in enumerate(self.locations)}
+
+        # run_tiles[r, k] is the tile at place k of constraint r, the empty last tile past its end
+        max_length = max([run.get_num_tiles() for run in runs], default=1)
+        self.run_tiles = np.full((len(runs), max_length), self.num_tiles, dtype=np.intp)
+
+        # tile_slots[t] holds the two places of tile t, as indexes into the flattened
+        # run_tiles, and the index past all of them for a tile under a single constraint
+        full_slot = len(runs) * max_length
+        self.tile_slots = np.full((self.num_tiles + 1, 2), full_slot, dtype=np.intp)
+        num_slots = [0] * (self.num_tiles + 1)
+
+        # run_combinations[r, c] is the mask of combination c of constraint r, where
+        # combination_valid tells the combinations apart from the padding
+        max_combinations = max([len(run.combinations.masks) for run in runs], default=1)
+        self.run_combinations = np.zeros((len(runs), max_combinations), dtype=MASK_TYPE)
+        self.combination_valid = np.zeros((len(runs), max_combinations), dtype=bool)
+
+        for run_index, run in enumerate(runs):
+            for place, location in enumerate(run.get_locations()):
+                tile_index = tile_indexes[location]
+                self.run_tiles[run_index, place] = tile_index
+                if num_slots[tile_index] == 2:
+                    raise ValueError("the tile at %r is in more than two runs" % (location,))
+                self.tile_slots[tile_index, num_slots[tile_index]] = run_index * max_length + place
+                num_slots[tile_index] += 1
+            masks = run.combinations.masks
+            self.run_combinations[run_index, :len(masks)] = masks
+            self.combination_valid[run_index, :len(masks)] = True
+        self.real_places = self.run_tiles != self.num_tiles
+
+    def get_num_tiles(self):
+        """
+        :return: the number of tiles of the puzzle
+        """
+        return self.num_tiles
+
+    def get_locations(self):
+        """
+        :return: the locations of the tiles, by their index in a board
+        """
+        return self.locations
+
+    def empty_board(self):
+        """
+        :return: a board with every value possible in every tile
+        """
+        board = np.full(self.num_tiles + 1, FULL_MASK, dtype=MASK_TYPE)
+        board[self.num_tiles] = 0
+        return board
+
+    def propagate(self, boards):
+        """
+        Propagating the constraints of a batch of boards, until nothing changes.
+        Each pass, for every constraint of every board at once: keeps the
+        combinations holding the values placed and held by the tiles, keeps in the
+        tiles only the values of these combinations, removes the values placed
+        in one tile from the others, and places a value that every combination
+        holds and only one tile can hold
+        :param boards: an array of boards, one in each row
+        :return: the propagated boards, and an array that is False for the boards found to have no solution
+        """
+        boards = np.array(boards, dtype=MASK_TYPE)
+        num_boards = len(boards)
+        combinations = self.run_combinations[np.newaxis]
+        valid = self.combination_valid[np.newaxis]
+        full_column = np.full((num_boards, 1), FULL_MASK, dtype=MASK_TYPE)
+        while True:
+            run_domains = boards[:, self.run_tiles]
+            singles = np.where(POPCOUNT_ARRAY[run_domains] == 1, run_domains, 0).astype(MASK_TYPE)
+            placed = np.bitwise_or.reduce(singles, axis=2)
+            held = np.bitwise_or.reduce(run_domains, axis=2)
+            repeated = POPCOUNT_ARRAY[placed] < np.count_nonzero(singles, axis=2)
+
+            possible = valid & (combinations & ~held[..., np.newaxis] == 0) & \
+                (combinations & placed[..., np.newaxis] == placed[..., np.newaxis])
+
+            # the values each tile can take in each combination, where a value of the
+            # combination held by a single tile is the only one left for that tile
+            tile_supports = run_domains[..., np.newaxis] & combinations[:, :, np.newaxis, :]
+            value_holders = np.count_nonzero((tile_supports[..., np.newaxis] >> DIGIT_SHIFTS) & 1, axis=2)
+            lonely = np.bitwise_or.reduce(np.where(value_holders == 1, DIGIT_MASKS, 0).astype(MASK_TYPE), axis=3)
+            tile_supports = np.where(tile_supports & lonely[:, :, np.newaxis, :] != 0,
+                                     tile_supports & lonely[:, :, np.newaxis, :], tile_supports)
+            possible &= ((tile_supports != 0) | ~self.real_places[np.newaxis, :, :, np.newaxis]).all(axis=2)
+            allowed = np.bitwise_or.reduce(np.where(possible, combinations, 0).astype(MASK_TYPE), axis=2)
+            required = np.bitwise_and.reduce(np.where(possible, combinations, FULL_MASK).astype(MASK_TYPE), axis=2)
+
+            # the required values only one tile of the constraint can hold
+            holders = np.count_nonzero((run_domains[..., np.newaxis] >> DIGIT_SHIFTS) & 1, axis=2)
+            single_holder = np.bitwise_or.reduce(np.where(holders == 1, DIGIT_MASKS, 0).astype(MASK_TYPE), axis=2)
+            hidden = (single_holder & required & ~placed)[..., np.newaxis]
+
+            slot_masks = allowed[..., np.newaxis] & ~(placed[..., np.newaxis] & ~singles)
+            slot_masks = np.where(run_domains & hidden != 0, slot_masks & hidden, slot_masks)
+            slot_masks = np.concatenate((slot_masks.reshape(num_boards, -1), full_column), axis=1)
+            new_boards = boards & slot_masks[:, self.tile_slots[:, 0]] & slot_masks[:, self.tile_slots[:, 1]]
+            if np.array_equal(new_boards, boards):
+                break
+            boards = new_boards
+
+        solvable = possible.any(axis=2).all(axis=1) & ~repeated.any(axis=1) & \
+            (boards[:, :self.num_tiles] != 0).all(axis=1)
+        return boards, solvable
+
+    def is_complete(self, board):
+        """
+        :param board: a propagated board
+        :return: True if every tile of the board has a single value
+        """
+        return bool((POPCOUNT_ARRAY[board[:self.num_tiles]] == 1).all())
+
+    def get_solution(self, board):
+        """
+        :param board: a complete board
+        :return: a list of [row, col, value] for every tile of the board, by location
+        """
+        return [[row, col, MASK_DIGITS[int(mask)][0]] for (row, col), mask in zip(self.locations, board)]
+
+
+def stack_puzzles(puzzles):
+    """
+    Putting many puzzles on a single board, one under the other, so a
+    single VectorBoard propagates all of them at once
+    :param puzzles: a list of lists of constraints
+    :return: the constraints of the single board, and the row each puzzle starts at
+    """
+    constraints = []
+    row_offsets = []
+    row_offset = 0
+    for puzzle in puzzles:
+        row_offsets.append(row_offset)
+        max_row = 0
+        for constraint in puzzle:
+            constraint = list(constraint)
+            end_row = constraint[INDEX_START_X]
+            if constraint[INDEX_ORIENTATION] == VERTICAL:
+                end_row += constraint[INDEX_NUM_TILES]
+            max_row = max(max_row, end_row)
+            constraint[INDEX_START_X] += row_offset
+            constraints.append(tuple(constraint))
+        row_offset += max_row + 1
+    return constraints, row_offsets
+
+
+def search_vector(board, deadline=None, max_boards=None, stats=None):
+    """
+    Searching for a solution with a VectorBoard, propagating all the
+    children of a node together as one batch
+    :param board: the VectorBoard of the puzzle
+    :param deadline: a time.monotonic() value to give up at, None to never give up
+    :param max_boards: the number of boards to give up after, None to never give up
+    :param stats: a SolverStats to fill in, None to skip the statistics
+    :return: the solution as returned by VectorBoard.get_solution (None if there
+    is none) and the number of used boards
+    """
+    if stats is not None:
+        search_start = time.perf_counter()
+    num_used_boards = 1
+    boards, solvable = board.propagate(board.empty_board()[np.newaxis])
+    # the boards to search, with the number of branch moves leading to them
+    stack = [(boards[0], 0)] if solvable[0] else []
+    solution = None
+    try:
+        while len(stack) > 0:
+            if (deadline is not None and time.monotonic() > deadline) or \
+                    (max_boards is not None and num_used_boards > max_boards):
+                raise SearchTimeout(num_used_boards)
+            current, depth = stack.pop()
+            if stats is not None:
+                stats.node_expanded(board, depth)
+            counts = POPCOUNT_ARRAY[current[:board.num_tiles]]
+            if (counts == 1).all():
+                solution = board.get_solution(current)
+                break
+
+            # the tile with the least values left, out of those with more than one
+            tile_index = int(np.argmin(np.where(counts > 1, counts, BIGGEST_NUM + 1)))
+            values = MASK_DIGITS[int(current[tile_index])]
+            children = np.repeat(current[np.newaxis], len(values), axis=0)
+            children[:, tile_index] = [DIGIT_BITS[value] for value in values]
+            num_used_boards += len(values)
+            children, solvable = board.propagate(children)
+
+            # the biggest value is popped first, like in search_trail
+            for child, child_solvable in zip(children, solvable):
+                if child_solvable:
+                    stack.append((child, depth + 1))
+                elif stats is not None:
+                    stats.wipeouts += 1
+            if stats is not None:
+                stats.frontier_size(len(stack))
+    finally:
+        if stats is not None:
+            stats.used_boards = num_used_boards
+            stats.total_seconds += time.perf_counter() - search_start
+    return solution, num_used_boards